@@ -1,47 +1,292 @@
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
 
 import jwt
-from jwt import PyJWTError
+from app.core.keys import KeyRing
+from app.core.refresh_tokens import (
+    IssuedToken,
+    RedisRefreshFamilies,
+    RefreshFamilies,
+    SQLiteRefreshFamilies,
+)
+from app.core.revocation import (
+    RedisRevocationList,
+    RevocationList,
+    SQLiteRevocationList,
+)
+from app.core.token_cache import DEFAULT_MAX_ENTRIES, TokenCache
+from app.src.storage import open_sqlite_pool, storage_backend
+from jwt import InvalidTokenError, PyJWTError
 
 JWT_SECRET_KEY = os.getenv(
     "JWT_SECRET_KEY",
     "your-256-bit-secret-key-here-change-in-production-32-chars-minimum",
 )
 JWT_ALGORITHM = "HS256"
-JWT_ACCESS_TOKEN_EXPIRE_MINUTES = 60
+JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(
+    os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+)
+JWT_REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
+# Где хранятся отзыв и семейства refresh-токенов: memory — в памяти процесса
+# (только один воркер), sqlite — в общем файле APP_SQLITE_PATH, redis —
+# в APP_AUTH_REDIS_URL. По умолчанию — рядом с данными: sqlite, если выбран
+# APP_STORAGE_BACKEND=sqlite, иначе memory
+AUTH_STATE_BACKEND_ENV = "APP_AUTH_STATE_BACKEND"
+AUTH_REDIS_URL_ENV = "APP_AUTH_REDIS_URL"
+AUTH_REDIS_PREFIX_ENV = "APP_AUTH_REDIS_PREFIX"
+DEFAULT_AUTH_REDIS_URL = "redis://127.0.0.1:6379/0"
+DEFAULT_AUTH_REDIS_PREFIX = "auth:"
+# Число воркеров uvicorn/gunicorn (их --workers по умолчанию берётся отсюда)
+WORKERS_ENV = "WEB_CONCURRENCY"
+AUTH_STATE_BACKENDS = ("memory", "sqlite", "redis")
 
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+
+def auth_state_backend() -> str:
+    """Бэкенд состояния аутентификации; memory при нескольких воркерах — ошибка.
+
+    Иначе выход и refresh-токены работали бы только на том воркере, который
+    их обработал, и никто бы об этом не узнал.
+    """
+    backend = os.getenv(AUTH_STATE_BACKEND_ENV, "").lower()
+    if not backend:
+        backend = "sqlite" if storage_backend() == "sqlite" else "memory"
+    if backend not in AUTH_STATE_BACKENDS:
+        raise ValueError(f"Unknown auth state backend: {backend}")
+    workers = int(os.getenv(WORKERS_ENV, "1"))
+    if backend == "memory" and workers > 1:
+        raise RuntimeError(
+            f"{WORKERS_ENV}={workers} needs shared token revocation state: "
+            f"set {AUTH_STATE_BACKEND_ENV}=sqlite or redis"
         )
+    return backend
+
+
+def _open_redis_state(namespace: str) -> Tuple[Any, str]:
+    from app.src.resp import RespClient
+
+    prefix = os.getenv(AUTH_REDIS_PREFIX_ENV, DEFAULT_AUTH_REDIS_PREFIX)
+    client = RespClient(os.getenv(AUTH_REDIS_URL_ENV, DEFAULT_AUTH_REDIS_URL))
+    return client, f"{prefix}{namespace}:"
+
+
+def _create_revocation_list() -> Any:
+    backend = auth_state_backend()
+    if backend == "sqlite":
+        return SQLiteRevocationList(open_sqlite_pool())
+    if backend == "redis":
+        return RedisRevocationList(*_open_redis_state("revoked"))
+    return RevocationList()
+
+
+def _create_refresh_families() -> Any:
+    backend = auth_state_backend()
+    if backend == "sqlite":
+        return SQLiteRefreshFamilies(open_sqlite_pool())
+    if backend == "redis":
+        return RedisRefreshFamilies(*_open_redis_state("refresh"))
+    return RefreshFamilies()
+
+
+_TOKEN_CACHE = TokenCache(
+    max_entries=int(os.getenv("APP_TOKEN_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES)))
+)
+_REVOKED = _create_revocation_list()
+_FAMILIES = _create_refresh_families()
+
+# Асимметричная подпись (EdDSA/ES256) включается JWKS-файлом. Токены без kid
+# проверяются общим секретом HS256 только если секрет задан явно: иначе
+# на узле с JWKS токен, подписанный секретом по умолчанию, был бы принят.
+JWKS_PATH = os.getenv("APP_JWKS_PATH")
+_KEY_RING = (
+    KeyRing(
+        JWKS_PATH,
+        signing_kid=os.getenv("APP_JWT_SIGNING_KID") or None,
+        on_reload=_TOKEN_CACHE.clear,
+    )
+    if JWKS_PATH
+    else None
+)
+_HS256_ENABLED = _KEY_RING is None or "JWT_SECRET_KEY" in os.environ
+
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    if not expires_delta:
+        expires_delta = timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+    encoded_jwt, _ = _encode_token(data, expires_delta)
+    return encoded_jwt
+
+
+def _encode_token(data: dict, expires_delta: timedelta) -> Tuple[str, IssuedToken]:
+    """Подписывает claims; возвращает токен и его (jti, exp)."""
+    to_encode = data.copy()
+    now = datetime.now(timezone.utc)
+    expire = now + expires_delta
 
     to_encode.update(
         {
-            "iat": datetime.now(timezone.utc),
+            "iat": now,
             "exp": expire,
             "iss": "simple-blog",
             "aud": "simple-blog-users",
         }
     )
+    # Уникальный id токена: по нему токен можно отозвать до истечения
+    to_encode.setdefault("jti", uuid4().hex)
+    to_encode.setdefault("typ", ACCESS_TOKEN_TYPE)
 
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
+    if _KEY_RING is not None:
+        key = _KEY_RING.signing_key()
+        if key.sign_key is None:
+            raise RuntimeError(f"signing key {key.kid} has no private part")
+        encoded_jwt = jwt.encode(
+            to_encode, key.sign_key, algorithm=key.algorithm, headers={"kid": key.kid}
+        )
+    else:
+        encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    # PyJWT округляет exp до целых секунд вниз
+    return encoded_jwt, (to_encode["jti"], int(expire.timestamp()))
+
+
+def _issue_pair(
+    sub: str, family: str
+) -> Tuple[Dict[str, Any], IssuedToken, IssuedToken]:
+    access_ttl = timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token, access = _encode_token({"sub": sub, "fam": family}, access_ttl)
+    refresh_token, refresh = _encode_token(
+        {"sub": sub, "fam": family, "typ": REFRESH_TOKEN_TYPE},
+        timedelta(days=JWT_REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    tokens = {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(access_ttl.total_seconds()),
+    }
+    return tokens, refresh, access
+
+
+def issue_token_pair(sub: str) -> Dict[str, Any]:
+    """Пара access + refresh при входе; начинает новое семейство refresh-токенов."""
+    family = uuid4().hex
+    tokens, refresh, access = _issue_pair(sub, family)
+    _FAMILIES.start(family, sub, refresh, access)
+    return tokens
+
+
+def refresh_token_pair(refresh_token: str) -> Optional[Dict[str, Any]]:
+    """Ротация: одна проверка подписи и один поиск семейства.
+
+    Повторное предъявление уже использованного refresh-токена отзывает
+    всё семейство, включая выданные в нём access-токены.
+    """
+    payload = _decode_token(refresh_token, REFRESH_TOKEN_TYPE)
+    if payload is None:
+        return None
+    jti, family, sub = payload.get("jti"), payload.get("fam"), payload.get("sub")
+    if not jti or not family or not sub:
+        return None
+
+    tokens, refresh, access = _issue_pair(sub, family)
+    rotated, leaked = _FAMILIES.rotate(family, jti, refresh, access)
+    for leaked_jti, leaked_exp in leaked:
+        _REVOKED.revoke(leaked_jti, leaked_exp)
+    return tokens if rotated else None
 
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """Проверяет токен; claims успешно проверенных токенов кешируются до exp.
+
+    Список отзыва проверяется и для закешированных токенов; если общий
+    список недоступен, поднимается RevocationUnavailable.
+    """
+    if _KEY_RING is not None:
+        # Перезагрузка JWKS сбрасывает кеш до того, как в него заглянем
+        _KEY_RING.maybe_reload()
+    payload = _TOKEN_CACHE.get(token)
+    if payload is None:
+        started = time.perf_counter()
+        payload = _decode_token(token, ACCESS_TOKEN_TYPE)
+        if payload is None:
+            return None
+        _TOKEN_CACHE.put(token, payload, decode_seconds=time.perf_counter() - started)
+
+    if _REVOKED.is_revoked(payload.get("jti"), payload.get("exp")):
+        return None
+    return payload
+
+
+def revoke_token(token: str) -> Optional[Dict[str, Any]]:
+    """Отзывает валидный токен до его exp; возвращает его claims."""
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    jti, exp = payload.get("jti"), payload.get("exp")
+    if jti is None or exp is None:
+        # Токены без jti выпущены до введения отзыва и истекут сами
+        return None
+    _REVOKED.revoke(jti, exp)
+    _TOKEN_CACHE.discard(token)
+    # Выход завершает и сессию refresh-токенов, из которой выдан токен
+    family = payload.get("fam")
+    if family:
+        for family_jti, family_exp in _FAMILIES.revoke(family):
+            _REVOKED.revoke(family_jti, family_exp)
+    return payload
+
+
+def revocation_stats() -> Dict[str, Any]:
+    return {**_REVOKED.stats(), "refresh": _FAMILIES.stats()}
+
+
+def auth_state_blocking() -> bool:
+    """True, если отзыв и семейства ходят по сети и не должны идти в цикле событий."""
+    return bool(_REVOKED.blocking or _FAMILIES.blocking)
+
+
+def close_auth_state() -> None:
+    _REVOKED.close()
+    _FAMILIES.close()
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    return _TOKEN_CACHE.stats()
+
+
+def _verification_key(token: str) -> Tuple[Any, str]:
+    """Ключ и единственный допустимый алгоритм по заголовку токена.
+
+    Алгоритм берётся из ключа, а не из заголовка: подменить его нельзя.
+    """
+    if _KEY_RING is not None:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is not None:
+            key = _KEY_RING.verification_key(kid)
+            if key is None:
+                raise InvalidTokenError(f"unknown kid: {kid}")
+            return key.verify_key, key.algorithm
+    if not _HS256_ENABLED:
+        raise InvalidTokenError("token has no kid")
+    return JWT_SECRET_KEY, JWT_ALGORITHM
+
+
+def key_ring_stats() -> Optional[Dict[str, Any]]:
+    return _KEY_RING.stats() if _KEY_RING is not None else None
+
+
+def _decode_token(token: str, token_type: str) -> Optional[Dict[str, Any]]:
     try:
+        key, algorithm = _verification_key(token)
         payload = jwt.decode(
             token,
-            JWT_SECRET_KEY,
-            algorithms=[JWT_ALGORITHM],
+            key,
+            algorithms=[algorithm],
             audience="simple-blog-users",
             issuer="simple-blog",
         )
@@ -52,6 +297,11 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         ):
             return None
 
+        # refresh-токен не годится для доступа к API и наоборот;
+        # токены без typ выпущены до появления refresh-токенов
+        if payload.get("typ", ACCESS_TOKEN_TYPE) != token_type:
+            return None
+
         return payload  # type: ignore[no-any-return]
 
     except (PyJWTError, ValueError):
@@ -0,0 +1,123 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 64
+
+T = TypeVar("T")
+
+
+class HashingOverloaded(Exception):
+    """Очередь хеширования заполнена; клиенту стоит повторить позже."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class HashingExecutor:
+    """Пул потоков для хеширования паролей вне event loop.
+
+    Одновременно выполняется не больше ``workers`` задач, ещё ``max_queue``
+    ждут в очереди; сверх этого ``run`` сразу отказывает с
+    ``HashingOverloaded``. KDF из hashlib отпускают GIL, поэтому потоков
+    достаточно и процессный пул не нужен.
+    """
+
+    def __init__(
+        self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        if max_queue < 0:
+            raise ValueError("max_queue must be non-negative")
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._hash_seconds = 0.0
+        self._max_hash_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashingOverloaded(self._retry_after())
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def task() -> T:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(started - submitted, time.perf_counter() - started)
+
+        try:
+            future = self._pool.submit(task)
+        except BaseException:
+            self._release()
+            raise
+        # Слот освобождается, когда задача действительно завершилась или
+        # снята из очереди: отмена ожидающего запроса не останавливает поток,
+        # и уменьшать счётчик раньше значило бы пропустить сверх лимита
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self._hash_seconds / done * 1000, 3),
+                "max_hash_ms": round(self._max_hash_seconds * 1000, 3),
+                "avg_queue_wait_ms": round(self._wait_seconds / done * 1000, 3),
+                "max_queue_wait_ms": round(self._max_wait_seconds * 1000, 3),
+            }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _release(self, future: "Optional[Future[Any]]" = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record(self, wait: float, elapsed: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self._wait_seconds += wait
+            self._hash_seconds += elapsed
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            self._max_hash_seconds = max(self._max_hash_seconds, elapsed)
+
+    def _retry_after(self) -> int:
+        # Время, за которое пул разберёт текущую очередь, не меньше секунды
+        avg = self._hash_seconds / self.completed if self.completed else 0.0
+        return max(1, math.ceil(avg * self._in_flight / self.workers))
+
+
+def create_hashing_executor() -> HashingExecutor:
+    """Пул по переменным окружения APP_HASH_WORKERS и APP_HASH_QUEUE_LIMIT."""
+    return HashingExecutor(
+        workers=int(os.getenv("APP_HASH_WORKERS", str(DEFAULT_WORKERS))),
+        max_queue=int(os.getenv("APP_HASH_QUEUE_LIMIT", str(DEFAULT_MAX_QUEUE))),
+    )
@@ -0,0 +1,208 @@
+"""Кольцо ключей подписи JWT из локального JWKS-файла.
+
+Ключи разбираются один раз при загрузке и хранятся готовыми объектами
+cryptography по ``kid``; на запрос остаётся только поиск в словаре.
+Файл перечитывается при смене mtime (не чаще раза в ``check_interval``),
+ошибочный файл не заменяет рабочее кольцо.
+
+Ротация: добавить новый ключ в JWKS и сделать его подписывающим, а старый
+публичный ключ оставить в файле до истечения выданных им токенов.
+
+Генерация ключа в файл:
+python -m app.core.keys generate data/jwks.json --alg EdDSA --kid 2026-10
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from jwt import PyJWK, PyJWTError
+
+logger = logging.getLogger(__name__)
+
+# Алгоритмы, которые принимаются из JWKS: только асимметричные
+SUPPORTED_ALGORITHMS = ("EdDSA", "ES256")
+DEFAULT_CHECK_INTERVAL = 1.0
+
+
+class SigningKey(NamedTuple):
+    kid: str
+    algorithm: str
+    verify_key: Any
+    sign_key: Optional[Any]
+
+
+def _parse_jwks(data: Dict[str, Any]) -> Dict[str, SigningKey]:
+    keys: Dict[str, SigningKey] = {}
+    for jwk in data.get("keys", []):
+        kid = jwk.get("kid")
+        if not kid:
+            raise ValueError("every JWKS key must have a kid")
+        if kid in keys:
+            raise ValueError(f"duplicate kid in JWKS: {kid}")
+        parsed = PyJWK(jwk)
+        if parsed.algorithm_name not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"unsupported JWKS algorithm: {parsed.algorithm_name}")
+        key = parsed.key
+        private = "d" in jwk
+        keys[kid] = SigningKey(
+            kid=kid,
+            algorithm=parsed.algorithm_name,
+            verify_key=key.public_key() if private else key,
+            sign_key=key if private else None,
+        )
+    if not keys:
+        raise ValueError("JWKS contains no keys")
+    return keys
+
+
+def _file_stamp(path: str) -> Tuple[int, int, int]:
+    # inode меняется при атомарной замене файла, mtime — при записи на месте
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class KeyRing:
+    """Ключи по kid с горячей перезагрузкой JWKS-файла.
+
+    Подписывает ключ ``signing_kid`` (или последний ключ с приватной частью).
+    ``on_reload`` вызывается после успешной перезагрузки — например, чтобы
+    сбросить кеш проверенных токенов, подписанных удалёнными ключами.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        signing_kid: Optional[str] = None,
+        check_interval: float = DEFAULT_CHECK_INTERVAL,
+        on_reload: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.path = path
+        self.signing_kid = signing_kid
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._keys: Dict[str, SigningKey] = {}
+        self._signing: Optional[SigningKey] = None
+        self._stamp: Tuple[int, int, int] = (0, 0, 0)
+        self._next_check = 0.0
+        # Первая загрузка обязана быть успешной: без ключей сервис не стартует
+        self._load(_file_stamp(path))
+
+    def verification_key(self, kid: str) -> Optional[SigningKey]:
+        self.maybe_reload()
+        return self._keys.get(kid)
+
+    def signing_key(self) -> SigningKey:
+        self.maybe_reload()
+        if self._signing is None:
+            raise RuntimeError("JWKS has no private key to sign tokens")
+        return self._signing
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": sorted(self._keys),
+            "signing_kid": self._signing.kid if self._signing else None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+    def maybe_reload(self) -> None:
+        """Перечитывает файл, если он изменился; дёшево вызывать на каждый запрос."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                stamp = _file_stamp(self.path)
+            except OSError:
+                self.reload_errors += 1
+                logger.warning("JWKS file is unavailable, keeping loaded keys")
+                return
+            if stamp == self._stamp:
+                return
+            try:
+                self._load(stamp)
+            except (OSError, ValueError, PyJWTError) as e:
+                self.reload_errors += 1
+                logger.warning("JWKS reload failed, keeping loaded keys: %s", e)
+                return
+        if self.on_reload:
+            self.on_reload()
+
+    def _load(self, stamp: Tuple[int, int, int]) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            keys = _parse_jwks(json.load(f))
+
+        if self.signing_kid is not None:
+            signing = keys.get(self.signing_kid)
+            # Иначе ошибка всплыла бы только на первом /login, ответом 500
+            if signing is None:
+                raise ValueError(f"signing key {self.signing_kid} is not in JWKS")
+            if signing.sign_key is None:
+                raise ValueError(f"signing key {self.signing_kid} has no private part")
+        else:
+            # Последний приватный ключ — самый свежий: generate дописывает в конец
+            private_keys = [key for key in keys.values() if key.sign_key]
+            signing = private_keys[-1] if private_keys else None
+
+        # Новое кольцо подменяется целиком: читатели видят либо старое, либо новое
+        self._keys = keys
+        self._signing = signing
+        self._stamp = stamp
+        self.reloads += 1
+
+
+def generate_key(path: str, algorithm: str, kid: str) -> None:
+    """Добавляет новый приватный ключ в JWKS-файл (файл создаётся при отсутствии)."""
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+    from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+    if algorithm == "EdDSA":
+        jwk = json.loads(OKPAlgorithm.to_jwk(ed25519.Ed25519PrivateKey.generate()))
+    elif algorithm == "ES256":
+        jwk = json.loads(ECAlgorithm.to_jwk(ec.generate_private_key(ec.SECP256R1())))
+    else:
+        raise ValueError(f"unsupported algorithm: {algorithm}")
+    jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+
+    data: Dict[str, Any] = {"keys": []}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if any(key.get("kid") == kid for key in data["keys"]):
+        raise ValueError(f"kid already exists: {kid}")
+    data["keys"].append(jwk)
+
+    # Атомарная замена: читающий процесс не увидит наполовину записанный файл
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JWT key ring tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="add a new signing key to JWKS")
+    generate.add_argument("path")
+    generate.add_argument("--alg", choices=SUPPORTED_ALGORITHMS, default="EdDSA")
+    generate.add_argument("--kid", required=True)
+    args = parser.parse_args()
+
+    generate_key(args.path, args.alg, args.kid)
+    print(f"added {args.alg} key {args.kid} to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
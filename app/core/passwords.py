@@ -0,0 +1,184 @@
+"""Хеширование паролей: scrypt с настраиваемой стоимостью.
+
+Формат хеша (в духе PHC): ``$scrypt$ln=14,r=8,p=1$<salt>$<hash>``, соль и
+хеш — base64 без паддинга. Старые хеши (sha256 с pepper, 64 hex-символа)
+по-прежнему проверяются и заменяются новым форматом при входе.
+
+Подбор параметров под целевое время на этой машине:
+python -m app.core.passwords calibrate --target-ms 100
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from typing import NamedTuple, Optional, Tuple
+
+DEFAULT_PEPPER = "dev-pepper-change-me"
+
+SCRYPT_PREFIX = "$scrypt$"
+SALT_BYTES = 16
+HASH_BYTES = 32
+LEGACY_HASH_LENGTH = 64
+
+DEFAULT_LOG_N = 14
+DEFAULT_R = 8
+DEFAULT_P = 1
+# Верхняя граница при калибровке: 2**20 * 128 * r байт памяти на хеш
+MAX_LOG_N = 20
+
+
+class ScryptParams(NamedTuple):
+    log_n: int
+    r: int
+    p: int
+
+    def encode(self) -> str:
+        return f"ln={self.log_n},r={self.r},p={self.p}"
+
+    @classmethod
+    def decode(cls, text: str) -> "ScryptParams":
+        fields = dict(part.split("=", 1) for part in text.split(","))
+        return cls(int(fields["ln"]), int(fields["r"]), int(fields["p"]))
+
+    @property
+    def memory_bytes(self) -> int:
+        return 128 * self.r * (1 << self.log_n)
+
+
+def current_params() -> ScryptParams:
+    """Параметры из APP_SCRYPT_LOG_N / APP_SCRYPT_R / APP_SCRYPT_P."""
+    return ScryptParams(
+        int(os.getenv("APP_SCRYPT_LOG_N", str(DEFAULT_LOG_N))),
+        int(os.getenv("APP_SCRYPT_R", str(DEFAULT_R))),
+        int(os.getenv("APP_SCRYPT_P", str(DEFAULT_P))),
+    )
+
+
+def _peppered(plain_text: str) -> bytes:
+    # Pepper читается при вызове: main загружает .env уже после импорта модуля
+    pepper = os.getenv("APP_PASSWORD_PEPPER", DEFAULT_PEPPER)
+    return f"{plain_text}{pepper}".encode("utf-8")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(plain_text: str, salt: bytes, params: ScryptParams) -> bytes:
+    return hashlib.scrypt(
+        _peppered(plain_text),
+        salt=salt,
+        n=1 << params.log_n,
+        r=params.r,
+        p=params.p,
+        # Запас сверх минимально нужной памяти, иначе OpenSSL откажет
+        maxmem=2 * params.memory_bytes * params.p + 1024 * 1024,
+        dklen=HASH_BYTES,
+    )
+
+
+def _legacy_hash(plain_text: str) -> str:
+    return hashlib.sha256(_peppered(plain_text)).hexdigest()
+
+
+def hash_password(plain_text: str, params: Optional[ScryptParams] = None) -> str:
+    if not plain_text:
+        raise ValueError("Password cannot be empty")
+    params = params or current_params()
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(plain_text, salt, params)
+    return f"{SCRYPT_PREFIX}{params.encode()}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _parse(hashed_value: str) -> Tuple[ScryptParams, bytes, bytes]:
+    params_text, salt, digest = hashed_value[len(SCRYPT_PREFIX) :].split("$")
+    return ScryptParams.decode(params_text), _b64decode(salt), _b64decode(digest)
+
+
+def verify_password(plain_text: str, hashed_value: str) -> bool:
+    """Проверяет пароль против хеша в новом или старом формате."""
+    if not hashed_value or not plain_text:
+        return False
+    if hashed_value.startswith(SCRYPT_PREFIX):
+        try:
+            params, salt, expected = _parse(hashed_value)
+            actual = _scrypt(plain_text, salt, params)
+        except (KeyError, ValueError):
+            return False
+        return hmac.compare_digest(actual, expected)
+    if len(hashed_value) == LEGACY_HASH_LENGTH:
+        return hmac.compare_digest(_legacy_hash(plain_text), hashed_value)
+    return False
+
+
+def needs_rehash(hashed_value: str) -> bool:
+    """True для старого формата и для scrypt с отличными от текущих параметрами."""
+    if not hashed_value.startswith(SCRYPT_PREFIX):
+        return True
+    try:
+        return _parse(hashed_value)[0] != current_params()
+    except (KeyError, ValueError):
+        return True
+
+
+def verify_and_upgrade(
+    plain_text: str, hashed_value: str
+) -> Tuple[bool, Optional[str]]:
+    """Проверяет пароль и при необходимости сразу считает хеш с текущими
+    параметрами: обе операции идут одной задачей в пуле хеширования."""
+    if not verify_password(plain_text, hashed_value):
+        return False, None
+    if needs_rehash(hashed_value):
+        return True, hash_password(plain_text)
+    return True, None
+
+
+def measure(params: ScryptParams, rounds: int = 3) -> float:
+    """Медиана времени одного хеша в миллисекундах."""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        _scrypt("calibration-password", b"\0" * SALT_BYTES, params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate(target_ms: float, r: int = DEFAULT_R, p: int = DEFAULT_P) -> ScryptParams:
+    """Наибольший N (степень двойки), при котором хеш не дольше target_ms."""
+    best = ScryptParams(10, r, p)
+    for log_n in range(10, MAX_LOG_N + 1):
+        params = ScryptParams(log_n, r, p)
+        if measure(params) > target_ms:
+            break
+        best = params
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Password KDF tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_cmd = commands.add_parser(
+        "calibrate", help="pick scrypt parameters for a target time per hash"
+    )
+    calibrate_cmd.add_argument("--target-ms", type=float, default=100.0)
+    calibrate_cmd.add_argument("--r", type=int, default=DEFAULT_R)
+    calibrate_cmd.add_argument("--p", type=int, default=DEFAULT_P)
+    args = parser.parse_args()
+
+    params = calibrate(args.target_ms, r=args.r, p=args.p)
+    print(f"# {measure(params):.1f} ms/hash, {params.memory_bytes // 2**20} MiB")
+    print(f"APP_SCRYPT_LOG_N={params.log_n}")
+    print(f"APP_SCRYPT_R={params.r}")
+    print(f"APP_SCRYPT_P={params.p}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.revocation import RevocationUnavailable, SQLiteStateStore
+from app.src.resp import RespError, raise_errors
+
+# (jti, exp) выданного токена
+IssuedToken = Tuple[str, float]
+
+
+class RefreshFamilies:
+    """Семейства refresh-токенов с ротацией и обнаружением повторного использования.
+
+    Семейство начинается при входе; каждая ротация заменяет текущий jti
+    refresh-токена. Предъявление любого другого (уже использованного) jti
+    означает утечку: семейство удаляется целиком, а выданные в нём живые
+    access-токены возвращаются вызывающему для отзыва. Семейство живёт до
+    exp своего последнего refresh-токена.
+
+    Семейства живут в памяти процесса: refresh-токен, выданный одним воркером,
+    другой не примет, а повтор на другом воркере не будет замечен. При
+    нескольких воркерах нужен SQLiteRefreshFamilies или RedisRefreshFamilies.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self) -> None:
+        self._families: Dict[str, Dict[str, Any]] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.rotations = 0
+        self.reuse_detected = 0
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+    def start(
+        self,
+        family: str,
+        sub: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            self._purge(time.time() if now is None else now)
+            self._families[family] = {
+                "sub": sub,
+                "current": refresh,
+                "access": [access],
+            }
+            heapq.heappush(self._expiry, (refresh[1], family))
+
+    def rotate(
+        self,
+        family: str,
+        presented_jti: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> Tuple[bool, List[IssuedToken]]:
+        """Атомарно меняет текущий refresh-токен семейства.
+
+        Возвращает (успех, access-токены для отзыва): при повторном
+        использовании семейство удаляется и отзываются его access-токены.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._families.get(family)
+            if entry is None or entry["current"][1] <= now:
+                return False, []
+            if entry["current"][0] != presented_jti:
+                self.reuse_detected += 1
+                del self._families[family]
+                return False, self._live(entry["access"], now)
+
+            entry["current"] = refresh
+            entry["access"] = self._live(entry["access"], now) + [access]
+            self.rotations += 1
+            self._purge(now)
+            return True, []
+
+    def revoke(self, family: str, now: Optional[float] = None) -> List[IssuedToken]:
+        """Удаляет семейство (выход); возвращает его живые access-токены."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._families.pop(family, None)
+            return self._live(entry["access"], now) if entry else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._families.clear()
+            self._expiry.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "families": len(self._families),
+                "rotations": self.rotations,
+                "reuse_detected": self.reuse_detected,
+            }
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _live(tokens: List[IssuedToken], now: float) -> List[IssuedToken]:
+        return [token for token in tokens if token[1] > now]
+
+    def _purge(self, now: float) -> None:
+        expiry, families = self._expiry, self._families
+        while expiry and expiry[0][0] <= now:
+            exp, family = heapq.heappop(expiry)
+            entry = families.get(family)
+            if entry is None:
+                continue
+            # В куче одна запись на семейство; после ротации срок сдвигается
+            if entry["current"][1] > exp:
+                heapq.heappush(expiry, (entry["current"][1], family))
+            else:
+                del families[family]
+
+
+_FAMILIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refresh_families (
+    family TEXT PRIMARY KEY,
+    sub TEXT NOT NULL,
+    current_jti TEXT NOT NULL,
+    current_exp REAL NOT NULL,
+    access TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_refresh_families_exp
+    ON refresh_families (current_exp);
+"""
+
+
+class SQLiteRefreshFamilies(SQLiteStateStore):
+    """Семейства refresh-токенов в таблице общего файла БД.
+
+    Ротация — одна транзакция BEGIN IMMEDIATE: из двух воркеров, одновременно
+    предъявивших один jti, ротирует первый, а второй видит уже сменённый jti
+    и удаляет семейство как при утечке. Записи удаляют истёкшие семейства.
+    """
+
+    schema = _FAMILIES_SCHEMA
+
+    def __init__(self, pool: Any) -> None:
+        self.rotations = 0
+        self.reuse_detected = 0
+        super().__init__(pool)
+
+    def start(
+        self,
+        family: str,
+        sub: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> None:
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM refresh_families WHERE current_exp <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_families "
+                "(family, sub, current_jti, current_exp, access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (family, sub, refresh[0], refresh[1], _encode_tokens([access])),
+            )
+
+    def rotate(
+        self,
+        family: str,
+        presented_jti: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> Tuple[bool, List[IssuedToken]]:
+        """Семантика RefreshFamilies.rotate."""
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT current_jti, current_exp, access FROM refresh_families "
+                "WHERE family = ?",
+                (family,),
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return False, []
+            tokens = RefreshFamilies._live(_decode_tokens(row[2]), now)
+            if row[0] != presented_jti:
+                conn.execute("DELETE FROM refresh_families WHERE family = ?", (family,))
+                self.reuse_detected += 1
+                return False, tokens
+            conn.execute(
+                "UPDATE refresh_families "
+                "SET current_jti = ?, current_exp = ?, access = ? WHERE family = ?",
+                (refresh[0], refresh[1], _encode_tokens(tokens + [access]), family),
+            )
+        self.rotations += 1
+        return True, []
+
+    def revoke(self, family: str, now: Optional[float] = None) -> List[IssuedToken]:
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            row = conn.execute(
+                "DELETE FROM refresh_families WHERE family = ? RETURNING access",
+                (family,),
+            ).fetchone()
+        return RefreshFamilies._live(_decode_tokens(row[0]), now) if row else []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connection() as conn:
+            families = conn.execute("SELECT COUNT(*) FROM refresh_families").fetchone()
+        return {
+            "backend": self.name,
+            "families": int(families[0]),
+            "rotations": self.rotations,
+            "reuse_detected": self.reuse_detected,
+            "errors": self.errors,
+        }
+
+
+class RedisRefreshFamilies:
+    """Семейства refresh-токенов в Redis — общие для всех воркеров и узлов.
+
+    Семейство — hash ``<prefix><family>`` с PEXPIREAT на exp текущего
+    refresh-токена. Ротация читает hash под WATCH и пишет его в MULTI/EXEC:
+    из двух воркеров, одновременно предъявивших один jti, ротирует только
+    один, а второй видит уже сменённый jti и удаляет семейство как при утечке.
+    """
+
+    name = "redis"
+    blocking = True
+    max_retries = 32
+
+    def __init__(self, client: Any, prefix: str) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.rotations = 0
+        self.reuse_detected = 0
+        self.conflicts = 0
+        self.errors = 0
+
+    def start(
+        self,
+        family: str,
+        sub: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> None:
+        key = self.prefix + family
+        with self._connection() as conn:
+            raise_errors(
+                conn.pipeline(
+                    ("MULTI",),
+                    ("DEL", key),
+                    ("HSET", key, "sub", sub, *_encode_family(refresh, [access])),
+                    ("PEXPIREAT", key, int(refresh[1] * 1000)),
+                    ("EXEC",),
+                )
+            )
+
+    def rotate(
+        self,
+        family: str,
+        presented_jti: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: Optional[float] = None,
+    ) -> Tuple[bool, List[IssuedToken]]:
+        """Семантика RefreshFamilies.rotate; конфликт транзакции повторяется."""
+        now = time.time() if now is None else now
+        key = self.prefix + family
+        for _ in range(self.max_retries):
+            with self._connection() as conn:
+                result = self._rotate(conn, key, presented_jti, refresh, access, now)
+            if result is not None:
+                return result
+            self.conflicts += 1
+        raise RevocationUnavailable("Too many concurrent refresh token rotations")
+
+    def revoke(self, family: str, now: Optional[float] = None) -> List[IssuedToken]:
+        now = time.time() if now is None else now
+        with self._connection() as conn:
+            replies = raise_errors(
+                conn.pipeline(
+                    ("MULTI",),
+                    ("HGETALL", self.prefix + family),
+                    ("DEL", self.prefix + family),
+                    ("EXEC",),
+                )
+            )
+        entry = _decode_fields(replies[-1][0])
+        return RefreshFamilies._live(entry["access"], now) if entry else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "rotations": self.rotations,
+            "reuse_detected": self.reuse_detected,
+            "conflicts": self.conflicts,
+            "errors": self.errors,
+        }
+
+    def close(self) -> None:
+        self.client.close()
+
+    def _rotate(
+        self,
+        conn: Any,
+        key: str,
+        presented_jti: str,
+        refresh: IssuedToken,
+        access: IssuedToken,
+        now: float,
+    ) -> Optional[Tuple[bool, List[IssuedToken]]]:
+        fields = raise_errors(conn.pipeline(("WATCH", key), ("HGETALL", key)))[1]
+        entry = _decode_fields(fields)
+        if not entry or entry["current"][1] <= now:
+            conn.execute("UNWATCH")
+            return False, []
+        tokens = RefreshFamilies._live(entry["access"], now)
+        if entry["current"][0] != presented_jti:
+            commands: List[Tuple[Any, ...]] = [("MULTI",), ("DEL", key), ("EXEC",)]
+        else:
+            commands = [
+                ("MULTI",),
+                ("HSET", key, *_encode_family(refresh, tokens + [access])),
+                ("PEXPIREAT", key, int(refresh[1] * 1000)),
+                ("EXEC",),
+            ]
+        # None от EXEC — семейство изменилось после WATCH, повторяем
+        if raise_errors(conn.pipeline(*commands))[-1] is None:
+            return None
+        if entry["current"][0] != presented_jti:
+            self.reuse_detected += 1
+            return False, tokens
+        self.rotations += 1
+        return True, []
+
+    @contextmanager
+    def _connection(self) -> Iterator[Any]:
+        try:
+            with self.client.connection() as conn:
+                yield conn
+        except (OSError, RespError) as e:
+            self.errors += 1
+            raise RevocationUnavailable(f"Redis refresh token store failed: {e}") from e
+
+
+def _encode_tokens(tokens: List[IssuedToken]) -> str:
+    return ",".join(f"{jti}:{exp}" for jti, exp in tokens)
+
+
+def _decode_tokens(value: str) -> List[IssuedToken]:
+    return [_decode_token(token) for token in value.split(",") if token]
+
+
+def _decode_token(value: str) -> IssuedToken:
+    jti, _, exp = value.rpartition(":")
+    return jti, float(exp)
+
+
+def _encode_family(refresh: IssuedToken, access: List[IssuedToken]) -> List[str]:
+    """Поля hash семейства, кроме sub: текущий refresh и живые access-токены."""
+    return ["current", _encode_tokens([refresh]), "access", _encode_tokens(access)]
+
+
+def _decode_fields(fields: List[bytes]) -> Dict[str, Any]:
+    raw = dict(zip(fields[::2], fields[1::2]))
+    if not raw:
+        return {}
+    return {
+        "current": _decode_token(raw[b"current"].decode("ascii")),
+        "access": _decode_tokens(raw.get(b"access", b"").decode("ascii")),
+    }
@@ -0,0 +1,240 @@
+import heapq
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.src.resp import RespError, raise_errors
+
+DEFAULT_BUCKET_SECONDS = 60
+
+
+class RevocationUnavailable(RuntimeError):
+    """Общее хранилище отзыва не отвечает: отзыв нельзя ни проверить, ни записать."""
+
+
+class RevocationList:
+    """Отозванные jti, разложенные по корзинам времени истечения токена.
+
+    Корзина покрывает ``bucket_seconds`` секунд ``exp``; проверка смотрит
+    только в корзину своего exp, то есть стоит O(1). Корзина удаляется
+    целиком, когда истекли все токены в ней, поэтому память пропорциональна
+    числу живых отозванных токенов, а не истории отзывов.
+
+    Список живёт в памяти процесса: токен, отозванный на одном воркере,
+    остаётся действительным на остальных. При нескольких воркерах нужен
+    SQLiteRevocationList или RedisRevocationList.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS) -> None:
+        if bucket_seconds < 1:
+            raise ValueError("bucket_seconds must be positive")
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[int, Set[str]] = {}
+        self._order: List[int] = []
+        self._lock = threading.Lock()
+        self.revoked = 0
+        self.dropped_buckets = 0
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _bucket(self, exp: float) -> int:
+        return int(exp) // self.bucket_seconds
+
+    def revoke(self, jti: str, exp: float, now: Optional[float] = None) -> None:
+        """Отзывает токен до его exp; уже истёкшие токены хранить незачем."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._purge(now)
+            if exp <= now:
+                return
+            key = self._bucket(exp)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = set()
+                heapq.heappush(self._order, key)
+            if jti not in bucket:
+                bucket.add(jti)
+                self.revoked += 1
+
+    def is_revoked(self, jti: Optional[str], exp: Optional[float]) -> bool:
+        if jti is None or exp is None:
+            return False
+        bucket = self._buckets.get(self._bucket(exp))
+        return bucket is not None and jti in bucket
+
+    def purge(self, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._purge(time.time() if now is None else now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._order.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": sum(len(bucket) for bucket in self._buckets.values()),
+                "buckets": len(self._buckets),
+                "revoked": self.revoked,
+                "dropped_buckets": self.dropped_buckets,
+            }
+
+    def close(self) -> None:
+        pass
+
+    def _purge(self, now: float) -> None:
+        # Корзина [k*w, (k+1)*w) пуста по смыслу, когда now >= (k+1)*w
+        while self._order and (self._order[0] + 1) * self.bucket_seconds <= now:
+            key = heapq.heappop(self._order)
+            del self._buckets[key]
+            self.dropped_buckets += 1
+
+
+_REVOKED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    exp INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_exp ON revoked_tokens (exp);
+"""
+
+
+class SQLiteStateStore:
+    """Основа хранилищ состояния аутентификации в общем файле БД.
+
+    Ошибка SQLite поднимает RevocationUnavailable, как и ошибка Redis.
+    """
+
+    name = "sqlite"
+    blocking = True
+    schema = ""
+
+    def __init__(self, pool: Any) -> None:
+        self._pool = pool
+        self.errors = 0
+        with self._connection() as conn:
+            conn.executescript(self.schema)
+
+    def close(self) -> None:
+        self._pool.close()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            with self._pool.connection() as conn:
+                yield conn
+        except sqlite3.Error as e:
+            self.errors += 1
+            raise RevocationUnavailable(f"SQLite auth state store failed: {e}") from e
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        try:
+            with self._pool.transaction() as conn:
+                yield conn
+        except sqlite3.Error as e:
+            self.errors += 1
+            raise RevocationUnavailable(f"SQLite auth state store failed: {e}") from e
+
+
+class SQLiteRevocationList(SQLiteStateStore):
+    """Отозванные jti в таблице общего файла БД — один список на воркеры хоста.
+
+    Каждый отзыв заодно удаляет истёкшие записи по индексу exp, так что
+    таблица не растёт с историей отзывов.
+    """
+
+    schema = _REVOKED_SCHEMA
+
+    def __init__(self, pool: Any) -> None:
+        self.revoked = 0
+        super().__init__(pool)
+
+    def revoke(self, jti: str, exp: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if exp <= now:
+            return
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (int(now),))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (jti, exp) VALUES (?, ?)",
+                (jti, int(exp)),
+            )
+        self.revoked += cur.rowcount
+
+    def is_revoked(self, jti: Optional[str], exp: Optional[float]) -> bool:
+        if jti is None or exp is None:
+            return False
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE jti = ?", (jti,)
+            ).fetchone()
+        return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM revoked_tokens").fetchone()[0]
+        return {
+            "backend": self.name,
+            "entries": int(entries),
+            "revoked": self.revoked,
+            "errors": self.errors,
+        }
+
+
+class RedisRevocationList:
+    """Отозванные jti в Redis — один список на все воркеры и узлы.
+
+    Отзыв — hash ``<prefix><jti>`` с PEXPIREAT на exp токена: Redis сам
+    удаляет запись, когда токен истекает, а проверка — один EXISTS.
+    При ошибке Redis поднимается RevocationUnavailable: токен, отзыв
+    которого нельзя проверить, не принимается.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.revoked = 0
+        self.errors = 0
+
+    def revoke(self, jti: str, exp: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if exp <= now:
+            return
+        key = self.prefix + jti
+        self._execute(
+            ("MULTI",),
+            ("HSET", key, "exp", int(exp)),
+            ("PEXPIREAT", key, int(exp * 1000)),
+            ("EXEC",),
+        )
+        self.revoked += 1
+
+    def is_revoked(self, jti: Optional[str], exp: Optional[float]) -> bool:
+        if jti is None or exp is None:
+            return False
+        return bool(self._execute(("EXISTS", self.prefix + jti))[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "revoked": self.revoked, "errors": self.errors}
+
+    def close(self) -> None:
+        self.client.close()
+
+    def _execute(self, *commands: Any) -> List[Any]:
+        try:
+            with self.client.connection() as conn:
+                return raise_errors(conn.pipeline(*commands))
+        except (OSError, RespError) as e:
+            self.errors += 1
+            raise RevocationUnavailable(f"Redis revocation store failed: {e}") from e
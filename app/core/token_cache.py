@@ -0,0 +1,123 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def token_digest(token: str) -> bytes:
+    """Ключ кеша: сам токен в памяти не хранится."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenCache:
+    """LRU-кеш проверенных JWT: sha256 токена → декодированные claims.
+
+    Запись живёт не дольше ``exp`` токена: просроченная запись не отдаётся
+    и удаляется при обращении, а куча сроков позволяет вытеснять истёкшие
+    записи раньше живых. Токены без ``exp`` не кешируются.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]"
+        self._entries = OrderedDict()
+        self._expiry: List[Tuple[float, bytes]] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._decodes = 0
+        self._decode_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        digest = token_digest(token)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] <= now:
+                del self._entries[digest]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            # Копия: вызывающий код не должен менять закешированные claims
+            return dict(entry[1])
+
+    def put(
+        self,
+        token: str,
+        payload: Dict[str, Any],
+        decode_seconds: float = 0.0,
+        now: Optional[float] = None,
+    ) -> None:
+        """Сохраняет claims успешно проверенного токена и время его проверки."""
+        exp = payload.get("exp")
+        now = time.time() if now is None else now
+        with self._lock:
+            self._decodes += 1
+            self._decode_seconds += decode_seconds
+            if not isinstance(exp, (int, float)) or exp <= now:
+                return
+            digest = token_digest(token)
+            self._entries[digest] = (float(exp), dict(payload))
+            self._entries.move_to_end(digest)
+            heapq.heappush(self._expiry, (float(exp), digest))
+            self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if len(self._expiry) > 2 * self.max_entries:
+                self._compact_expiry()
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_digest(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_decode = self._decode_seconds / self._decodes if self._decodes else 0.0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_decode_ms": round(avg_decode * 1000, 4),
+                # Оценка: каждое попадание экономит одну полную проверку токена
+                "decode_ms_saved": round(self.hits * avg_decode * 1000, 3),
+            }
+
+    def _purge_expired(self, now: float) -> None:
+        expiry, entries = self._expiry, self._entries
+        while expiry and expiry[0][0] <= now:
+            exp, digest = heapq.heappop(expiry)
+            entry = entries.get(digest)
+            # В куче могут остаться устаревшие пары от перезаписанных токенов
+            if entry is not None and entry[0] == exp:
+                del entries[digest]
+                self.expired += 1
+
+    def _compact_expiry(self) -> None:
+        self._expiry = [(exp, digest) for digest, (exp, _) in self._entries.items()]
+        heapq.heapify(self._expiry)
@@ -1,48 +1,124 @@
-import hashlib
-import hmac
 import logging
 import os
+import secrets
+from contextlib import asynccontextmanager
 from contextvars import ContextVar
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import (
+    Any,
+    Container,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 from uuid import uuid4
 
-from app.core.auth import create_access_token, get_current_user
+from app.core.auth import (
+    auth_state_blocking,
+    close_auth_state,
+    get_current_user,
+    issue_token_pair,
+    key_ring_stats,
+    refresh_token_pair,
+    revocation_stats,
+    revoke_token,
+    token_cache_stats,
+)
+from app.core.hashing import HashingOverloaded, create_hashing_executor
+from app.core.passwords import hash_password, verify_and_upgrade
+from app.core.revocation import RevocationUnavailable
+from app.src.etag import if_none_match
+from app.src.journal import open_persistence
+from app.src.ndjson import (
+    LineSplitter,
+    accepts_gzip,
+    gzip_chunks,
+    iter_ndjson,
+    iter_pages,
+)
+from app.src.pagination import decode_cursor, encode_cursor, validate_limit
+from app.src.post_import import IMPORT_CHUNK_SIZE, MAX_IMPORT_LINE_BYTES, PostImporter
 from app.src.rate_limit import (
-    check_account_rate_limit,
-    check_ip_rate_limit,
-    reset_rate_limit,
+    RateLimitUnavailable,
+    check_account_rate_limit_async,
+    check_ip_rate_limit_async,
+    close_rate_limit_backend,
+    quota_rate_limit_stats,
+    rate_limit_stats,
+    reset_rate_limit_async,
+    start_rate_limit_sweeper,
+)
+from app.src.rate_limit_middleware import (
+    RateLimitMiddleware,
+    load_quota_rules,
+    rate_limit_unavailable_problem,
 )
-from app.src.rfc7807_handler import problem, safe_log
-from app.src.schemas import ItemCreate, PostCreate, PostUpdate, UserLogin, UserRegister
+from app.src.response_cache import DEFAULT_MAX_ENTRIES, ResponseCache
+from app.src.rfc7807_handler import (
+    TEXT_LOG_FORMAT,
+    configure_log_format,
+    enable_async_logging,
+    flatten_validation_errors,
+    log_queue_stats,
+    problem,
+    problem_payload,
+    safe_log,
+    stop_async_logging,
+)
+from app.src.schemas import (
+    ItemBatchCreate,
+    ItemCreate,
+    PostBatchCreate,
+    PostCreate,
+    PostUpdate,
+    TokenRefresh,
+    UserLogin,
+    UserRegister,
+    validate_tag,
+)
+from app.src.search_index import SearchIndexSync, tokenize
+from app.src.storage import create_storage
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request as StarletteRequest
+from starlette.responses import JSONResponse, StreamingResponse
 
 load_dotenv()
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 correlation_id_ctx: ContextVar[Optional[str]] = ContextVar(
     "correlation_id", default=None
 )
 
-PASSWORD_PEPPER = os.getenv("APP_PASSWORD_PEPPER", "dev-pepper-change-me")
-
-
-def hash_password(plain_text: str) -> str:
-    if not plain_text:
-        raise ValueError("Password cannot be empty")
-    payload = f"{plain_text}{PASSWORD_PEPPER}".encode("utf-8")
-    return hashlib.sha256(payload).hexdigest()
-
-
-def verify_password(plain_text: str, hashed_value: str) -> bool:
-    if not hashed_value:
-        return False
-    return hmac.compare_digest(hash_password(plain_text), hashed_value)
-
-
-def _bootstrap_users() -> Dict[str, str]:
+# Фоновая запись логов (APP_LOG_ASYNC); включаем до первых записей
+enable_async_logging()
+# Пул хеширования паролей: login/register не блокируют event loop
+_HASHER = create_hashing_executor()
+# Хеш случайного пароля для входа под несуществующим именем: проверка стоит
+# столько же, сколько для настоящего пользователя, и время ответа не выдаёт,
+# есть ли такая учётная запись
+_DUMMY_HASH = hash_password(secrets.token_urlsafe(32))
+_RATE_LIMIT_SWEEPER = start_rate_limit_sweeper()
+# Бюджеты пишущих маршрутов (APP_RATE_LIMIT_CONFIG или правила по умолчанию)
+_QUOTAS = load_quota_rules()
+
+
+def _bootstrap_users(existing: Container[str]) -> Dict[str, str]:
+    """Хеши для встроенных пользователей, которых ещё нет в хранилище.
+
+    Восстановленные из журнала или SQLite учётные записи не трогаем: иначе
+    каждый старт заново хеширует пароли, пишет их в журнал и затирает
+    сменённые или уже обновлённые хеши.
+    """
     env_map = {
         "admin": "APP_ADMIN_PASSWORD",
         "user1": "APP_USER1_PASSWORD",
@@ -57,6 +133,7 @@ def _bootstrap_users() -> Dict[str, str]:
     return {
         username: hash_password(os.getenv(env_name, ""))
         for username, env_name in env_map.items()
+        if username not in existing
     }
 
 
@@ -72,13 +149,22 @@ uvicorn_access.disabled = True
 
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    format=TEXT_LOG_FORMAT,
     force=True,  # Переопределяем существующие конфигурации
 )
+# Текст или JSON по строке на запись (APP_LOG_FORMAT)
+configure_log_format()
 logger = logging.getLogger(__name__)
 logger.addFilter(CorrelationIdFilter())
 
-app = FastAPI(title="Simple Blog Project", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown()
+
+
+app = FastAPI(title="Simple Blog Project", version="0.1.0", lifespan=lifespan)
 
 
 class CorrelationIdMiddleware(BaseHTTPMiddleware):
@@ -127,27 +213,68 @@ class PIIMaskingMiddleware(BaseHTTPMiddleware):
         return url
 
 
-class JWTMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: StarletteRequest, call_next):
-        auth_header = request.headers.get("Authorization")
-        user_id = None
+def current_user_id(request: Request) -> Optional[str]:
+    """Зависимость аутентификации: пользователь нужен только части маршрутов.
 
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header[7:]
-            user_id = get_current_user(token)
+    Bearer-токен разбирается лениво, при первом обращении, а результат
+    запоминается в ``request.state.user_id``; без валидного токена
+    используется заголовок X-User-Id. Публичные маршруты токен не разбирают.
+    """
+    if hasattr(request.state, "user_id"):
+        return request.state.user_id  # type: ignore[no-any-return]
 
-        if not user_id:
-            user_id = request.headers.get("X-User-Id")
+    user_id = token_user_id(request)
+    if not user_id:
+        user_id = request.headers.get("X-User-Id")
 
-        request.state.user_id = user_id
+    request.state.user_id = user_id
+    return user_id
+
+
+def token_user_id(request: Request) -> Optional[str]:
+    """Пользователь только из проверенного Bearer-токена, без X-User-Id.
+
+    По нему считаются бюджеты лимитера: заголовок клиент подставляет сам.
+    Результат запоминается в ``request.state.token_user_id``.
+    """
+    if hasattr(request.state, "token_user_id"):
+        return request.state.token_user_id  # type: ignore[no-any-return]
+
+    user_id = None
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        user_id = get_current_user(auth_header[7:])
+
+    request.state.token_user_id = user_id
+    return user_id
 
-        response = await call_next(request)
-        return response
+
+async def quota_principal(request: Request) -> Optional[str]:
+    """token_user_id для лимитера без сетевых вызовов в цикле событий.
+
+    С общим списком отзыва (SQLite, Redis) проверка токена уходит в threadpool.
+    Если список недоступен, бюджет считается по IP, а сам запрос получит
+    503 из зависимости аутентификации.
+    """
+    try:
+        if auth_state_blocking():
+            return await run_in_threadpool(token_user_id, request)
+        return token_user_id(request)
+    except RevocationUnavailable:
+        return None
 
 
 app.add_middleware(PIIMaskingMiddleware)
+# Лимитер — сразу под CorrelationId: отказ 429 получает X-Correlation-ID,
+# но не проходит логирующий слой, обработчик и чтение тела — под атакой
+# это основная экономия; число отказов видно в /metrics
+app.add_middleware(
+    RateLimitMiddleware,
+    rules=_QUOTAS,
+    principal=quota_principal,
+    correlation_id=correlation_id_ctx.get,
+)
 app.add_middleware(CorrelationIdMiddleware)
-app.add_middleware(JWTMiddleware)
 
 
 class ApiError(Exception):
@@ -231,10 +358,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     cid = correlation_id_ctx.get()
 
-    errors = {}
-    for error in exc.errors():
-        field = ".".join(str(loc) for loc in error["loc"])
-        errors[field] = error["msg"]
+    errors = flatten_validation_errors(exc.errors())
 
     safe_log(
         logging.INFO,
@@ -253,6 +377,64 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(HashingOverloaded)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+    safe_log(
+        logging.WARNING,
+        "Password hashing queue is full",
+        correlation_id=correlation_id_ctx.get(),
+        retry_after=exc.retry_after,
+    )
+    response = problem(
+        status=503,
+        title="Service Unavailable",
+        detail=(
+            "Server is busy processing credentials. "
+            f"Please try again after {exc.retry_after} seconds."
+        ),
+        type_="https://example.com/problems/service-overloaded",
+        correlation_id=correlation_id_ctx.get(),
+        instance=str(request.url.path),
+        log_error=False,
+    )
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@app.exception_handler(RateLimitUnavailable)
+async def rate_limit_unavailable_handler(request: Request, exc: RateLimitUnavailable):
+    safe_log(
+        logging.ERROR,
+        "Rate limit backend is unavailable",
+        correlation_id=correlation_id_ctx.get(),
+        error=str(exc),
+    )
+    return rate_limit_unavailable_problem(
+        correlation_id_ctx.get(), str(request.url.path)
+    )
+
+
+@app.exception_handler(RevocationUnavailable)
+async def revocation_unavailable_handler(request: Request, exc: RevocationUnavailable):
+    safe_log(
+        logging.ERROR,
+        "Token revocation store is unavailable",
+        correlation_id=correlation_id_ctx.get(),
+        error=str(exc),
+    )
+    response = problem(
+        status=503,
+        title="Service Unavailable",
+        detail="Token revocation store is unavailable. Please try again later.",
+        type_="https://example.com/problems/service-unavailable",
+        correlation_id=correlation_id_ctx.get(),
+        instance=str(request.url.path),
+        log_error=False,
+    )
+    response.headers["Retry-After"] = "1"
+    return response
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     cid = correlation_id_ctx.get()
@@ -282,6 +464,20 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return {
+        "public_posts_cache": _PUBLIC_CACHE.stats(),
+        "token_cache": token_cache_stats(),
+        "token_revocations": revocation_stats(),
+        "jwt_keys": key_ring_stats(),
+        "password_hashing": _HASHER.stats(),
+        "rate_limit": rate_limit_stats(),
+        "quotas": {**_QUOTAS.stats(), "store": quota_rate_limit_stats()},
+        "logging": log_queue_stats(),
+    }
+
+
 MAX_ID = 2**31 - 1
 
 
@@ -306,16 +502,117 @@ def safe_increment_id(current_length: int) -> int:
     return current_length + 1
 
 
-_DB: Dict[str, List[Dict[str, Any]]] = {"items": [], "posts": []}
+_STORAGE = create_storage()
+_DB: Dict[str, Any] = {"items": _STORAGE.items, "posts": _STORAGE.posts}
+
+_PERSISTENCE = open_persistence(_STORAGE)
+if _PERSISTENCE is not None:
+    _recovery = _PERSISTENCE.recover()
+    safe_log(
+        logging.INFO,
+        "Storage recovered from snapshot and journal",
+        snapshot_seq=_recovery.snapshot_seq,
+        replayed_ops=_recovery.replayed,
+        posts=_recovery.posts,
+        elapsed_ms=round(_recovery.elapsed_seconds * 1000, 1),
+    )
+
+
+def shutdown() -> None:
+    """Корректное завершение: остановка пула хеширования и sweeper'а
+    rate limit, сброс журнала, финальный снапшот, закрытие соединений
+    хранилища и дозапись очереди логов."""
+    _HASHER.close()
+    if _RATE_LIMIT_SWEEPER is not None:
+        _RATE_LIMIT_SWEEPER.stop()
+    close_rate_limit_backend()
+    close_auth_state()
+    if _PERSISTENCE is not None:
+        _PERSISTENCE.close()
+    _STORAGE.close()
+    stop_async_logging()
+
 
 _current_user: Optional[str] = None
 
+MAX_SEARCH_QUERY_LENGTH = 200
+
+_SEARCH = SearchIndexSync(_DB["posts"])
+_VERSIONS = _STORAGE.versions
+_PUBLIC_CACHE = ResponseCache(
+    max_entries=int(os.getenv("APP_PUBLIC_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES)))
+)
+
+
+@lru_cache(maxsize=1024)
+def _validate_public_tag(tag: str) -> str:
+    # Ошибки валидации lru_cache не кеширует, поэтому кешируются только
+    # успешно нормализованные теги.
+    return validate_tag(tag)
+
+
+def on_post_changed(
+    post_id: int,
+    before: Optional[Dict[str, Any]],
+    after: Optional[Dict[str, Any]],
+) -> None:
+    """Обновляет производные структуры после записи поста.
+
+    before/after — состояние поста до и после записи (None — поста нет).
+    """
+    _SEARCH.apply(post_id, after)
+    affected = _VERSIONS.post_changed(post_id, before, after)
+    # Инвалидация только освобождает память: другие воркеры не получат её,
+    # но их записи кеша перестанут совпадать с новым тегом из хранилища
+    if affected:
+        _PUBLIC_CACHE.invalidate(affected)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def rebuild_search_index() -> None:
+    _SEARCH.rebuild()
+
+
+rebuild_search_index()
+
+
+def query_posts(
+    limit: Optional[int] = None, cursor: Optional[str] = None, **filters: Any
+) -> Dict[str, Any]:
+    """Выборка постов; при limit/cursor — keyset-страница с next_cursor."""
+    if limit is None and cursor is None:
+        posts = _DB["posts"].query(**filters)
+        return {"posts": posts, "count": len(posts)}
+
+    try:
+        page_size = validate_limit(limit)
+    except ValueError as e:
+        raise ApiError(code="invalid_limit", message=str(e), status=400)
+
+    after_id = None
+    if cursor is not None:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise ApiError(code="invalid_cursor", message=str(e), status=400)
+
+    # Берём на один пост больше, чтобы понять, есть ли следующая страница
+    posts = _DB["posts"].query(after_id=after_id, limit=page_size + 1, **filters)
+    next_cursor = None
+    if len(posts) > page_size:
+        posts = posts[:page_size]
+        next_cursor = encode_cursor(posts[-1]["id"])
+
+    return {"posts": posts, "count": len(posts), "next_cursor": next_cursor}
+
 
 @app.post("/items")
 def create_item(item: ItemCreate):
-    new_id = safe_increment_id(len(_DB["items"]))
-    item_data = {"id": new_id, "name": item.name}
-    _DB["items"].append(item_data)
+    safe_increment_id(_DB["items"].last_id)
+    item_data = _DB["items"].create({"name": item.name})
     safe_log(
         logging.INFO,
         "Item created",
@@ -328,37 +625,174 @@ def create_item(item: ItemCreate):
 @app.get("/items/{item_id}")
 def get_item(item_id: int):
     validate_id(item_id)
-    for it in _DB["items"]:
-        if it["id"] == item_id:
-            return it
+    item = _DB["items"].get(item_id)
+    if item is not None:
+        return item
     raise ApiError(code="not_found", message="item not found", status=404)
 
 
-@app.post("/posts", include_in_schema=False)
-def create_post(post: PostCreate, request: Request):
-    user_id = getattr(request.state, "user_id", None)
+def require_author(request: Request, action: str = "create posts") -> str:
+    user_id = current_user_id(request)
     if not user_id or user_id == "anonymous":
         safe_log(
             logging.WARNING,
-            "Unauthorized post creation attempt: missing or anonymous user_id",
+            "Unauthorized attempt: missing or anonymous user_id",
             correlation_id=correlation_id_ctx.get(),
+            action=action,
         )
         raise ApiError(
             code="authentication_required",
-            message="Authentication required to create posts",
+            message=f"Authentication required to {action}",
             status=401,
         )
+    return str(user_id)
 
-    new_id = safe_increment_id(len(_DB["posts"]))
-    post_data = {
-        "id": new_id,
-        "title": post.title,
-        "body": post.body,
-        "status": post.status,
-        "tags": post.tags,
-        "user_id": user_id,
-    }
-    _DB["posts"].append(post_data)
+
+def validate_batch(
+    raw_objects: List[Dict[str, Any]], schema: Type[ModelT], instance: str
+) -> Tuple[List[Tuple[int, ModelT]], List[Optional[Dict[str, Any]]]]:
+    """Валидирует элементы пакета по одному.
+
+    Возвращает валидные элементы с их индексами и список результатов,
+    в котором для невалидных элементов уже стоит RFC 7807 problem.
+    """
+    cid = correlation_id_ctx.get()
+    valid: List[Tuple[int, ModelT]] = []
+    results: List[Optional[Dict[str, Any]]] = [None] * len(raw_objects)
+    for index, raw in enumerate(raw_objects):
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": 422,
+                "error": problem_payload(
+                    status=422,
+                    title="Validation Error",
+                    detail=flatten_validation_errors(e.errors()),
+                    type_="https://example.com/problems/validation-error",
+                    correlation_id=cid,
+                    instance=instance,
+                    extras={"index": index},
+                ),
+            }
+    return valid, results
+
+
+@app.post("/items:batch")
+def create_items_batch(batch: ItemBatchCreate, request: Request):
+    valid, results = validate_batch(batch.items, ItemCreate, request.url.path)
+    if valid:
+        safe_increment_id(_DB["items"].last_id + len(valid) - 1)
+        created = _DB["items"].create_many([{"name": item.name} for _, item in valid])
+        for (index, _), item_data in zip(valid, created):
+            results[index] = {"index": index, "status": 200, "item": item_data}
+
+    failed = len(results) - len(valid)
+    safe_log(
+        logging.INFO,
+        "Item batch processed",
+        correlation_id=correlation_id_ctx.get(),
+        created=len(valid),
+        failed=failed,
+    )
+    return {"results": results, "created": len(valid), "failed": failed}
+
+
+@app.post("/posts:batch", include_in_schema=False)
+def create_posts_batch(batch: PostBatchCreate, request: Request):
+    user_id = require_author(request)
+
+    valid, results = validate_batch(batch.posts, PostCreate, request.url.path)
+    if valid:
+        safe_increment_id(_DB["posts"].last_id + len(valid) - 1)
+        created = _DB["posts"].create_many(
+            [
+                {
+                    "title": post.title,
+                    "body": post.body,
+                    "status": post.status,
+                    "tags": post.tags,
+                    "user_id": user_id,
+                }
+                for _, post in valid
+            ]
+        )
+        for (index, _), post_data in zip(valid, created):
+            on_post_changed(post_data["id"], None, post_data)
+            results[index] = {"index": index, "status": 200, "post": post_data}
+
+    failed = len(results) - len(valid)
+    safe_log(
+        logging.INFO,
+        "Post batch processed",
+        correlation_id=correlation_id_ctx.get(),
+        created=len(valid),
+        failed=failed,
+        user_id=user_id,
+    )
+    return {"results": results, "created": len(valid), "failed": failed}
+
+
+@app.post("/posts/import", include_in_schema=False)
+async def import_posts(request: Request):
+    """Импорт постов из NDJSON-тела запроса, читаемого потоком.
+
+    Строки режутся по мере поступления, а валидация и вставка пачек идут
+    в пуле потоков, поэтому в памяти не больше одного сетевого фрагмента
+    и одной пачки постов. Ошибочные строки не прерывают импорт.
+    """
+    user_id = require_author(request, action="import posts")
+    importer = PostImporter(
+        _DB["posts"],
+        user_id,
+        on_created=lambda post: on_post_changed(post["id"], None, post),
+        max_id=MAX_ID,
+        correlation_id=correlation_id_ctx.get(),
+        instance=request.url.path,
+    )
+    splitter = LineSplitter(MAX_IMPORT_LINE_BYTES)
+
+    try:
+        lines: List[Optional[bytes]] = []
+        async for data in request.stream():
+            lines.extend(splitter.feed(data))
+            if len(lines) >= IMPORT_CHUNK_SIZE:
+                await run_in_threadpool(importer.feed, lines)
+                lines = []
+        lines.extend(splitter.close())
+        await run_in_threadpool(importer.feed, lines)
+        await run_in_threadpool(importer.flush)
+    except OverflowError as e:
+        raise ApiError(code="id_overflow", message=str(e), status=400)
+    finally:
+        safe_log(
+            logging.INFO,
+            "Post import processed",
+            correlation_id=correlation_id_ctx.get(),
+            imported=importer.imported,
+            failed=importer.failed,
+            user_id=user_id,
+        )
+
+    return importer.report()
+
+
+@app.post("/posts", include_in_schema=False)
+def create_post(post: PostCreate, request: Request):
+    user_id = require_author(request)
+
+    safe_increment_id(_DB["posts"].last_id)
+    post_data = _DB["posts"].create(
+        {
+            "title": post.title,
+            "body": post.body,
+            "status": post.status,
+            "tags": post.tags,
+            "user_id": user_id,
+        }
+    )
+    on_post_changed(post_data["id"], None, post_data)
     safe_log(
         logging.INFO,
         "Post created",
@@ -372,11 +806,13 @@ def create_post(post: PostCreate, request: Request):
 
 @app.get("/posts", include_in_schema=False)
 def list_posts(
-    request: Request, status: Optional[str] = None, tag: Optional[str] = None
+    status: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    auth_user_id: Optional[str] = Depends(current_user_id),
 ):
-    user_id = getattr(request.state, "user_id", None) or "anonymous"
-
-    posts = [p for p in _DB["posts"] if p.get("user_id") == user_id]
+    user_id = auth_user_id or "anonymous"
 
     if status:
         if status not in ["draft", "published"]:
@@ -385,56 +821,150 @@ def list_posts(
                 message="status must be 'draft' or 'published'",
                 status=400,
             )
-        posts = [p for p in posts if p.get("status") == status]
 
+    validated_tag = None
     if tag:
-        from app.src.schemas import validate_tag
-
         try:
             validated_tag = validate_tag(tag)
         except ValueError as e:
             raise ApiError(code="invalid_tag", message=str(e), status=400)
-        posts = [p for p in posts if validated_tag in p.get("tags", [])]
 
-    return {"posts": posts, "count": len(posts)}
+    return query_posts(
+        limit=limit,
+        cursor=cursor,
+        user_id=user_id,
+        status=status or None,
+        tag=validated_tag,
+    )
 
 
 @app.get("/posts/public")
-def get_public_posts(tag: Optional[str] = None):
-    posts = [p for p in _DB["posts"] if p.get("status") == "published"]
-
+def get_public_posts(
+    request: Request,
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    validated_tag = None
     if tag:
-        from app.src.schemas import validate_tag
-
         try:
-            validated_tag = validate_tag(tag)
+            validated_tag = _validate_public_tag(tag)
         except ValueError as e:
             raise ApiError(code="invalid_tag", message=str(e), status=400)
-        posts = [p for p in posts if validated_tag in p.get("tags", [])]
+
+    # Версию читаем до выборки: при гонке с записью тег может оказаться
+    # только старее содержимого, но не новее.
+    etag = _VERSIONS.public_etag(validated_tag)
+    if if_none_match(request.headers.get("If-None-Match"), etag):
+        return not_modified(etag)
+
+    cache_key = (validated_tag, limit, cursor)
+    body = _PUBLIC_CACHE.get(cache_key, etag)
+    if body is None:
+        result = query_posts(
+            limit=limit, cursor=cursor, status="published", tag=validated_tag
+        )
+        body = JSONResponse(result).body
+        _PUBLIC_CACHE.put(cache_key, validated_tag, etag, body)
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/posts/search")
+def search_posts(q: str, limit: Optional[int] = None):
+    if len(q) > MAX_SEARCH_QUERY_LENGTH:
+        raise ApiError(
+            code="invalid_query",
+            message=f"query must be at most {MAX_SEARCH_QUERY_LENGTH} characters",
+            status=400,
+        )
+    if not tokenize(q):
+        raise ApiError(
+            code="invalid_query",
+            message="query must contain at least one word",
+            status=400,
+        )
+    try:
+        page_size = validate_limit(limit)
+    except ValueError as e:
+        raise ApiError(code="invalid_limit", message=str(e), status=400)
+
+    posts = []
+    for post_id, score in _SEARCH.search(q, page_size):
+        post = _DB["posts"].get(post_id)
+        if post is not None and post.get("status") == "published":
+            posts.append({**post, "score": score})
 
     return {"posts": posts, "count": len(posts)}
 
 
+@app.get("/posts/export", include_in_schema=False)
+def export_posts(
+    request: Request, scope: str = "public", since_id: Optional[int] = None
+):
+    """NDJSON-выгрузка постов потоком: по одному посту на строку.
+
+    Посты читаются keyset-страницами по ``EXPORT_CHUNK_SIZE``, поэтому память
+    не зависит от размера выгрузки. ``since_id`` — продолжение после
+    последнего полученного id. При ``Accept-Encoding: gzip`` поток сжимается.
+    """
+    if scope == "public":
+        filters: Dict[str, Any] = {"status": "published"}
+    elif scope == "mine":
+        filters = {"user_id": require_author(request, action="export own posts")}
+    else:
+        raise ApiError(
+            code="invalid_scope",
+            message="scope must be 'public' or 'mine'",
+            status=400,
+        )
+    if since_id:
+        validate_id(since_id)
+
+    store = _DB["posts"]
+    pages = iter_pages(
+        lambda after_id, limit: store.query(after_id=after_id, limit=limit, **filters),
+        since_id=since_id,
+    )
+    chunks = iter_ndjson(pages)
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("Accept-Encoding")):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    safe_log(
+        logging.INFO,
+        "Posts export started",
+        correlation_id=correlation_id_ctx.get(),
+        scope=scope,
+        since_id=since_id,
+    )
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+
 @app.get("/posts/{post_id}", include_in_schema=False)
-def get_post(post_id: int):
+def get_post(post_id: int, request: Request, response: Response):
     validate_id(post_id)
-    for post in _DB["posts"]:
-        if post["id"] == post_id:
-            return post
+    etag = _VERSIONS.post_etag(post_id)
+    post = _DB["posts"].get(post_id)
+    if post is not None:
+        if if_none_match(request.headers.get("If-None-Match"), etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return post
     raise ApiError(code="not_found", message="post not found", status=404)
 
 
 @app.patch("/posts/{post_id}", include_in_schema=False)
-def update_post(post_id: int, post_update: PostUpdate, request: Request):
+def update_post(
+    post_id: int,
+    post_update: PostUpdate,
+    auth_user_id: Optional[str] = Depends(current_user_id),
+):
     validate_id(post_id)
-    user_id = getattr(request.state, "user_id", None) or "anonymous"
-
-    post = None
-    for p in _DB["posts"]:
-        if p["id"] == post_id:
-            post = p
-            break
+    user_id = auth_user_id or "anonymous"
 
+    post = _DB["posts"].get(post_id)
     if not post:
         raise ApiError(code="not_found", message="post not found", status=404)
 
@@ -452,14 +982,18 @@ def update_post(post_id: int, post_update: PostUpdate, request: Request):
             code="forbidden", message="You can only edit your own posts", status=403
         )
 
+    changes: Dict[str, Any] = {}
     if post_update.title is not None:
-        post["title"] = post_update.title
+        changes["title"] = post_update.title
     if post_update.body is not None:
-        post["body"] = post_update.body
+        changes["body"] = post_update.body
     if post_update.status is not None:
-        post["status"] = post_update.status
+        changes["status"] = post_update.status
     if post_update.tags is not None:
-        post["tags"] = post_update.tags
+        changes["tags"] = post_update.tags
+    before = {**post, "tags": list(post.get("tags", []))}
+    post = _DB["posts"].update(post_id, changes)
+    on_post_changed(post_id, before, post)
 
     safe_log(
         logging.INFO,
@@ -473,21 +1007,14 @@ def update_post(post_id: int, post_update: PostUpdate, request: Request):
 
 
 @app.delete("/posts/{post_id}", include_in_schema=False)
-def delete_post(post_id: int, request: Request):
+def delete_post(post_id: int, auth_user_id: Optional[str] = Depends(current_user_id)):
     validate_id(post_id)
-    user_id = getattr(request.state, "user_id", None) or "anonymous"
-
-    post_index = None
-    for i, p in enumerate(_DB["posts"]):
-        if p["id"] == post_id:
-            post_index = i
-            break
+    user_id = auth_user_id or "anonymous"
 
-    if post_index is None:
+    post = _DB["posts"].get(post_id)
+    if post is None:
         raise ApiError(code="not_found", message="post not found", status=404)
 
-    post = _DB["posts"][post_index]
-
     if post.get("user_id") != user_id:
         safe_log(
             logging.WARNING,
@@ -501,7 +1028,8 @@ def delete_post(post_id: int, request: Request):
             code="forbidden", message="You can only delete your own posts", status=403
         )
 
-    _DB["posts"].pop(post_index)
+    _DB["posts"].delete(post_id)
+    on_post_changed(post_id, post, None)
 
     safe_log(
         logging.INFO,
@@ -514,12 +1042,37 @@ def delete_post(post_id: int, request: Request):
     return {"message": "Post deleted successfully", "post_id": post_id}
 
 
-_USERS_DB: Dict[str, str] = _bootstrap_users()
+_USERS_DB: MutableMapping[str, str] = _STORAGE.users
+_USERS_DB.update(_bootstrap_users(_USERS_DB))
+# SQLite-хранилище пользователей ходит в БД: из async-обработчиков его
+# вызываем через threadpool, память процесса — прямо в event loop
+_USERS_BLOCKING = bool(getattr(_USERS_DB, "blocking", False))
+
+
+async def _user_hash(username: str) -> Optional[str]:
+    if _USERS_BLOCKING:
+        return await run_in_threadpool(_USERS_DB.get, username)
+    return _USERS_DB.get(username)
+
+
+async def _store_user_hash(username: str, password_hash: str) -> None:
+    if _USERS_BLOCKING:
+        await run_in_threadpool(_USERS_DB.__setitem__, username, password_hash)
+    else:
+        _USERS_DB[username] = password_hash
+
+
+def _replace_user_hash(username: str, expected: str, password_hash: str) -> bool:
+    """Меняет хеш, только если он всё ещё равен ``expected``."""
+    if _USERS_DB.get(username) != expected:
+        return False
+    _USERS_DB[username] = password_hash
+    return True
 
 
 @app.post("/register")
 async def register(user: UserRegister):
-    if user.username in _USERS_DB:
+    if await _user_hash(user.username) is not None:
         safe_log(
             logging.WARNING,
             "Registration attempt for existing user",
@@ -532,7 +1085,15 @@ async def register(user: UserRegister):
             status=409,
         )
 
-    _USERS_DB[user.username] = hash_password(user.password)
+    password_hash = await _HASHER.run(hash_password, user.password)
+    # Пока хеш считался, имя могли занять параллельным запросом
+    if await _user_hash(user.username) is not None:
+        raise ApiError(
+            code="user_exists",
+            message="User with this username already exists",
+            status=409,
+        )
+    await _store_user_hash(user.username, password_hash)
 
     safe_log(
         logging.INFO,
@@ -552,7 +1113,9 @@ async def register(user: UserRegister):
 async def login(request: Request, user: UserLogin):
     client_ip = request.client.host if request.client else "unknown"
 
-    ip_allowed, ip_retry_after = check_ip_rate_limit(client_ip)
+    # Общий бэкенд лимитов (mmap/redis) блокирует и уходит в пул потоков,
+    # память процесса проверяется прямо в event loop
+    ip_allowed, ip_retry_after = await check_ip_rate_limit_async(client_ip)
     if not ip_allowed:
         safe_log(
             logging.WARNING,
@@ -575,7 +1138,9 @@ async def login(request: Request, user: UserLogin):
         response.headers["Retry-After"] = str(int(ip_retry_after or 0))
         return response
 
-    account_allowed, account_retry_after = check_account_rate_limit(user.username)
+    account_allowed, account_retry_after = await check_account_rate_limit_async(
+        user.username
+    )
     if not account_allowed:
         safe_log(
             logging.WARNING,
@@ -596,8 +1161,11 @@ async def login(request: Request, user: UserLogin):
         response.headers["Retry-After"] = str(int(account_retry_after or 0))
         return response
 
-    stored_hash = _USERS_DB.get(user.username)
-    if not stored_hash or not verify_password(user.password, stored_hash):
+    stored_hash = await _user_hash(user.username)
+    verified, upgraded_hash = await _HASHER.run(
+        verify_and_upgrade, user.password, stored_hash or _DUMMY_HASH
+    )
+    if not verified or not stored_hash:
         safe_log(
             logging.WARNING,
             "Failed login attempt for user",
@@ -606,8 +1174,26 @@ async def login(request: Request, user: UserLogin):
         )
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    reset_rate_limit(client_ip)
-    reset_rate_limit(user.username)
+    # Прозрачный переход на текущий формат хеша; если хеш успели сменить
+    # параллельно (другой вход или смена пароля), не перетираем его
+    replaced = False
+    if upgraded_hash:
+        if _USERS_BLOCKING:
+            replaced = await run_in_threadpool(
+                _replace_user_hash, user.username, stored_hash, upgraded_hash
+            )
+        else:
+            replaced = _replace_user_hash(user.username, stored_hash, upgraded_hash)
+    if replaced:
+        safe_log(
+            logging.INFO,
+            "Password hash upgraded",
+            correlation_id=correlation_id_ctx.get(),
+            username=user.username,
+        )
+
+    await reset_rate_limit_async(client_ip)
+    await reset_rate_limit_async(user.username)
 
     safe_log(
         logging.INFO,
@@ -616,8 +1202,12 @@ async def login(request: Request, user: UserLogin):
         username=user.username,
     )
 
-    # Создаем JWT токен с TTL=1 час (ADR-002, NFR-01)
-    access_token = create_access_token(data={"sub": user.username})
+    # Access-токен с TTL=1 час (ADR-002, NFR-01) и refresh-токен для его
+    # продления без повторного ввода пароля
+    if auth_state_blocking():
+        tokens = await run_in_threadpool(issue_token_pair, user.username)
+    else:
+        tokens = issue_token_pair(user.username)
 
     # Логируем факт выдачи токена (для демонстрации JWT masking)
     safe_log(
@@ -630,11 +1220,51 @@ async def login(request: Request, user: UserLogin):
     return {
         "message": "Login successful",
         "username": user.username,
-        "access_token": access_token,
-        "token_type": "bearer",
+        **tokens,
     }
 
 
+@app.post("/token/refresh")
+def refresh_token(body: TokenRefresh):
+    """Новая пара токенов по refresh-токену; использованный токен гаснет."""
+    tokens = refresh_token_pair(body.refresh_token)
+    if tokens is None:
+        safe_log(
+            logging.WARNING,
+            "Refresh token rejected",
+            correlation_id=correlation_id_ctx.get(),
+        )
+        raise ApiError(
+            code="invalid_refresh_token",
+            message="Refresh token is invalid, expired or already used",
+            status=401,
+        )
+    return tokens
+
+
+@app.post("/logout")
+def logout(request: Request):
+    """Отзывает предъявленный bearer-токен до истечения его срока."""
+    auth_header = request.headers.get("Authorization") or ""
+    payload = None
+    if auth_header.startswith("Bearer "):
+        payload = revoke_token(auth_header[7:])
+    if payload is None:
+        raise ApiError(
+            code="authentication_required",
+            message="A valid bearer token is required to log out",
+            status=401,
+        )
+
+    safe_log(
+        logging.INFO,
+        "User logged out",
+        correlation_id=correlation_id_ctx.get(),
+        username=payload.get("sub"),
+    )
+    return {"message": "Logout successful"}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+from uuid import uuid4
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """Проверяет If-None-Match (слабое сравнение, RFC 9110 §13.1.2)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def affected_collections(
+    before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]
+) -> Set[Optional[str]]:
+    """Коллекции, которые меняет запись поста: None — вся лента, строка — тег."""
+    affected: Set[Optional[str]] = set()
+    for state in (before, after):
+        if state is not None and state.get("status") == "published":
+            affected.update(state.get("tags", []))
+            affected.add(None)
+    return affected
+
+
+class VersionTracker:
+    """Счётчики версий постов и публичных коллекций для сильных ETag.
+
+    В ETag входит случайная эпоха процесса: после рестарта или на другом
+    воркере счётчики начинаются заново, и старый тег не может совпасть
+    с тегом другого содержимого. Счётчики живут в памяти процесса, поэтому
+    годятся только для хранилища memory; общему хранилищу нужен трекер,
+    хранящий версии рядом с данными (SQLiteVersionTracker).
+    """
+
+    def __init__(self) -> None:
+        self.epoch = uuid4().hex[:12]
+        self._posts: Dict[int, int] = {}
+        self._public = 0
+        self._tags: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def post_etag(self, post_id: int) -> str:
+        return f'"{self.epoch}-p{post_id}.{self._posts.get(post_id, 0)}"'
+
+    def public_etag(self, tag: Optional[str] = None) -> str:
+        if tag is None:
+            return f'"{self.epoch}-c{self._public}"'
+        return f'"{self.epoch}-t{self._tags.get(tag, 0)}"'
+
+    def post_changed(
+        self,
+        post_id: int,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]],
+    ) -> Set[Optional[str]]:
+        """Учитывает запись поста: before/after — состояние до и после (None — нет).
+
+        Возвращает затронутые публичные коллекции: None — вся лента, строка — тег.
+        """
+        with self._lock:
+            if after is None:
+                self._posts.pop(post_id, None)
+            else:
+                self._posts[post_id] = self._posts.get(post_id, 0) + 1
+
+            affected = affected_collections(before, after)
+            if None in affected:
+                self._public += 1
+            self._bump_tags(tag for tag in affected if tag is not None)
+        return affected
+
+    def _bump_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._tags[tag] = self._tags.get(tag, 0) + 1
@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Item = Dict[str, Any]
+JournalHook = Callable[[str, Dict[str, Any]], None]
+
+
+class ItemStore:
+    """In-memory хранилище элементов с доступом по id за O(1)."""
+
+    def __init__(self) -> None:
+        self._items: Dict[int, Item] = {}
+        self._last_id = 0
+        self._lock = threading.RLock()
+        self._journal: Optional[JournalHook] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def lock(self) -> "threading.RLock":
+        return self._lock
+
+    def attach_journal(self, hook: Optional[JournalHook]) -> None:
+        self._journal = hook
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def get(self, item_id: int) -> Optional[Item]:
+        return self._items.get(item_id)
+
+    def create(self, fields: Dict[str, Any]) -> Item:
+        with self._lock:
+            item = {"id": self._last_id + 1, **fields}
+            self._items[item["id"]] = item
+            self._last_id = item["id"]
+            if self._journal:
+                self._journal("put", item)
+        return item
+
+    def create_many(self, fields_list: List[Dict[str, Any]]) -> List[Item]:
+        with self._lock:
+            first_id = self._last_id + 1
+            items = [
+                {"id": first_id + offset, **fields}
+                for offset, fields in enumerate(fields_list)
+            ]
+            for item in items:
+                self._put(item)
+                if self._journal:
+                    self._journal("put", item)
+        return items
+
+    def add(self, item: Item) -> Item:
+        with self._lock:
+            self._put(item)
+            if self._journal:
+                self._journal("put", item)
+        return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._last_id = 0
+            if self._journal:
+                self._journal("clear", {})
+
+    def dump(self) -> Tuple[int, List[Item]]:
+        with self._lock:
+            return self._last_id, [dict(item) for item in self._items.values()]
+
+    def restore(self, last_id: int, items: List[Item]) -> None:
+        with self._lock:
+            for item in items:
+                self._put(item)
+            self._last_id = max(self._last_id, last_id)
+
+    def replay(self, op: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if op == "put":
+                self._put(data)
+            elif op == "clear":
+                self._items.clear()
+                self._last_id = 0
+            else:
+                raise ValueError(f"unknown journal operation: {op}")
+
+    def _put(self, item: Item) -> None:
+        self._items[item["id"]] = item
+        self._last_id = max(self._last_id, item["id"])
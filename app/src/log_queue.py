@@ -0,0 +1,132 @@
+"""Асинхронная запись логов: ограниченная очередь и фоновый поток.
+
+Вызывающий поток только кладёт сырые данные записи в очередь; маскирование,
+форматирование и запись в поток вывода делает фоновый поток. Включается
+APP_LOG_ASYNC=1. При переполнении очереди (APP_LOG_QUEUE_SIZE) запись либо
+отбрасывается и учитывается в счётчике (drop, по умолчанию), либо вызывающий
+поток ждёт места (block) — тогда логи не теряются, но запрос может
+задержаться. ``close`` дописывает всё, что уже в очереди.
+"""
+
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+LOG_ASYNC_ENV = "APP_LOG_ASYNC"
+LOG_QUEUE_SIZE_ENV = "APP_LOG_QUEUE_SIZE"
+LOG_QUEUE_POLICY_ENV = "APP_LOG_QUEUE_POLICY"
+
+DEFAULT_QUEUE_SIZE = 10000
+POLICIES = ("drop", "block")
+
+_STOP = object()
+
+
+class AsyncLogQueue:
+    """Очередь записей с одним потоком-писателем, вызывающим ``emit(item)``.
+
+    ``on_dropped(count, policy)`` вызывается в потоке-писателе, когда он замечает
+    новые отброшенные записи, — чтобы потеря была видна в самом логе.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[Any], None],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        policy: str = "drop",
+        on_dropped: Optional[Callable[[int, str], None]] = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown log queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._emit = emit
+        self._on_dropped = on_dropped
+        self._reported_dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        # Проверка _closed и постановка в очередь — один шаг: иначе запись,
+        # успевшая проверить флаг до close(), встанет после маркера остановки
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, item: Any) -> bool:
+        """Ставит запись в очередь; False — запись отброшена или очередь закрыта."""
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            if self.policy == "block":
+                # Писатель разбирает очередь без этой блокировки, место найдётся
+                self._queue.put(item)
+                return True
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            return True
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает поток; повторный вызов безопасен."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Маркер остановки встаёт после всех принятых записей
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._report_dropped()
+                return
+            try:
+                self._emit(item)
+                self.written += 1
+            except Exception:
+                # Ошибка одной записи не должна останавливать писателя
+                self.errors += 1
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        dropped = self.dropped
+        if dropped != self._reported_dropped and self._on_dropped is not None:
+            self._on_dropped(dropped - self._reported_dropped, self.policy)
+            self._reported_dropped = dropped
+
+
+def create_log_queue(
+    emit: Callable[[Any], None],
+    on_dropped: Optional[Callable[[int, str], None]] = None,
+) -> Optional[AsyncLogQueue]:
+    """Очередь по APP_LOG_ASYNC / APP_LOG_QUEUE_SIZE / APP_LOG_QUEUE_POLICY."""
+    if os.getenv(LOG_ASYNC_ENV, "0").lower() not in ("1", "true", "yes"):
+        return None
+    return AsyncLogQueue(
+        emit,
+        maxsize=int(os.getenv(LOG_QUEUE_SIZE_ENV, str(DEFAULT_QUEUE_SIZE))),
+        policy=os.getenv(LOG_QUEUE_POLICY_ENV, "drop").lower(),
+        on_dropped=on_dropped,
+    )
@@ -0,0 +1,108 @@
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+EXPORT_CHUNK_SIZE = 500
+
+Page = List[Dict[str, Any]]
+
+
+def dumps_line(record: Dict[str, Any]) -> bytes:
+    return (
+        json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    ).encode("utf-8")
+
+
+def iter_pages(
+    fetch: Callable[[Optional[int], int], Page],
+    since_id: Optional[int] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[Page]:
+    """Обходит хранилище keyset-страницами: в памяти не больше одной страницы."""
+    after_id = since_id
+    while True:
+        page = fetch(after_id, chunk_size)
+        if not page:
+            return
+        yield page
+        if len(page) < chunk_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def iter_ndjson(pages: Iterable[Page]) -> Iterator[bytes]:
+    for page in pages:
+        yield b"".join(dumps_line(record) for record in page)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Потоковое gzip-сжатие: каждый фрагмент сжимается по мере поступления."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "x-gzip"):
+            continue
+        params = params.replace(" ", "")
+        if params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            return False
+        return True
+    return False
+
+
+class LineSplitter:
+    """Режет поток байтов на строки NDJSON, не накапливая больше одной строки.
+
+    Строка длиннее ``max_line_bytes`` не буферизуется целиком: вместо неё
+    возвращается ``None``, а её остаток до перевода строки отбрасывается.
+    """
+
+    def __init__(self, max_line_bytes: int) -> None:
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+        self._overflow = False
+
+    def feed(self, data: bytes) -> List[Optional[bytes]]:
+        lines: List[Optional[bytes]] = []
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if self._overflow or len(self._buffer) + end - start > self.max_line_bytes:
+                lines.append(None)
+            else:
+                self._buffer += data[start:end]
+                lines.append(bytes(self._buffer))
+            self._buffer.clear()
+            self._overflow = False
+            start = end + 1
+
+        if not self._overflow:
+            if len(self._buffer) + len(data) - start > self.max_line_bytes:
+                self._buffer.clear()
+                self._overflow = True
+            else:
+                self._buffer += data[start:]
+        return lines
+
+    def close(self) -> List[Optional[bytes]]:
+        """Возвращает последнюю строку, если поток не закончился переводом строки."""
+        if self._overflow:
+            lines: List[Optional[bytes]] = [None]
+        elif self._buffer:
+            lines = [bytes(self._buffer)]
+        else:
+            lines = []
+        self._buffer.clear()
+        self._overflow = False
+        return lines
@@ -0,0 +1,37 @@
+import base64
+import binascii
+from typing import Optional
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+_CURSOR_PREFIX = "id:"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Кодирует keyset-курсор (id последнего поста страницы) в непрозрачную строку."""
+    raw = f"{_CURSOR_PREFIX}{last_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Декодирует курсор, выданный encode_cursor. ValueError при подделке."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError):
+        raise ValueError("cursor is malformed")
+    if not raw.startswith(_CURSOR_PREFIX):
+        raise ValueError("cursor is malformed")
+    value = raw[len(_CURSOR_PREFIX) :]
+    if not value.isdigit():
+        raise ValueError("cursor is malformed")
+    return int(value)
+
+
+def validate_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
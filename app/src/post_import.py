@@ -0,0 +1,123 @@
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.src.rfc7807_handler import flatten_validation_errors, problem_payload
+from app.src.schemas import PostCreate
+from pydantic import ValidationError
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+MAX_IMPORT_LINE_BYTES = 64 * 1024
+
+VALIDATION_ERROR_TYPE = "https://example.com/problems/validation-error"
+
+# Получатель созданного поста (индексы, версии, кэш)
+CreatedHook = Callable[[Dict[str, Any]], None]
+
+
+class PostImporter:
+    """Построчный импорт постов из NDJSON: валидация PostCreate и вставка пачками.
+
+    Валидные посты копятся до ``chunk_size`` и вставляются одним
+    ``create_many`` (одно выделение id на пачку). Ошибочные строки не
+    прерывают импорт: подробно сохраняются первые ``max_errors``, остальные
+    только считаются, так что память не зависит от размера входа.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        user_id: str,
+        on_created: Optional[CreatedHook] = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        max_errors: int = MAX_IMPORT_ERRORS,
+        max_id: Optional[int] = None,
+        correlation_id: Optional[str] = None,
+        instance: Optional[str] = None,
+    ) -> None:
+        self.store = store
+        self.user_id = user_id
+        self.on_created = on_created
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.max_id = max_id
+        self.correlation_id = correlation_id
+        self.instance = instance
+        self.lines = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []
+
+    def feed(self, lines: Iterable[Optional[bytes]]) -> None:
+        """Обрабатывает очередные строки; ``None`` — строка сверх лимита длины."""
+        for raw in lines:
+            self.lines += 1
+            if raw is None:
+                self._error(f"line exceeds {MAX_IMPORT_LINE_BYTES} bytes")
+                continue
+            if not raw.strip():
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                self._error("line is not valid JSON")
+                continue
+            if not isinstance(data, dict):
+                self._error("line must be a JSON object")
+                continue
+            try:
+                post = PostCreate.model_validate(data)
+            except ValidationError as e:
+                self._error(flatten_validation_errors(e.errors()))
+                continue
+            self._pending.append(
+                {
+                    "title": post.title,
+                    "body": post.body,
+                    "status": post.status,
+                    "tags": post.tags,
+                    "user_id": self.user_id,
+                }
+            )
+            if len(self._pending) >= self.chunk_size:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        if self.max_id is not None and self.store.last_id + len(pending) > self.max_id:
+            raise OverflowError(f"ID exceeds maximum value ({self.max_id})")
+        for post in self.store.create_many(pending):
+            if self.on_created:
+                self.on_created(post)
+        self.imported += len(pending)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "lines": self.lines,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def _error(self, detail: Any) -> None:
+        self.failed += 1
+        if len(self.errors) >= self.max_errors:
+            return
+        self.errors.append(
+            {
+                "line": self.lines,
+                "error": problem_payload(
+                    status=422,
+                    title="Validation Error",
+                    detail=detail,
+                    type_=VALIDATION_ERROR_TYPE,
+                    correlation_id=self.correlation_id,
+                    instance=self.instance,
+                    extras={"line": self.lines},
+                ),
+            }
+        )
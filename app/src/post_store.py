@@ -0,0 +1,299 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Post = Dict[str, Any]
+# Получатель записей журнала: (операция, данные)
+JournalHook = Callable[[str, Dict[str, Any]], None]
+
+# Поля поста, по которым строятся вторичные индексы
+INDEXED_FIELDS = ("user_id", "status", "tags")
+
+# Сколько id индекса query копирует под блокировкой за раз
+QUERY_CHUNK = 256
+
+
+def _insert_id(ids: List[int], post_id: int) -> None:
+    # id выдаются монотонно, поэтому в общем случае достаточно append
+    if not ids or ids[-1] < post_id:
+        ids.append(post_id)
+    else:
+        insort(ids, post_id)
+
+
+def _remove_id(ids: List[int], post_id: int) -> None:
+    pos = bisect_left(ids, post_id)
+    if pos < len(ids) and ids[pos] == post_id:
+        del ids[pos]
+
+
+def _index_add(index: Dict[str, List[int]], key: str, post_id: int) -> None:
+    _insert_id(index.setdefault(key, []), post_id)
+
+
+def _index_remove(index: Dict[str, List[int]], key: str, post_id: int) -> None:
+    ids = index.get(key)
+    if not ids:
+        return
+    _remove_id(ids, post_id)
+    if not ids:
+        del index[key]
+
+
+class PostStore:
+    """In-memory хранилище постов: основной map id→post и вторичные индексы.
+
+    Индексы (по владельцу, статусу и тегу) хранят отсортированные списки id
+    и поддерживаются при создании, обновлении и удалении поста.
+    """
+
+    def __init__(self) -> None:
+        self._posts: Dict[int, Post] = {}
+        self._ids: List[int] = []
+        self._by_user: Dict[str, List[int]] = {}
+        self._by_status: Dict[str, List[int]] = {}
+        self._by_tag: Dict[str, List[int]] = {}
+        self._last_id = 0
+        self._lock = threading.RLock()
+        self._journal: Optional[JournalHook] = None
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    @property
+    def lock(self) -> "threading.RLock":
+        return self._lock
+
+    def attach_journal(self, hook: Optional[JournalHook]) -> None:
+        """Подключает журнал: каждая мутация записывается под блокировкой стора."""
+        self._journal = hook
+
+    @property
+    def last_id(self) -> int:
+        """Последний выданный id (id удалённых постов повторно не выдаются)."""
+        return self._last_id
+
+    @property
+    def change_seq(self) -> int:
+        """Журнал изменений нужен только общему хранилищу (см. SQLitePostStore)."""
+        return 0
+
+    def changes_since(self, seq: int) -> Tuple[int, Optional[List[int]]]:
+        # Все записи делает этот процесс, и индексы обновляются сразу
+        return seq, []
+
+    def get(self, post_id: int) -> Optional[Post]:
+        return self._posts.get(post_id)
+
+    def create(self, fields: Dict[str, Any]) -> Post:
+        """Выдаёт следующий id и сохраняет пост."""
+        with self._lock:
+            post = {"id": self._last_id + 1, **fields}
+            self._insert(post)
+            if self._journal:
+                self._journal("put", post)
+        return post
+
+    def create_many(self, fields_list: List[Dict[str, Any]]) -> List[Post]:
+        """Выдаёт id всему пакету одним шагом и сохраняет посты под блокировкой."""
+        with self._lock:
+            first_id = self._last_id + 1
+            posts = [
+                {"id": first_id + offset, **fields}
+                for offset, fields in enumerate(fields_list)
+            ]
+            for post in posts:
+                self._insert(post)
+                if self._journal:
+                    self._journal("put", post)
+        return posts
+
+    def add(self, post: Post) -> Post:
+        """Сохраняет пост с уже назначенным id (например, при восстановлении)."""
+        with self._lock:
+            if post["id"] in self._posts:
+                raise ValueError(f"post {post['id']} already exists")
+            self._insert(post)
+            if self._journal:
+                self._journal("put", post)
+        return post
+
+    def update(self, post_id: int, changes: Dict[str, Any]) -> Post:
+        with self._lock:
+            post = self._posts[post_id]
+            reindex = any(field in changes for field in INDEXED_FIELDS)
+            if reindex:
+                self._unindex(post)
+            post.update(changes)
+            if reindex:
+                self._index(post)
+            if self._journal:
+                self._journal("put", post)
+        return post
+
+    def delete(self, post_id: int) -> Optional[Post]:
+        with self._lock:
+            post = self._posts.pop(post_id, None)
+            if post is not None:
+                _remove_id(self._ids, post_id)
+                self._unindex(post)
+                if self._journal:
+                    self._journal("delete", {"id": post_id})
+        return post
+
+    def clear(self) -> None:
+        with self._lock:
+            self._posts.clear()
+            self._ids.clear()
+            self._by_user.clear()
+            self._by_status.clear()
+            self._by_tag.clear()
+            self._last_id = 0
+            if self._journal:
+                self._journal("clear", {})
+
+    def dump(self) -> Tuple[int, List[Post]]:
+        """Копия состояния для снапшота: (last_id, посты в порядке id)."""
+        with self._lock:
+            posts = [
+                {**self._posts[post_id], "tags": list(self._posts[post_id]["tags"])}
+                for post_id in self._ids
+            ]
+            return self._last_id, posts
+
+    def restore(self, last_id: int, posts: List[Post]) -> None:
+        """Загружает состояние из снапшота (без записи в журнал).
+
+        Снапшот хранит посты по возрастанию id, поэтому при загрузке в конец
+        индексы строятся простыми append без бинарного поиска.
+        """
+        with self._lock:
+            if posts and (not self._ids or posts[0]["id"] > self._ids[-1]):
+                self._bulk_append(posts)
+            else:
+                for post in posts:
+                    self._insert(post)
+            self._last_id = max(self._last_id, last_id)
+
+    def replay(self, op: str, data: Dict[str, Any]) -> None:
+        """Применяет запись журнала (без повторной записи в журнал)."""
+        with self._lock:
+            if op == "put":
+                existing = self._posts.get(data["id"])
+                if existing is not None:
+                    self._unindex(existing)
+                    existing.update(data)
+                    self._index(existing)
+                else:
+                    self._insert(data)
+            elif op == "delete":
+                post = self._posts.pop(data["id"], None)
+                if post is not None:
+                    _remove_id(self._ids, post["id"])
+                    self._unindex(post)
+            elif op == "clear":
+                journal, self._journal = self._journal, None
+                self.clear()
+                self._journal = journal
+            else:
+                raise ValueError(f"unknown journal operation: {op}")
+
+    def query(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        tag: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Post]:
+        """Возвращает посты, удовлетворяющие всем фильтрам, в порядке id.
+
+        Перебирается самый короткий из подходящих индексов, остальные
+        фильтры проверяются по самому посту. ``after_id`` задаёт keyset-курсор:
+        начало выборки находится бинарным поиском, поэтому глубокие страницы
+        стоят столько же, сколько первая.
+
+        Индексы читаются порциями, скопированными под блокировкой: удаление
+        сдвигает позиции в списке, и обход «живого» списка пропускал бы посты.
+        Следующая порция ищется заново по последнему просмотренному id.
+        """
+        chunk_size = max(limit, QUERY_CHUNK) if limit is not None else None
+        result: List[Post] = []
+        cursor = after_id
+        while limit is None or len(result) < limit:
+            with self._lock:
+                candidates: List[List[int]] = []
+                if user_id is not None:
+                    candidates.append(self._by_user.get(user_id, []))
+                if status is not None:
+                    candidates.append(self._by_status.get(status, []))
+                if tag is not None:
+                    candidates.append(self._by_tag.get(tag, []))
+                ids = min(candidates, key=len) if candidates else self._ids
+                start = bisect_right(ids, cursor) if cursor is not None else 0
+                end = start + chunk_size if chunk_size is not None else len(ids)
+                chunk = ids[start:end]
+            if not chunk:
+                break
+            for post_id in chunk:
+                if limit is not None and len(result) >= limit:
+                    break
+                # Пост могли удалить после копирования порции
+                post = self._posts.get(post_id)
+                if post is None:
+                    continue
+                if user_id is not None and post.get("user_id") != user_id:
+                    continue
+                if status is not None and post.get("status") != status:
+                    continue
+                if tag is not None and tag not in post.get("tags", []):
+                    continue
+                result.append(post)
+            if chunk_size is None:
+                break
+            cursor = chunk[-1]
+        return result
+
+    def _bulk_append(self, posts: List[Post]) -> None:
+        store, ids = self._posts, self._ids
+        by_user, by_status, by_tag = self._by_user, self._by_status, self._by_tag
+        previous = ids[-1] if ids else 0
+        for post in posts:
+            post_id = post["id"]
+            if post_id <= previous:
+                raise ValueError("snapshot posts must be sorted by id")
+            previous = post_id
+            store[post_id] = post
+            ids.append(post_id)
+            by_user.setdefault(post["user_id"], []).append(post_id)
+            by_status.setdefault(post["status"], []).append(post_id)
+            for tag in post["tags"]:
+                by_tag.setdefault(tag, []).append(post_id)
+        self._last_id = max(self._last_id, previous)
+
+    def _insert(self, post: Post) -> None:
+        post_id = post["id"]
+        self._posts[post_id] = post
+        self._last_id = max(self._last_id, post_id)
+        _insert_id(self._ids, post_id)
+        self._index(post)
+
+    def _index(self, post: Post) -> None:
+        post_id = post["id"]
+        user_id, status = post.get("user_id"), post.get("status")
+        if isinstance(user_id, str):
+            _index_add(self._by_user, user_id, post_id)
+        if isinstance(status, str):
+            _index_add(self._by_status, status, post_id)
+        for tag in post.get("tags", []):
+            _index_add(self._by_tag, tag, post_id)
+
+    def _unindex(self, post: Post) -> None:
+        post_id = post["id"]
+        user_id, status = post.get("user_id"), post.get("status")
+        if isinstance(user_id, str):
+            _index_remove(self._by_user, user_id, post_id)
+        if isinstance(status, str):
+            _index_remove(self._by_status, status, post_id)
+        for tag in post.get("tags", []):
+            _index_remove(self._by_tag, tag, post_id)
@@ -1,9 +1,286 @@
+import os
+import sys
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Protocol, Tuple
 
-# In-memory хранилище для rate limiting (в production использовать Redis)
-_rate_limit_store: Dict[str, Dict[str, int]] = defaultdict(dict)
+from starlette.concurrency import run_in_threadpool
+
+RATE_LIMIT_BACKEND_ENV = "APP_RATE_LIMIT_BACKEND"
+
+
+class RateLimitUnavailable(Exception):
+    """Общее хранилище лимитов недоступно: попытку нельзя ни разрешить, ни учесть."""
+
+
+class SlidingWindow:
+    """Попытки в скользящем окне: посекундные корзины [секунда, число] и их сумма.
+
+    Отклонённые попытки не записываются, поэтому корзин не больше лимита,
+    а устаревшие снимаются с головы очереди — проверка стоит O(1) амортизированно.
+    """
+
+    __slots__ = ("buckets", "total", "window")
+
+    def __init__(self, window: int) -> None:
+        self.buckets: Deque[List[int]] = deque()
+        self.total = 0
+        self.window = window
+
+    def expire(self, now: float) -> None:
+        buckets = self.buckets
+        while buckets and now - buckets[0][0] >= self.window:
+            self.total -= buckets.popleft()[1]
+
+    def record(self, second: int) -> None:
+        buckets = self.buckets
+        if buckets and buckets[-1][0] == second:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([second, 1])
+        self.total += 1
+
+    def consume(self, now: float, max_attempts: int) -> Tuple[bool, Optional[float]]:
+        """Учитывает попытку, если лимит не исчерпан; иначе — время до разблокировки."""
+        self.expire(now)
+        if self.total >= max_attempts:
+            # Время до разблокировки: когда выпадет самая старая корзина
+            if self.buckets:
+                return False, max(0, self.buckets[0][0] + self.window - now)
+            return False, self.window
+        # Записываем текущую попытку (корзина — целая секунда)
+        self.record(int(now))
+        return True, None
+
+    def idle(self, now: float) -> bool:
+        """Все попытки вышли за окно: запись ничего не ограничивает."""
+        return not self.buckets or now - self.buckets[-1][0] >= self.window
+
+
+# Приблизительная стоимость в байтах (ключ считается отдельно): запись
+# идентификатора — узел OrderedDict и словарь окон; окно — SlidingWindow, deque
+# и слот словаря; корзина — список из двух int
+_ENTRY_BYTES = sys.getsizeof({}) + 100
+_WINDOW_BYTES = sys.getsizeof(SlidingWindow(0)) + sys.getsizeof(deque()) + 50
+_BUCKET_BYTES = sys.getsizeof([0, 0]) + 2 * sys.getsizeof(2**31)
+
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_SWEEP_INTERVAL = 30.0
+# Сколько идентификаторов проверяет sweeper за один захват блокировки
+SWEEP_BATCH = 1000
+
+
+class RateLimitStore:
+    """Окна rate limit: идентификатор → {длина окна → окно}.
+
+    Все окна идентификатора лежат в одной записи, поэтому сброс после
+    успешного входа — один поиск по ключу, без обхода хранилища.
+    Число идентификаторов ограничено: при переполнении вытесняется давно
+    не использованный (LRU); фоновый sweeper удаляет окна, все попытки
+    в которых вышли за окно, и опустевшие записи.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[int, SlidingWindow]]" = OrderedDict()
+        self._key_bytes = 0
+        self.evictions = 0
+        self.swept = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._entries
+
+    def discard(self, identifier: str) -> None:
+        """Удаляет все окна идентификатора, если они есть."""
+        with self.lock:
+            self._discard(identifier)
+
+    def keys(self) -> List[str]:
+        with self.lock:
+            return list(self._entries)
+
+    def window(self, identifier: str, window: int) -> SlidingWindow:
+        """Окно идентификатора (создаётся при отсутствии); вызывать под ``lock``."""
+        entries = self._entries
+        windows = entries.get(identifier)
+        if windows is None:
+            windows = entries[identifier] = {}
+            self._key_bytes += sys.getsizeof(identifier)
+            while len(entries) > self.max_entries:
+                self._discard(next(iter(entries)))
+                self.evictions += 1
+        else:
+            entries.move_to_end(identifier)
+        state = windows.get(window)
+        if state is None:
+            state = windows[window] = SlidingWindow(window)
+        return state
+
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+            self._key_bytes = 0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Удаляет неактивные окна; возвращает число удалённых идентификаторов.
+
+        Блокировка берётся пачками по SWEEP_BATCH, чтобы не задерживать входы.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        identifiers = self.keys()
+        for start in range(0, len(identifiers), SWEEP_BATCH):
+            with self.lock:
+                for identifier in identifiers[start : start + SWEEP_BATCH]:
+                    windows = self._entries.get(identifier)
+                    if windows is None:
+                        continue
+                    for window in [w for w, st in windows.items() if st.idle(now)]:
+                        del windows[window]
+                    if not windows:
+                        self._discard(identifier)
+                        removed += 1
+        self.swept += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            windows = buckets = 0
+            for states in self._entries.values():
+                windows += len(states)
+                buckets += sum(len(state.buckets) for state in states.values())
+            return {
+                "entries": len(self._entries),
+                "windows": windows,
+                "max_entries": self.max_entries,
+                "approx_bytes": len(self._entries) * _ENTRY_BYTES
+                + self._key_bytes
+                + windows * _WINDOW_BYTES
+                + buckets * _BUCKET_BYTES,
+                "evictions": self.evictions,
+                "swept": self.swept,
+            }
+
+    def _discard(self, identifier: str) -> None:
+        if self._entries.pop(identifier, None) is not None:
+            self._key_bytes -= sys.getsizeof(identifier)
+
+
+class RateLimitSweeper:
+    """Фоновый поток, периодически удаляющий неактивные окна в хранилищах."""
+
+    def __init__(self, *stores: RateLimitStore, interval: float) -> None:
+        self.stores = stores
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rate-limit-sweeper", daemon=True
+        )
+
+    def start(self) -> "RateLimitSweeper":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for store in self.stores:
+                store.sweep()
+
+
+class RateLimitBackend(Protocol):
+    """Общий интерфейс memory-, mmap- и redis-бэкендов."""
+
+    name: str
+    blocking: bool
+
+    def check(
+        self, identifier: str, max_attempts: int, window: int, now: float
+    ) -> Tuple[bool, Optional[float]]: ...
+
+    def reset(self, identifier: str) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+    def close(self) -> None: ...
+
+
+class MemoryRateLimitBackend:
+    """Лимиты в памяти процесса: у каждого воркера uvicorn свои счётчики."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, store: RateLimitStore) -> None:
+        self.store = store
+
+    def check(
+        self, identifier: str, max_attempts: int, window: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        with self.store.lock:
+            return self.store.window(identifier, window).consume(now, max_attempts)
+
+    def reset(self, identifier: str) -> None:
+        self.store.discard(identifier)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+    def close(self) -> None:
+        pass
+
+
+def create_rate_limit_backend(
+    store: RateLimitStore, backend: str = "", namespace: str = ""
+) -> RateLimitBackend:
+    """Бэкенд по APP_RATE_LIMIT_BACKEND: memory (по умолчанию), mmap или redis.
+
+    mmap и redis делят счётчики между воркерами, поэтому лимиты точны
+    при любом их числе. ``namespace`` отделяет общие счётчики: свой
+    mmap-файл и свой префикс ключей Redis.
+    """
+    backend = (backend or os.getenv(RATE_LIMIT_BACKEND_ENV, "memory")).lower()
+
+    if backend == "memory":
+        return MemoryRateLimitBackend(store)
+
+    if backend == "mmap":
+        from app.src.rate_limit_backends import open_mmap_backend
+
+        return open_mmap_backend(namespace)
+
+    if backend == "redis":
+        from app.src.rate_limit_backends import open_redis_backend
+
+        return open_redis_backend(namespace)
+
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+# In-memory хранилище для rate limiting (используется memory-бэкендом)
+_rate_limit_store = RateLimitStore(
+    max_entries=int(os.getenv("APP_RATE_LIMIT_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)))
+)
+_backend = create_rate_limit_backend(_rate_limit_store)
+# Бюджеты пишущих маршрутов — в отдельном хранилище со своим потолком:
+# поток запросов от новых клиентов вытесняет только такие же бюджеты,
+# а не счётчики блокировки входа
+_quota_store = RateLimitStore(
+    max_entries=int(
+        os.getenv("APP_RATE_LIMIT_QUOTA_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))
+    )
+)
+_quota_backend = create_rate_limit_backend(_quota_store, namespace="quota")
 
 # Конфигурация rate limits
 MAX_ATTEMPTS_PER_IP = 5  # Максимум попыток с одного IP
@@ -16,36 +293,31 @@ LOCKOUT_SECONDS = 1800  # Блокировка на 30 минут при пре
 def check_rate_limit(
     identifier: str, max_attempts: int, window: int
 ) -> Tuple[bool, Optional[float]]:
-    now = time.time()
-    now_str = str(int(now))  # Используем целое число как ключ
-    key = f"{identifier}_{window}"
-
-    attempts = _rate_limit_store[key]
-    attempts_clean: Dict[str, int] = {}
-    for timestamp_str, count in attempts.items():
-        timestamp = float(timestamp_str)
-        if now - timestamp < window:
-            attempts_clean[timestamp_str] = count
-
-    # Подсчитываем попытки в окне
-    total_attempts = sum(attempts_clean.values())
-
-    if total_attempts >= max_attempts:
-        # Вычисляем время до разблокировки
-        if attempts_clean:
-            oldest_timestamp_str = min(attempts_clean.keys(), key=float)
-            oldest_timestamp = float(oldest_timestamp_str)
-            unlock_time = oldest_timestamp + window
-            retry_after = max(0, unlock_time - now)
-        else:
-            retry_after = window
-        return False, retry_after
+    return _backend.check(identifier, max_attempts, window, time.time())
 
-    # Записываем текущую попытку
-    attempts[now_str] = attempts.get(now_str, 0) + 1
-    _rate_limit_store[key] = attempts
 
-    return True, None
+async def check_rate_limit_async(
+    identifier: str, max_attempts: int, window: int
+) -> Tuple[bool, Optional[float]]:
+    """То же для ASGI-кода: общий бэкенд (mmap/redis) блокирует, поэтому
+    уходит в пул потоков; память процесса проверяется прямо в event loop."""
+    if _backend.blocking:
+        return await run_in_threadpool(
+            check_rate_limit, identifier, max_attempts, window
+        )
+    return check_rate_limit(identifier, max_attempts, window)
+
+
+async def check_quota_async(
+    identifier: str, max_attempts: int, window: int
+) -> Tuple[bool, Optional[float]]:
+    """Проверка бюджета маршрута в хранилище бюджетов (см. check_rate_limit_async)."""
+    backend = _quota_backend
+    if backend.blocking:
+        return await run_in_threadpool(
+            backend.check, identifier, max_attempts, window, time.time()
+        )
+    return backend.check(identifier, max_attempts, window, time.time())
 
 
 def check_ip_rate_limit(ip: str) -> Tuple[bool, Optional[float]]:
@@ -58,10 +330,65 @@ def check_account_rate_limit(username: str) -> Tuple[bool, Optional[float]]:
     )
 
 
+async def check_ip_rate_limit_async(ip: str) -> Tuple[bool, Optional[float]]:
+    return await check_rate_limit_async(f"ip:{ip}", MAX_ATTEMPTS_PER_IP, WINDOW_SECONDS)
+
+
+async def check_account_rate_limit_async(
+    username: str,
+) -> Tuple[bool, Optional[float]]:
+    return await check_rate_limit_async(
+        f"account:{username}", MAX_ATTEMPTS_PER_ACCOUNT, ACCOUNT_WINDOW_SECONDS
+    )
+
+
 def reset_rate_limit(identifier: str):
-    """Сбрасывает rate limit для идентификатора (при успешной аутентификации)."""
-    for key in list(_rate_limit_store.keys()):
-        if key.startswith(f"ip:{identifier}") or key.startswith(
-            f"account:{identifier}"
-        ):
-            del _rate_limit_store[key]
+    """Сбрасывает rate limit для идентификатора (при успешной аутентификации).
+
+    Удаляются только записи ровно этого IP или аккаунта: сброс для
+    1.2.3.4 не затрагивает 1.2.3.45.
+    """
+    _backend.reset(f"ip:{identifier}")
+    _backend.reset(f"account:{identifier}")
+
+
+async def reset_rate_limit_async(identifier: str) -> None:
+    """reset_rate_limit для ASGI-кода: в пул потоков — только блокирующий бэкенд."""
+    if _backend.blocking:
+        await run_in_threadpool(reset_rate_limit, identifier)
+    else:
+        reset_rate_limit(identifier)
+
+
+def start_rate_limit_sweeper() -> Optional[RateLimitSweeper]:
+    """Запускает sweeper с периодом APP_RATE_LIMIT_SWEEP_SECONDS (0 — выключен).
+
+    Нужен только memory-бэкенду: mmap переиспользует слоты неактивных окон,
+    а в Redis записи истекают по TTL.
+    """
+    stores = [
+        backend.store
+        for backend in (_backend, _quota_backend)
+        if isinstance(backend, MemoryRateLimitBackend)
+    ]
+    if not stores:
+        return None
+    interval = float(
+        os.getenv("APP_RATE_LIMIT_SWEEP_SECONDS", str(DEFAULT_SWEEP_INTERVAL))
+    )
+    if interval <= 0:
+        return None
+    return RateLimitSweeper(*stores, interval=interval).start()
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return {"backend": _backend.name, **_backend.stats()}
+
+
+def quota_rate_limit_stats() -> Dict[str, Any]:
+    return {"backend": _quota_backend.name, **_quota_backend.stats()}
+
+
+def close_rate_limit_backend() -> None:
+    _backend.close()
+    _quota_backend.close()
@@ -0,0 +1,349 @@
+"""Общие для всех воркеров хранилища rate limit.
+
+* ``MmapRateLimitBackend`` — хеш-таблица в отображённом в память файле,
+  одна на хост; каждая проверка — чтение-изменение-запись слота под
+  ``flock``, поэтому лимит точен при любом числе процессов.
+* ``RedisRateLimitBackend`` — hash ``<prefix><identifier>`` с окнами по
+  длине окна, обновляется оптимистичной транзакцией WATCH/MULTI/EXEC;
+  конфликт повторяется, так что лишняя попытка не пройдёт ни в одном узле.
+
+Семантика окна та же, что у памяти процесса (``SlidingWindow``).
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.src.rate_limit import RateLimitUnavailable, SlidingWindow
+from app.src.resp import RespClient, RespError, raise_errors
+
+MMAP_PATH_ENV = "APP_RATE_LIMIT_MMAP_PATH"
+MMAP_SLOTS_ENV = "APP_RATE_LIMIT_MMAP_SLOTS"
+MMAP_BUCKETS_ENV = "APP_RATE_LIMIT_MMAP_BUCKETS"
+REDIS_URL_ENV = "APP_RATE_LIMIT_REDIS_URL"
+REDIS_PREFIX_ENV = "APP_RATE_LIMIT_REDIS_PREFIX"
+
+DEFAULT_MMAP_PATH = "data/rate_limit.mmap"
+DEFAULT_MMAP_SLOTS = 16384
+DEFAULT_MMAP_BUCKETS = 64
+DEFAULT_REDIS_URL = "redis://127.0.0.1:6379/0"
+DEFAULT_REDIS_PREFIX = "rate_limit:"
+
+# Заголовок файла: сигнатура, число слотов и корзин в слоте
+_MAGIC = b"RLMMAP01"
+_HEADER = struct.Struct("<8sII")
+_HEADER_SIZE = 64
+# Слот: состояние, число корзин, длина окна, digest идентификатора, last_seen
+_SLOT = struct.Struct("<BxHI16sd")
+# Корзина: секунда и число попыток в ней
+_BUCKET = struct.Struct("<qI")
+_EMPTY, _USED, _DELETED = 0, 1, 2
+# Длина пробы при открытой адресации: ключ всегда лежит не дальше от своего
+# домашнего слота, поэтому поиск и сброс стоят O(MAX_PROBE)
+MAX_PROBE = 32
+
+
+def _digest(identifier: str) -> bytes:
+    return hashlib.blake2b(identifier.encode("utf-8"), digest_size=16).digest()
+
+
+class MmapRateLimitBackend:
+    """Хеш-таблица окон фиксированного размера в файле, общая для процессов хоста.
+
+    Слот хранит до ``buckets`` посекундных корзин. Отклонённые попытки
+    не записываются, поэтому корзин не больше лимита и не больше длины
+    окна; при лимите выше ёмкости две старейшие корзины сливаются в более
+    позднюю — попытки учитываются дольше, но никогда не теряются.
+    Слоты неактивных окон переиспользуются; если вся проба занята
+    активными окнами, вытесняется давно не использованное.
+    """
+
+    name = "mmap"
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = DEFAULT_MMAP_SLOTS,
+        buckets: int = DEFAULT_MMAP_BUCKETS,
+    ) -> None:
+        if slots < 1 or buckets < 1:
+            raise ValueError("slots and buckets must be positive")
+        self.path = path
+        self.evictions = 0
+        self.merges = 0
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self.slots, self.capacity = self._init_file(slots, buckets)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._slot_size = _SLOT.size + self.capacity * _BUCKET.size
+            self.size = _HEADER_SIZE + self.slots * self._slot_size
+            self._mm = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _init_file(self, slots: int, buckets: int) -> Tuple[int, int]:
+        # Геометрию задаёт первый процесс; остальные берут её из заголовка
+        if os.fstat(self._fd).st_size == 0:
+            size = _HEADER_SIZE + slots * (_SLOT.size + buckets * _BUCKET.size)
+            os.ftruncate(self._fd, size)
+            os.pwrite(self._fd, _HEADER.pack(_MAGIC, slots, buckets), 0)
+            return slots, buckets
+        magic, slots, buckets = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a rate limit table")
+        return slots, buckets
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # flock общий для всех потоков процесса, поэтому сначала свой Lock
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def check(
+        self, identifier: str, max_attempts: int, window: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        digest = _digest(identifier)
+        with self._locked():
+            index, found = self._find(digest, window, now)
+            state = self._load(index) if found else SlidingWindow(window)
+            allowed, retry_after = state.consume(now, max_attempts)
+            if found or allowed:
+                self._store(index, digest, state, now)
+        return allowed, retry_after
+
+    def reset(self, identifier: str) -> None:
+        digest = _digest(identifier)
+        with self._locked():
+            for index in self._probe(digest):
+                offset = self._offset(index)
+                state, _, _, slot_digest, _ = _SLOT.unpack_from(self._mm, offset)
+                if state == _EMPTY:
+                    return
+                if state == _USED and slot_digest == digest:
+                    self._mm[offset] = _DELETED
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked():
+            used = sum(
+                self._mm[self._offset(index)] == _USED for index in range(self.slots)
+            )
+        return {
+            "entries": used,
+            "slots": self.slots,
+            "buckets_per_slot": self.capacity,
+            "approx_bytes": self.size,
+            "evictions": self.evictions,
+            "merges": self.merges,
+        }
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    def _offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * self._slot_size
+
+    def _probe(self, digest: bytes) -> Iterator[int]:
+        home = int.from_bytes(digest[:8], "little") % self.slots
+        for step in range(min(MAX_PROBE, self.slots)):
+            yield (home + step) % self.slots
+
+    def _find(self, digest: bytes, window: int, now: float) -> Tuple[int, bool]:
+        """Слот окна (found=True) или слот, куда его записать."""
+        free: Optional[int] = None
+        oldest: Optional[Tuple[float, int]] = None
+        for index in self._probe(digest):
+            offset = self._offset(index)
+            state, count, slot_window, slot_digest, last_seen = _SLOT.unpack_from(
+                self._mm, offset
+            )
+            if state == _EMPTY:
+                return (index if free is None else free), False
+            if state == _DELETED:
+                free = index if free is None else free
+                continue
+            if slot_digest == digest and slot_window == window:
+                return index, True
+            if free is None and self._idle(offset, count, slot_window, now):
+                free = index
+            if oldest is None or last_seen < oldest[0]:
+                oldest = (last_seen, index)
+        if free is not None:
+            return free, False
+        assert oldest is not None
+        self.evictions += 1
+        return oldest[1], False
+
+    def _idle(self, offset: int, count: int, window: int, now: float) -> bool:
+        if count == 0:
+            return True
+        last = offset + _SLOT.size + (count - 1) * _BUCKET.size
+        second: int = _BUCKET.unpack_from(self._mm, last)[0]
+        return now - second >= window
+
+    def _load(self, index: int) -> SlidingWindow:
+        offset = self._offset(index)
+        _, count, window, _, _ = _SLOT.unpack_from(self._mm, offset)
+        state = SlidingWindow(window)
+        start = offset + _SLOT.size
+        for second, attempts in _BUCKET.iter_unpack(
+            self._mm[start : start + count * _BUCKET.size]
+        ):
+            state.buckets.append([second, attempts])
+            state.total += attempts
+        return state
+
+    def _store(
+        self, index: int, digest: bytes, state: SlidingWindow, now: float
+    ) -> None:
+        buckets = state.buckets
+        while len(buckets) > self.capacity:
+            oldest = buckets.popleft()
+            buckets[0][1] += oldest[1]
+            self.merges += 1
+        offset = self._offset(index)
+        _SLOT.pack_into(
+            self._mm, offset, _USED, len(buckets), state.window, digest, now
+        )
+        start = offset + _SLOT.size
+        for position, (second, attempts) in enumerate(buckets):
+            _BUCKET.pack_into(
+                self._mm, start + position * _BUCKET.size, second, attempts
+            )
+
+
+def _decode_window(value: Optional[bytes], window: int) -> SlidingWindow:
+    state = SlidingWindow(window)
+    if value:
+        for bucket in value.decode("ascii").split(","):
+            second, attempts = bucket.split(":")
+            state.buckets.append([int(second), int(attempts)])
+            state.total += int(attempts)
+    return state
+
+
+def _encode_window(state: SlidingWindow) -> str:
+    return ",".join(f"{second}:{attempts}" for second, attempts in state.buckets)
+
+
+class RedisRateLimitBackend:
+    """Окна идентификатора — поля одного hash, сброс — один DEL.
+
+    Проверка читает hash под WATCH и записывает его в MULTI/EXEC: если
+    другой процесс успел изменить ключ, EXEC не выполнится и проверка
+    повторится с новыми данными. TTL ключа — до выхода последней
+    попытки из самого длинного окна.
+    """
+
+    name = "redis"
+    blocking = True
+    max_retries = 32
+
+    def __init__(self, client: RespClient, prefix: str = DEFAULT_REDIS_PREFIX) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.conflicts = 0
+        self.errors = 0
+
+    def check(
+        self, identifier: str, max_attempts: int, window: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        key = self.prefix + identifier
+        try:
+            for _ in range(self.max_retries):
+                with self.client.connection() as conn:
+                    result = self._attempt(conn, key, max_attempts, window, now)
+                if result is not None:
+                    return result
+                self.conflicts += 1
+        except (OSError, RespError) as e:
+            self.errors += 1
+            raise RateLimitUnavailable(f"Redis rate limit backend failed: {e}") from e
+        raise RateLimitUnavailable("Too many concurrent rate limit updates")
+
+    def _attempt(
+        self, conn: Any, key: str, max_attempts: int, window: int, now: float
+    ) -> Optional[Tuple[bool, Optional[float]]]:
+        fields = raise_errors(conn.pipeline(("WATCH", key), ("HGETALL", key)))[1]
+        windows = dict(zip(fields[::2], fields[1::2]))
+        field = str(window).encode("ascii")
+        state = _decode_window(windows.pop(field, None), window)
+        allowed, retry_after = state.consume(now, max_attempts)
+        if not allowed:
+            conn.execute("UNWATCH")
+            return allowed, retry_after
+
+        expire_at = state.buckets[-1][0] + window
+        idle: List[bytes] = []
+        for name, value in windows.items():
+            other = _decode_window(value, int(name))
+            if other.idle(now):
+                idle.append(name)
+            else:
+                expire_at = max(expire_at, other.buckets[-1][0] + other.window)
+        commands: List[Tuple[Any, ...]] = [
+            ("MULTI",),
+            ("HSET", key, field, _encode_window(state)),
+        ]
+        if idle:
+            commands.append(("HDEL", key, *idle))
+        commands.append(("PEXPIREAT", key, int(expire_at * 1000)))
+        commands.append(("EXEC",))
+        # None от EXEC — ключ изменился после WATCH, попытка не учтена
+        if raise_errors(conn.pipeline(*commands))[-1] is None:
+            return None
+        return allowed, retry_after
+
+    def reset(self, identifier: str) -> None:
+        try:
+            self.client.execute("DEL", self.prefix + identifier)
+        except (OSError, RespError) as e:
+            self.errors += 1
+            raise RateLimitUnavailable(f"Redis rate limit backend failed: {e}") from e
+
+    def stats(self) -> Dict[str, Any]:
+        return {"conflicts": self.conflicts, "errors": self.errors}
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def open_mmap_backend(namespace: str = "") -> MmapRateLimitBackend:
+    path = os.getenv(MMAP_PATH_ENV, DEFAULT_MMAP_PATH)
+    if namespace:
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{namespace}{ext}"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return MmapRateLimitBackend(
+        path,
+        slots=int(os.getenv(MMAP_SLOTS_ENV, str(DEFAULT_MMAP_SLOTS))),
+        buckets=int(os.getenv(MMAP_BUCKETS_ENV, str(DEFAULT_MMAP_BUCKETS))),
+    )
+
+
+def open_redis_client() -> RespClient:
+    return RespClient(os.getenv(REDIS_URL_ENV, DEFAULT_REDIS_URL))
+
+
+def open_redis_backend(namespace: str = "") -> RedisRateLimitBackend:
+    prefix = os.getenv(REDIS_PREFIX_ENV, DEFAULT_REDIS_PREFIX)
+    if namespace:
+        prefix = f"{prefix}{namespace}:"
+    return RedisRateLimitBackend(open_redis_client(), prefix=prefix)
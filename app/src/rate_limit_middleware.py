@@ -0,0 +1,278 @@
+"""ASGI-лимитер пишущих маршрутов: бюджеты по маршруту и по принципалу.
+
+Правила читаются из JSON-файла APP_RATE_LIMIT_CONFIG (без него действуют
+DEFAULT_RULES)::
+
+    {"rules": [
+        {"name": "posts-write", "methods": ["POST"], "path": "/posts",
+         "per": "principal", "limit": 120, "window": 60}
+    ]}
+
+``per``: ``ip`` — бюджет на адрес клиента, ``principal`` — на пользователя
+из проверенного токена (без него — на адрес: заголовки, которые клиент
+подставляет сам, бюджет не выбирают). Счётчики бюджетов лежат отдельно
+от счётчиков входа (см. check_quota_async). В ``path`` допускаются
+параметры ``{post_id}``. Запрос проверяется всеми подходящими правилами
+по порядку; первое исчерпанное отвечает 429. Отказ не читает тело запроса и не доходит
+до обработчика: поиск правил, счётчик и короткий JSON-ответ.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Counter,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+from app.src.rate_limit import RateLimitUnavailable, check_quota_async
+from app.src.rfc7807_handler import problem, safe_log
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RATE_LIMIT_CONFIG_ENV = "APP_RATE_LIMIT_CONFIG"
+
+# Бюджеты по умолчанию рассчитаны на живого пользователя с запасом;
+# строже — через файл конфигурации
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "register",
+        "methods": ["POST"],
+        "path": "/register",
+        "per": "ip",
+        "limit": 30,
+        "window": 60,
+    },
+    {
+        "name": "posts-write",
+        "methods": ["POST"],
+        "path": "/posts",
+        "per": "principal",
+        "limit": 120,
+        "window": 60,
+    },
+    {
+        "name": "posts-batch",
+        "methods": ["POST"],
+        "path": "/posts:batch",
+        "per": "principal",
+        "limit": 20,
+        "window": 60,
+    },
+    {
+        "name": "posts-import",
+        "methods": ["POST"],
+        "path": "/posts/import",
+        "per": "principal",
+        "limit": 10,
+        "window": 60,
+    },
+    {
+        "name": "posts-modify",
+        "methods": ["PATCH", "DELETE"],
+        "path": "/posts/{post_id}",
+        "per": "principal",
+        "limit": 120,
+        "window": 60,
+    },
+    {
+        "name": "items-write",
+        "methods": ["POST"],
+        "path": "/items",
+        "per": "ip",
+        "limit": 120,
+        "window": 60,
+    },
+    {
+        "name": "items-batch",
+        "methods": ["POST"],
+        "path": "/items:batch",
+        "per": "ip",
+        "limit": 20,
+        "window": 60,
+    },
+]
+
+PER_VALUES = ("ip", "principal")
+_PARAM = re.compile(r"\{[^/{}]+\}")
+
+
+class QuotaRule(NamedTuple):
+    name: str
+    methods: Tuple[str, ...]
+    path: str
+    per: str
+    limit: int
+    window: int
+
+
+def _parse_rule(raw: Dict[str, Any]) -> QuotaRule:
+    try:
+        rule = QuotaRule(
+            name=str(raw["name"]),
+            methods=tuple(str(m).upper() for m in raw["methods"]),
+            path=str(raw["path"]),
+            per=str(raw.get("per", "principal")),
+            limit=int(raw["limit"]),
+            window=int(raw["window"]),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"invalid rate limit rule {raw!r}: {e}") from e
+    if not rule.methods or not rule.path.startswith("/"):
+        raise ValueError(f"rate limit rule {rule.name} needs methods and a path")
+    if rule.per not in PER_VALUES:
+        raise ValueError(f"rate limit rule {rule.name}: per must be ip or principal")
+    if rule.limit < 0 or rule.window < 1:
+        raise ValueError(f"rate limit rule {rule.name}: bad limit or window")
+    return rule
+
+
+class QuotaRules:
+    """Правила с поиском по (метод, путь): точные пути — словарём,
+    пути с параметрами — короткий список регулярных выражений."""
+
+    def __init__(self, rules: List[QuotaRule]) -> None:
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("rate limit rule names must be unique")
+        self.rules = rules
+        self.rejections: Counter[str] = Counter()
+        self._static: Dict[Tuple[str, str], List[QuotaRule]] = {}
+        self._patterns: List[Tuple[Pattern[str], QuotaRule]] = []
+        for rule in rules:
+            if _PARAM.search(rule.path):
+                parts = _PARAM.split(rule.path)
+                regex = "[^/]+".join(re.escape(part) for part in parts)
+                self._patterns.append((re.compile(regex), rule))
+            else:
+                for method in rule.methods:
+                    self._static.setdefault((method, rule.path), []).append(rule)
+
+    def match(self, method: str, path: str) -> List[QuotaRule]:
+        matched = self._static.get((method, path), [])
+        if self._patterns:
+            extra = [
+                rule
+                for regex, rule in self._patterns
+                if method in rule.methods and regex.fullmatch(path)
+            ]
+            if extra:
+                matched = matched + extra
+        return matched
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rules": len(self.rules), "rejections": dict(self.rejections)}
+
+
+def load_quota_rules(path: Optional[str] = None) -> QuotaRules:
+    """Правила из файла (аргумент или APP_RATE_LIMIT_CONFIG) или DEFAULT_RULES."""
+    path = path or os.getenv(RATE_LIMIT_CONFIG_ENV)
+    raw_rules = DEFAULT_RULES
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            raw_rules = json.load(f)["rules"]
+    return QuotaRules([_parse_rule(raw) for raw in raw_rules])
+
+
+def rate_limit_unavailable_problem(
+    correlation_id: Optional[str], instance: str
+) -> JSONResponse:
+    # Без общего счётчика попытку нельзя учесть: отказываем, а не пропускаем
+    response = problem(
+        status=503,
+        title="Service Unavailable",
+        detail="Service is temporarily unavailable. Please try again later.",
+        type_="https://example.com/problems/service-unavailable",
+        correlation_id=correlation_id,
+        instance=instance,
+        log_error=False,
+    )
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+class RateLimitMiddleware:
+    """Чистый ASGI-слой: запросы без правил проходят без накладных расходов.
+
+    ``principal`` — корутина, возвращающая только проверенную личность (``sub``
+    токена): иначе бюджет обходится сменой идентификатора в каждом запросе.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: QuotaRules,
+        principal: Callable[[Request], Awaitable[Optional[str]]],
+        correlation_id: Callable[[], Optional[str]] = lambda: None,
+    ) -> None:
+        self.app = app
+        self.rules = rules
+        self.principal = principal
+        self.correlation_id = correlation_id
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rules = self.rules.match(scope["method"], scope["path"])
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        client = scope.get("client")
+        client_key = f"ip:{client[0] if client else 'unknown'}"
+        for rule in rules:
+            key = client_key
+            if rule.per == "principal":
+                user_id = await self.principal(request)
+                if user_id:
+                    key = f"user:{user_id}"
+            try:
+                allowed, retry_after = await check_quota_async(
+                    f"quota:{rule.name}:{key}", rule.limit, rule.window
+                )
+            except RateLimitUnavailable as e:
+                safe_log(
+                    logging.ERROR,
+                    "Rate limit backend is unavailable",
+                    correlation_id=self.correlation_id(),
+                    error=str(e),
+                )
+                response = rate_limit_unavailable_problem(
+                    self.correlation_id(), scope["path"]
+                )
+                await response(scope, receive, send)
+                return
+            if not allowed:
+                self.rules.rejections[rule.name] += 1
+                await self._reject(rule, retry_after, scope)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _reject(
+        self, rule: QuotaRule, retry_after: Optional[float], scope: Scope
+    ) -> JSONResponse:
+        seconds = max(1, math.ceil(retry_after if retry_after else rule.window))
+        response = problem(
+            status=429,
+            title="Too Many Requests",
+            detail=f"Too many requests. Please try again after {seconds} seconds.",
+            type_="https://example.com/problems/rate-limit-exceeded",
+            correlation_id=self.correlation_id(),
+            instance=scope["path"],
+            extras={"quota": rule.name},
+        )
+        response.headers["Retry-After"] = str(seconds)
+        return response
@@ -0,0 +1,170 @@
+"""Минимальный клиент протокола Redis (RESP2) без внешних зависимостей.
+
+Поддерживается ровно то, что нужно общим счётчикам: команды как списки
+аргументов, конвейер (несколько команд за один обмен) и пул соединений.
+"""
+
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Sequence, Union
+from urllib.parse import urlparse
+
+DEFAULT_PORT = 6379
+DEFAULT_TIMEOUT = 1.0
+
+
+class RespError(Exception):
+    """Ошибка, которую вернул сервер (ответ ``-ERR ...``)."""
+
+
+class RespProtocolError(ConnectionError):
+    """Ответ сервера не разбирается как RESP.
+
+    Наследует ConnectionError: вызывающий код обрабатывает его так же, как
+    обрыв соединения (fail closed), а не получает 500 от голого ValueError.
+    """
+
+
+Arg = Union[str, bytes, int, float]
+
+
+def encode_command(args: Sequence[Arg]) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _parse_int(payload: bytes) -> int:
+    try:
+        return int(payload)
+    except ValueError:
+        raise RespProtocolError(f"malformed RESP integer: {payload[:32]!r}") from None
+
+
+def read_reply(stream: Any) -> Any:
+    """Читает один ответ; ошибки внутри массивов возвращаются как RespError."""
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8", "replace")
+    if kind == b"-":
+        return RespError(payload.decode("utf-8", "replace"))
+    if kind == b":":
+        return _parse_int(payload)
+    if kind == b"$":
+        length = _parse_int(payload)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("connection closed by server")
+        return data[:-2]
+    if kind == b"*":
+        count = _parse_int(payload)
+        if count < 0:
+            return None
+        return [read_reply(stream) for _ in range(count)]
+    raise RespProtocolError(f"unexpected RESP reply: {line[:32]!r}")
+
+
+def raise_errors(replies: List[Any]) -> List[Any]:
+    """Поднимает первую ошибку в ответах конвейера, включая ответы внутри EXEC."""
+    for reply in replies:
+        if isinstance(reply, RespError):
+            raise reply
+        if isinstance(reply, list):
+            raise_errors(reply)
+    return replies
+
+
+class RespConnection:
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile("rb")
+
+    def pipeline(self, *commands: Sequence[Arg]) -> List[Any]:
+        """Отправляет команды одним пакетом и возвращает ответы по порядку."""
+        self._sock.sendall(b"".join(encode_command(c) for c in commands))
+        return [read_reply(self._stream) for _ in commands]
+
+    def execute(self, *args: Arg) -> Any:
+        reply = self.pipeline(args)[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def close(self) -> None:
+        self._stream.close()
+        self._sock.close()
+
+
+class RespClient:
+    """Пул соединений к серверу из URL вида ``redis://[:password@]host:port/db``."""
+
+    def __init__(
+        self, url: str, timeout: float = DEFAULT_TIMEOUT, pool_size: int = 8
+    ) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"unsupported Redis URL scheme: {parsed.scheme}")
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or DEFAULT_PORT
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle: List[RespConnection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[RespConnection]:
+        """Соединение из пула; после любой ошибки оно закрывается, а не возвращается."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            # Состояние соединения неизвестно (например, после WATCH)
+            conn.close()
+            raise
+        self._release(conn)
+
+    def execute(self, *args: Arg) -> Any:
+        with self.connection() as conn:
+            return conn.execute(*args)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _acquire(self) -> RespConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn = RespConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password is not None:
+                conn.execute("AUTH", self.password)
+            if self.db:
+                conn.execute("SELECT", self.db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _release(self, conn: RespConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class ResponseCache:
+    """LRU-кеш сериализованных ответов, сгруппированных по тегу коллекции.
+
+    Запись хранит ETag, с которым она была построена; при чтении тег
+    сверяется с текущим, поэтому ответ, собранный параллельно с записью,
+    никогда не будет отдан после инвалидации. Кеш у каждого воркера свой;
+    при общем хранилище текущий тег берётся из общих версий, и запись на
+    другом воркере делает локальные записи промахами без явной инвалидации.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[str], str, bytes]]"
+        self._entries = OrderedDict()
+        self._by_group: Dict[Optional[str], Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, group: Optional[str], etag: str, body: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (group, etag, body)
+            self._by_group.setdefault(group, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def invalidate(self, groups: Iterable[Optional[str]]) -> None:
+        with self._lock:
+            for group in groups:
+                for key in self._by_group.pop(group, set()):
+                    self._entries.pop(key, None)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_group.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _discard(self, key: Hashable) -> None:
+        group, _, _ = self._entries.pop(key)
+        keys = self._by_group.get(group)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_group[group]
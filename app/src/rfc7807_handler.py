@@ -1,10 +1,23 @@
+import json
 import logging
+import os
 import re
-from typing import Any, Dict, Optional, Union
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import ModuleType
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
 from uuid import uuid4
 
+from app.src.log_queue import AsyncLogQueue, create_log_queue
 from starlette.responses import JSONResponse
 
+orjson: Optional[ModuleType]
+try:  # orjson ускоряет JSON-логи, но не обязателен
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
@@ -15,30 +28,138 @@ PASSWORD_PATTERN = re.compile(
 )
 
 
-def mask_pii(text: str) -> str:
-    if not text:
-        return text
+# Предпроверка: без этих фрагментов ни одна из замен ниже не сработает.
+# Замены фрагменты только убирают, но не создают новых, поэтому проверки
+# исходной строки достаточно для всей цепочки. Проверки идут от дешёвых
+# к дорогим: поиск подстрок, затем регулярные выражения.
+_SECRET_KEYWORDS = ("passw", "pwd", "secret", "token", "key")
+_SECRET_TRIGGER = re.compile(r"(?i:password|passwd|pwd|secret|token|key)\s*[:=]")
+_PHONE_TRIGGER = re.compile(r"\d{10}")
 
-    text = JWT_PATTERN.sub("JWT_TOKEN_MASKED", text)
 
-    # Маскируем пароли и секреты (после JWT, чтобы не перехватывать JWT токены)
-    text = PASSWORD_PATTERN.sub(r"\1: ***MASKED***", text)
+def _may_contain_secret(text: str) -> bool:
+    if "=" not in text and ":" not in text:
+        return False
+    # casefold сводит к ASCII все символы, которые (?i) считает равными
+    # буквам ключевых слов (например, "ſ" и знак кельвина)
+    folded = text.casefold()
+    if not any(keyword in folded for keyword in _SECRET_KEYWORDS):
+        return False
+    return _SECRET_TRIGGER.search(text) is not None
+
 
-    text = EMAIL_PATTERN.sub(
-        lambda m: f"{m.group(0)[:3]}***@{m.group(0).split('@')[1]}", text
+def _may_contain_pii(text: str) -> bool:
+    return (
+        "@" in text
+        or "eyJ" in text
+        or _may_contain_secret(text)
+        or _PHONE_TRIGGER.search(text) is not None
     )
 
-    text = PHONE_PATTERN.sub(lambda m: f"{m.group(0)[:3]}***{m.group(0)[-2:]}", text)
+
+# Короткие строки, прошедшие предпроверку (повторяющиеся адреса, пути
+# с параметрами), маскируются из кеша
+MASK_CACHE_MAX_LENGTH = 256
+MASK_CACHE_SIZE = 4096
+
+
+def _mask_email(match: re.Match[str]) -> str:
+    return f"{match.group(0)[:3]}***@{match.group(0).split('@')[1]}"
+
+
+def _mask_phone(match: re.Match[str]) -> str:
+    return f"{match.group(0)[:3]}***{match.group(0)[-2:]}"
+
+
+def _mask_passes(text: str) -> str:
+    # Те же замены в том же порядке, но только те, для которых есть фрагмент
+    if "eyJ" in text:
+        text = JWT_PATTERN.sub("JWT_TOKEN_MASKED", text)
+
+    # Маскируем пароли и секреты (после JWT, чтобы не перехватывать JWT токены)
+    if _may_contain_secret(text):
+        text = PASSWORD_PATTERN.sub(r"\1: ***MASKED***", text)
+
+    if "@" in text:
+        text = EMAIL_PATTERN.sub(_mask_email, text)
+
+    if _PHONE_TRIGGER.search(text):
+        text = PHONE_PATTERN.sub(_mask_phone, text)
 
     return text
 
 
-def safe_log(level: int, message: str, correlation_id: Optional[str] = None, **kwargs):
-    masked_message = mask_pii(message)
-    masked_kwargs = {}
+@lru_cache(maxsize=MASK_CACHE_SIZE)
+def _mask_cached(text: str) -> str:
+    return _mask_passes(text)
 
-    # Список ключей, значения которых всегда должны маскироваться
-    sensitive_keys = {
+
+def mask_pii(text: str) -> str:
+    if not text or not _may_contain_pii(text):
+        return text
+    if len(text) <= MASK_CACHE_MAX_LENGTH:
+        return _mask_cached(text)
+    return _mask_passes(text)
+
+
+LOG_FORMAT_ENV = "APP_LOG_FORMAT"
+LOG_FORMATS = ("text", "json")
+TEXT_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_log_format = "text"
+
+
+def _dumps(value: Any) -> str:
+    # Значения полей могут быть любыми (UUID, datetime, ...): пишем их через str
+    if orjson is not None:
+        data: bytes = orjson.dumps(value, default=str)
+        return data.decode("utf-8")
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Одна строка JSON на запись — для сборщиков логов без разбора регулярками."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id is not None:
+            payload["correlation_id"] = correlation_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload["fields"] = fields
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return _dumps(payload)
+
+
+def configure_log_format(log_format: Optional[str] = None) -> str:
+    """Выбирает формат (аргумент или APP_LOG_FORMAT: text|json) для safe_log
+    и обработчиков корневого логгера."""
+    global _log_format
+    env_format: str = os.getenv(LOG_FORMAT_ENV, "text")
+    selected = (log_format or env_format).lower()
+    if selected not in LOG_FORMATS:
+        raise ValueError(f"unknown log format: {selected}")
+    formatter = (
+        JsonLogFormatter() if selected == "json" else logging.Formatter(TEXT_LOG_FORMAT)
+    )
+    for handler in logging.getLogger().handlers:
+        handler.setFormatter(formatter)
+    _log_format = selected
+    return selected
+
+
+# Список ключей, значения которых всегда должны маскироваться
+SENSITIVE_KEYS = frozenset(
+    {
         "password",
         "passwd",
         "pwd",
@@ -50,29 +171,118 @@ def safe_log(level: int, message: str, correlation_id: Optional[str] = None, **k
         "refresh_token",
         "username",
     }
+)
 
+
+def _mask_fields(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    masked_kwargs = {}
     for key, value in kwargs.items():
         if isinstance(value, str):
-            if key.lower() in sensitive_keys:
+            if key.lower() in SENSITIVE_KEYS:
                 # Для чувствительных ключей всегда маскируем значение
                 masked_kwargs[key] = "***MASKED***"
             else:
                 masked_kwargs[key] = mask_pii(value)
         else:
             masked_kwargs[key] = value
+    return masked_kwargs
+
+
+def _render(message: str, correlation_id: Optional[str], kwargs: Dict[str, Any]) -> str:
+    masked_message = mask_pii(message)
+    masked_kwargs = _mask_fields(kwargs)
 
     # Добавляем correlation_id в сообщение
     cid = correlation_id or "N/A"
     if masked_kwargs:
         kwargs_str = ", ".join(f"{k}={v}" for k, v in masked_kwargs.items())
-        full_message = f"[correlation_id={cid}] - {masked_message} - {kwargs_str}"
-    else:
-        full_message = f"[correlation_id={cid}] - {masked_message}"
+        return f"[correlation_id={cid}] - {masked_message} - {kwargs_str}"
+    return f"[correlation_id={cid}] - {masked_message}"
 
-    logger.log(level, full_message)
 
+def _prepare(
+    message: str, correlation_id: Optional[str], kwargs: Dict[str, Any]
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Текст записи и атрибуты, которые logging положит в LogRecord (extra)."""
+    if _log_format == "json":
+        # Поля остаются атрибутами записи, строку собирает JsonLogFormatter
+        extra = {
+            "correlation_id": correlation_id or "N/A",
+            "fields": _mask_fields(kwargs),
+        }
+        return mask_pii(message), extra
+    return _render(message, correlation_id, kwargs), None
 
-def problem(
+
+# Очередь асинхронной записи; None — пишем синхронно в вызывающем потоке
+_log_queue: Optional[AsyncLogQueue] = None
+
+
+def safe_log(level: int, message: str, correlation_id: Optional[str] = None, **kwargs):
+    # Отключённый уровень не маскируется, не форматируется и не занимает очередь
+    if not logger.isEnabledFor(level):
+        return
+    log_queue = _log_queue
+    if log_queue is None:
+        msg, extra = _prepare(message, correlation_id, kwargs)
+        logger.log(level, msg, extra=extra)
+        return
+    log_queue.submit((level, message, correlation_id, kwargs, time.time()))
+
+
+def _emit_deferred(item: Tuple[int, str, Optional[str], Dict[str, Any], float]) -> None:
+    level, message, correlation_id, kwargs, created = item
+    msg, extra = _prepare(message, correlation_id, kwargs)
+    record = logger.makeRecord(
+        logger.name, level, __file__, 0, msg, (), None, "safe_log", extra
+    )
+    # Время записи — момент вызова safe_log, а не момент выхода из очереди
+    record.relativeCreated -= (record.created - created) * 1000
+    record.created = created
+    record.msecs = (created - int(created)) * 1000
+    logger.handle(record)
+
+
+def _report_dropped(count: int, policy: str) -> None:
+    # Вызывается в потоке-писателе: пишем сразу, минуя очередь, но в том же
+    # формате (text/json), что и остальные записи safe_log
+    if logger.isEnabledFor(logging.WARNING):
+        fields = {"dropped": count, "policy": policy}
+        _emit_deferred((logging.WARNING, "Log queue full", None, fields, time.time()))
+
+
+def enable_async_logging() -> Optional[AsyncLogQueue]:
+    """Включает асинхронную запись, если её требует окружение (APP_LOG_ASYNC)."""
+    global _log_queue
+    if _log_queue is None:
+        _log_queue = create_log_queue(_emit_deferred, on_dropped=_report_dropped)
+    return _log_queue
+
+
+def stop_async_logging() -> None:
+    """Возвращает синхронную запись и дописывает то, что осталось в очереди."""
+    global _log_queue
+    log_queue, _log_queue = _log_queue, None
+    if log_queue is not None:
+        log_queue.close()
+
+
+def log_queue_stats() -> Dict[str, Any]:
+    log_queue = _log_queue
+    if log_queue is None:
+        return {"mode": "sync"}
+    return {"mode": "async", **log_queue.stats()}
+
+
+def flatten_validation_errors(errors: Sequence[Any]) -> Dict[str, str]:
+    flat = {}
+    for error in errors:
+        field = ".".join(str(loc) for loc in error["loc"])
+        flat[field] = error["msg"]
+    return flat
+
+
+def problem_payload(
     status: int,
     title: str,
     detail: Union[str, Dict[str, Any]],
@@ -80,8 +290,7 @@ def problem(
     correlation_id: Optional[str] = None,
     instance: Optional[str] = None,
     extras: Optional[Dict[str, Any]] = None,
-    log_error: bool = True,
-):
+) -> Dict[str, Any]:
     if correlation_id is None:
         correlation_id = str(uuid4())
 
@@ -99,16 +308,39 @@ def problem(
     if extras:
         payload.update(extras)
 
+    return payload
+
+
+def problem(
+    status: int,
+    title: str,
+    detail: Union[str, Dict[str, Any]],
+    type_: str = "about:blank",
+    correlation_id: Optional[str] = None,
+    instance: Optional[str] = None,
+    extras: Optional[Dict[str, Any]] = None,
+    log_error: bool = True,
+) -> JSONResponse:
+    # Заголовок X-Correlation-ID нужен всегда: без входящего id — новый
+    cid = correlation_id if correlation_id is not None else str(uuid4())
+    payload = problem_payload(
+        status=status,
+        title=title,
+        detail=detail,
+        type_=type_,
+        correlation_id=cid,
+        instance=instance,
+        extras=extras,
+    )
+
     if log_error and status >= 500:
         safe_log(
             logging.ERROR,
             "Internal server error",
-            correlation_id=correlation_id,
+            correlation_id=cid,
             error_title=title,
             status=status,
             instance=instance,
         )
 
-    return JSONResponse(
-        payload, status_code=status, headers={"X-Correlation-ID": correlation_id}
-    )
+    return JSONResponse(payload, status_code=status, headers={"X-Correlation-ID": cid})
@@ -1,16 +1,26 @@
 import unicodedata
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
+# Максимальное число объектов в одном batch-запросе
+MAX_BATCH_SIZE = 1000
+
+
+# Разрешённые управляющие символы; isprintable() считает их непечатаемыми
+_ALLOWED_CONTROL = str.maketrans("", "", "\n\r\t")
+
 
 def normalize_unicode(text: str) -> str:
     if not text:
         return text
     text = unicodedata.normalize("NFC", text)
-    text = "".join(
-        c for c in text if unicodedata.category(c)[0] != "C" or c in "\n\r\t "
-    )
+    # Быстрый путь: печатаемая строка не содержит символов категории C,
+    # посимвольный фильтр нужен только при их наличии
+    if not text.translate(_ALLOWED_CONTROL).isprintable():
+        text = "".join(
+            c for c in text if unicodedata.category(c)[0] != "C" or c in "\n\r\t "
+        )
     return text.strip()
 
 
@@ -86,6 +96,16 @@ class UserLogin(BaseModel):
     )
 
 
+class TokenRefresh(BaseModel):
+    """Схема для обновления пары токенов."""
+
+    refresh_token: str = Field(
+        min_length=1,
+        max_length=4096,
+        description="Refresh-токен, выданный при входе или прошлом обновлении",
+    )
+
+
 def validate_tag(tag: str) -> str:
     if not tag:
         raise ValueError("tag must not be empty")
@@ -227,3 +247,23 @@ class PostUpdate(BaseModel):
             if validated_tag not in unique_tags:
                 unique_tags.append(validated_tag)
         return unique_tags
+
+
+class PostBatchCreate(BaseModel):
+    """Пакет постов: элементы валидируются по одному схемой PostCreate."""
+
+    posts: List[Dict[str, Any]] = Field(
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description=f"Посты для создания (1-{MAX_BATCH_SIZE})",
+    )
+
+
+class ItemBatchCreate(BaseModel):
+    """Пакет элементов: элементы валидируются по одному схемой ItemCreate."""
+
+    items: List[Dict[str, Any]] = Field(
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description=f"Элементы для создания (1-{MAX_BATCH_SIZE})",
+    )
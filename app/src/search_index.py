@@ -0,0 +1,160 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.src.schemas import normalize_unicode
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Стандартные параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на термы: та же нормализация, что и при валидации постов."""
+    return TOKEN_PATTERN.findall(normalize_unicode(text).casefold())
+
+
+class SearchIndex:
+    """Инкрементальный инвертированный индекс с ранжированием BM25.
+
+    Для каждого терма хранится postings-список ``{doc_id: tf}``; добавление,
+    обновление и удаление документа затрагивают только его собственные термы.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, doc_id: int, title: str, body: str) -> None:
+        """Индексирует документ (повторный вызов заменяет старую версию)."""
+        tokens = tokenize(title) + tokenize(body)
+        counts = Counter(tokens)
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = tuple(counts)
+            self._doc_len[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._total_len = 0
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Возвращает до ``limit`` пар (doc_id, score) по убыванию релевантности."""
+        terms = set(tokenize(query))
+        with self._lock:
+            total_docs = len(self._doc_len)
+            if not terms or total_docs == 0:
+                return []
+            avg_len = self._total_len / total_docs
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self._doc_len[doc_id] / avg_len
+                    )
+                    score = idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        # Top-k через кучу: O(n log k) вместо полной сортировки
+        top = heapq.nlargest(
+            limit, scores.items(), key=lambda entry: (entry[1], -entry[0])
+        )
+        return [(doc_id, round(score, 6)) for doc_id, score in top]
+
+    def _remove(self, doc_id: int) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+
+class SearchIndexSync:
+    """Держит SearchIndex опубликованных постов в согласии с хранилищем.
+
+    Свои записи воркер применяет сразу (``apply``); записи других воркеров
+    общего хранилища индекс догоняет перед поиском (``catch_up``) по журналу
+    изменений стора, а если журнал уже обрезан — перестраивается целиком.
+    Перестройка собирает новый индекс и подменяет старый, так что поиск
+    не видит наполовину заполненный индекс.
+    """
+
+    def __init__(self, posts: Any) -> None:
+        self.posts = posts
+        self.index = SearchIndex()
+        self.seq = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+
+    def apply(self, post_id: int, post: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._apply(post_id, post)
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._rebuild()
+
+    def catch_up(self) -> None:
+        with self._lock:
+            seq, post_ids = self.posts.changes_since(self.seq)
+            if post_ids is None:
+                self._rebuild()
+                return
+            for post_id in post_ids:
+                self._apply(post_id, self.posts.get(post_id))
+            self.seq = seq
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        self.catch_up()
+        return self.index.search(query, limit)
+
+    def _apply(self, post_id: int, post: Optional[Dict[str, Any]]) -> None:
+        if post is not None and post.get("status") == "published":
+            self.index.add(post_id, post["title"], post["body"])
+        else:
+            self.index.remove(post_id)
+
+    def _rebuild(self) -> None:
+        # Позиция журнала читается до постов: изменения, попавшие между
+        # чтениями, применятся повторно при следующем catch_up
+        seq = self.posts.change_seq
+        index = SearchIndex(self.index.k1, self.index.b)
+        for post in self.posts.query(status="published"):
+            index.add(post["id"], post["title"], post["body"])
+        self.index, self.seq = index, seq
+        self.rebuilds += 1
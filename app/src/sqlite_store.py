@@ -0,0 +1,618 @@
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from app.src.etag import affected_collections
+
+Post = Dict[str, Any]
+Item = Dict[str, Any]
+
+DEFAULT_POOL_SIZE = 8
+# Сколько последних изменений постов хранится для догоняющих воркеров;
+# отставший сильнее воркер перестраивает свои индексы целиком
+CHANGE_LOG_SIZE = 10000
+POOL_TIMEOUT_SECONDS = 5.0
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    user_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_user_status ON posts (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_posts_status_id ON posts (status, id);
+
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id INTEGER NOT NULL REFERENCES posts (id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (tag, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_post_tags_post ON post_tags (post_id);
+
+-- Журнал изменений постов для индексов в памяти воркеров (поиск):
+-- post_id NULL означает очистку всех постов
+CREATE TABLE IF NOT EXISTS post_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS versions (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO versions (key, version) VALUES ('epoch', random());
+"""
+
+_BUMP_VERSION_SQL = (
+    "INSERT INTO versions (key, version) VALUES (?, 1) "
+    "ON CONFLICT (key) DO UPDATE SET version = version + 1"
+)
+_POST_COLUMNS = "p.id, p.title, p.body, p.status, p.user_id"
+_UPDATABLE_COLUMNS = ("title", "body", "status")
+
+
+def _build_select(has_user: bool, has_status: bool, has_tag: bool) -> str:
+    sql = f"SELECT {_POST_COLUMNS} FROM posts p"
+    if has_tag:
+        sql += " JOIN post_tags t ON t.post_id = p.id AND t.tag = ?"
+    conditions = ["p.id > ?"]
+    if has_user:
+        conditions.append("p.user_id = ?")
+    if has_status:
+        conditions.append("p.status = ?")
+    return sql + " WHERE " + " AND ".join(conditions) + " ORDER BY p.id LIMIT ?"
+
+
+# Все варианты SELECT собираются заранее из константных фрагментов:
+# значения фильтров всегда передаются параметрами, а sqlite3 кеширует
+# подготовленные выражения по тексту запроса.
+_SELECT_SQL: Dict[Tuple[bool, bool, bool], str] = {
+    (u, s, t): _build_select(u, s, t)
+    for u in (False, True)
+    for s in (False, True)
+    for t in (False, True)
+}
+_UPDATE_SQL: Dict[str, str] = {
+    column: f"UPDATE posts SET {column} = ? WHERE id = ?"
+    for column in _UPDATABLE_COLUMNS
+}
+
+
+class SQLiteConnectionPool:
+    """Ограниченный пул соединений SQLite в режиме WAL.
+
+    Соединения создаются лениво (не более ``size``) и выдаются потокам
+    threadpool'а FastAPI по одному; ``check_same_thread`` отключён, так как
+    соединение никогда не используется двумя потоками одновременно.
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_POOL_SIZE) -> None:
+        if size < 1:
+            raise ValueError("pool size must be positive")
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                # COMMIT тоже может упасть (SQLITE_BUSY, отложенные
+                # ограничения) и оставить транзакцию открытой
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """Возвращает соединение в пул; с незавершённой транзакцией — не
+        возвращает: откатывает, а если и откат не удался, закрывает."""
+        if conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+                return
+        self._idle.put(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise RuntimeError("SQLite connection pool exhausted")
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def _last_sequence(conn: sqlite3.Connection, table: str) -> int:
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _log_changes(conn: sqlite3.Connection, post_ids: List[Optional[int]]) -> None:
+    """Пишет изменения в журнал в транзакции самой записи и обрезает его хвост."""
+    conn.executemany(
+        "INSERT INTO post_changes (post_id) VALUES (?)",
+        [(post_id,) for post_id in post_ids],
+    )
+    conn.execute(
+        "DELETE FROM post_changes WHERE seq <= ?",
+        (_last_sequence(conn, "post_changes") - CHANGE_LOG_SIZE,),
+    )
+
+
+def _version_keys(
+    post_id: int, before: Optional[Post], after: Optional[Post]
+) -> List[str]:
+    # Версия удалённого поста тоже растёт: после clear() id может
+    # вернуться, и тег нового поста не должен совпасть со старым
+    keys = [f"p:{post_id}"]
+    keys.extend(
+        "c" if tag is None else f"t:{tag}"
+        for tag in affected_collections(before, after)
+    )
+    return keys
+
+
+def _bump_versions(
+    conn: sqlite3.Connection,
+    changes: Iterable[Tuple[int, Optional[Post], Optional[Post]]],
+) -> None:
+    """Поднимает версии ETag в транзакции самой записи.
+
+    Отдельная транзакция после записи могла не случиться (сбой, падение
+    воркера), и клиенты получали бы 304 на изменённые данные. Ключи пачки
+    собираются без повторов: лента и теги поднимаются один раз на пачку.
+    """
+    keys: Dict[str, None] = {}
+    for post_id, before, after in changes:
+        keys.update(dict.fromkeys(_version_keys(post_id, before, after)))
+    conn.executemany(_BUMP_VERSION_SQL, [(key,) for key in keys])
+
+
+class SQLitePostStore:
+    """Хранилище постов в SQLite с тем же интерфейсом, что и PostStore."""
+
+    def __init__(self, pool: SQLiteConnectionPool) -> None:
+        self._pool = pool
+
+    def __len__(self) -> int:
+        with self._pool.connection() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0])
+
+    @property
+    def last_id(self) -> int:
+        with self._pool.connection() as conn:
+            return _last_sequence(conn, "posts")
+
+    @property
+    def change_seq(self) -> int:
+        """Позиция журнала изменений: последнее записанное изменение."""
+        with self._pool.connection() as conn:
+            return _last_sequence(conn, "post_changes")
+
+    def changes_since(self, seq: int) -> Tuple[int, Optional[List[int]]]:
+        """Id постов, изменённых после позиции ``seq``, и новая позиция.
+
+        None вместо списка — изменения после ``seq`` уже вытеснены из журнала
+        или посты очищены: индекс нужно перестроить целиком.
+        """
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, post_id FROM post_changes WHERE seq > ? ORDER BY seq",
+                (seq,),
+            ).fetchall()
+        if not rows:
+            return seq, []
+        last = int(rows[-1][0])
+        if rows[0][0] != seq + 1 or any(row[1] is None for row in rows):
+            return last, None
+        return last, sorted({int(row[1]) for row in rows})
+
+    def get(self, post_id: int) -> Optional[Post]:
+        with self._pool.connection() as conn:
+            return self._get(conn, post_id)
+
+    def create(self, fields: Dict[str, Any]) -> Post:
+        with self._pool.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO posts (title, body, status, user_id) VALUES (?, ?, ?, ?)",
+                (fields["title"], fields["body"], fields["status"], fields["user_id"]),
+            )
+            post_id = int(cur.lastrowid or 0)
+            self._write_tags(conn, post_id, fields.get("tags", []))
+            post = self._to_post(post_id, fields)
+            _log_changes(conn, [post_id])
+            _bump_versions(conn, [(post_id, None, post)])
+        return post
+
+    def create_many(self, fields_list: List[Dict[str, Any]]) -> List[Post]:
+        # BEGIN IMMEDIATE держит блокировку записи, поэтому диапазон id
+        # можно выделить одним чтением sqlite_sequence.
+        with self._pool.transaction() as conn:
+            first_id = _last_sequence(conn, "posts") + 1
+            posts = [
+                self._to_post(first_id + offset, fields)
+                for offset, fields in enumerate(fields_list)
+            ]
+            conn.executemany(
+                "INSERT INTO posts (id, title, body, status, user_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (p["id"], p["title"], p["body"], p["status"], p["user_id"])
+                    for p in posts
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO post_tags (post_id, tag, position) VALUES (?, ?, ?)",
+                [
+                    (p["id"], tag, position)
+                    for p in posts
+                    for position, tag in enumerate(p["tags"])
+                ],
+            )
+            _log_changes(conn, [p["id"] for p in posts])
+            _bump_versions(conn, [(p["id"], None, p) for p in posts])
+        return posts
+
+    def add(self, post: Post) -> Post:
+        with self._pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO posts (id, title, body, status, user_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    post["id"],
+                    post["title"],
+                    post["body"],
+                    post["status"],
+                    post["user_id"],
+                ),
+            )
+            self._write_tags(conn, post["id"], post.get("tags", []))
+            _log_changes(conn, [post["id"]])
+            _bump_versions(conn, [(post["id"], None, post)])
+        return post
+
+    def update(self, post_id: int, changes: Dict[str, Any]) -> Post:
+        with self._pool.transaction() as conn:
+            before = self._get(conn, post_id)
+            if before is None:
+                raise KeyError(post_id)
+            for column in _UPDATABLE_COLUMNS:
+                if column in changes:
+                    conn.execute(_UPDATE_SQL[column], (changes[column], post_id))
+            if "tags" in changes:
+                conn.execute("DELETE FROM post_tags WHERE post_id = ?", (post_id,))
+                self._write_tags(conn, post_id, changes["tags"])
+            _log_changes(conn, [post_id])
+            post = self._get(conn, post_id)
+            _bump_versions(conn, [(post_id, before, post)])
+        assert post is not None
+        return post
+
+    def delete(self, post_id: int) -> Optional[Post]:
+        with self._pool.transaction() as conn:
+            post = self._get(conn, post_id)
+            if post is not None:
+                conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+                _log_changes(conn, [post_id])
+                _bump_versions(conn, [(post_id, post, None)])
+        return post
+
+    def clear(self) -> None:
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM posts")
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'posts'")
+            conn.execute("DELETE FROM post_changes")
+            _log_changes(conn, [None])
+            # Меняются все коллекции и все посты, чьи id теперь вернутся
+            conn.execute(
+                "UPDATE versions SET version = version + 1 WHERE key != 'epoch'"
+            )
+
+    def query(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        tag: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Post]:
+        sql = _SELECT_SQL[(user_id is not None, status is not None, tag is not None)]
+        params: List[Any] = []
+        if tag is not None:
+            params.append(tag)
+        params.append(after_id or 0)
+        if user_id is not None:
+            params.append(user_id)
+        if status is not None:
+            params.append(status)
+        # LIMIT -1 в SQLite означает «без ограничения»
+        params.append(-1 if limit is None else limit)
+
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            tags = self._read_tags(conn, [row["id"] for row in rows])
+        return [self._row_to_post(row, tags.get(row["id"], [])) for row in rows]
+
+    def _get(self, conn: sqlite3.Connection, post_id: int) -> Optional[Post]:
+        row = conn.execute(
+            f"SELECT {_POST_COLUMNS} FROM posts p WHERE p.id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._row_to_post(row, self._read_tags(conn, [post_id]).get(post_id, []))
+
+    @staticmethod
+    def _write_tags(conn: sqlite3.Connection, post_id: int, tags: List[str]) -> None:
+        conn.executemany(
+            "INSERT INTO post_tags (post_id, tag, position) VALUES (?, ?, ?)",
+            [(post_id, tag, position) for position, tag in enumerate(tags)],
+        )
+
+    @staticmethod
+    def _read_tags(
+        conn: sqlite3.Connection, post_ids: List[int]
+    ) -> Dict[int, List[str]]:
+        if not post_ids:
+            return {}
+        # json_each позволяет передать произвольный список id одним параметром
+        rows = conn.execute(
+            "SELECT post_id, tag FROM post_tags "
+            "WHERE post_id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY post_id, position",
+            (json.dumps(post_ids),),
+        ).fetchall()
+        tags: Dict[int, List[str]] = {}
+        for row in rows:
+            tags.setdefault(row["post_id"], []).append(row["tag"])
+        return tags
+
+    @staticmethod
+    def _row_to_post(row: sqlite3.Row, tags: List[str]) -> Post:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "body": row["body"],
+            "status": row["status"],
+            "tags": tags,
+            "user_id": row["user_id"],
+        }
+
+    @staticmethod
+    def _to_post(post_id: int, fields: Dict[str, Any]) -> Post:
+        return {
+            "id": post_id,
+            "title": fields["title"],
+            "body": fields["body"],
+            "status": fields["status"],
+            "tags": list(fields.get("tags", [])),
+            "user_id": fields["user_id"],
+        }
+
+
+class SQLiteItemStore:
+    """Хранилище элементов в SQLite с тем же интерфейсом, что и ItemStore."""
+
+    def __init__(self, pool: SQLiteConnectionPool) -> None:
+        self._pool = pool
+
+    def __len__(self) -> int:
+        with self._pool.connection() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+
+    @property
+    def last_id(self) -> int:
+        with self._pool.connection() as conn:
+            return _last_sequence(conn, "items")
+
+    def get(self, item_id: int) -> Optional[Item]:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT id, name FROM items WHERE id = ?", (item_id,)
+            ).fetchone()
+        return {"id": row["id"], "name": row["name"]} if row else None
+
+    def create(self, fields: Dict[str, Any]) -> Item:
+        with self._pool.transaction() as conn:
+            cur = conn.execute("INSERT INTO items (name) VALUES (?)", (fields["name"],))
+        return {"id": int(cur.lastrowid or 0), "name": fields["name"]}
+
+    def create_many(self, fields_list: List[Dict[str, Any]]) -> List[Item]:
+        with self._pool.transaction() as conn:
+            first_id = _last_sequence(conn, "items") + 1
+            items = [
+                {"id": first_id + offset, "name": fields["name"]}
+                for offset, fields in enumerate(fields_list)
+            ]
+            conn.executemany(
+                "INSERT INTO items (id, name) VALUES (?, ?)",
+                [(item["id"], item["name"]) for item in items],
+            )
+        return items
+
+    def add(self, item: Item) -> Item:
+        with self._pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO items (id, name) VALUES (?, ?)", (item["id"], item["name"])
+            )
+        return item
+
+    def clear(self) -> None:
+        with self._pool.transaction() as conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'items'")
+
+
+class SQLiteUserStore(MutableMapping[str, str]):
+    """Отображение username → password hash поверх таблицы users."""
+
+    blocking = True
+
+    def __init__(self, pool: SQLiteConnectionPool) -> None:
+        self._pool = pool
+
+    def __getitem__(self, username: str) -> str:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT password_hash FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return str(row[0])
+
+    def __setitem__(self, username: str, password_hash: str) -> None:
+        with self._pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (username, password_hash) VALUES (?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET "
+                "password_hash = excluded.password_hash",
+                (username, password_hash),
+            )
+
+    def __delitem__(self, username: str) -> None:
+        with self._pool.transaction() as conn:
+            cur = conn.execute("DELETE FROM users WHERE username = ?", (username,))
+        if cur.rowcount == 0:
+            raise KeyError(username)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._pool.connection() as conn:
+            rows = conn.execute("SELECT username FROM users ORDER BY username")
+            usernames = [row[0] for row in rows]
+        return iter(usernames)
+
+    def __len__(self) -> int:
+        with self._pool.connection() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+
+
+class SQLiteVersionTracker:
+    """Версии постов и публичных коллекций в таблице versions.
+
+    Интерфейс тот же, что у VersionTracker, но счётчики и эпоха лежат в общем
+    файле БД: запись на одном воркере меняет ETag на всех остальных, а записи
+    ResponseCache с прежним тегом перестают совпадать. Сами счётчики
+    поднимает SQLitePostStore в транзакции записи поста.
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool) -> None:
+        self._pool = pool
+        with pool.connection() as conn:
+            seed = int(
+                conn.execute(
+                    "SELECT version FROM versions WHERE key = 'epoch'"
+                ).fetchone()[0]
+            )
+        self.epoch = f"{seed & 0xFFFFFFFFFFFF:012x}"
+
+    def post_etag(self, post_id: int) -> str:
+        return f'"{self.epoch}-p{post_id}.{self._version(f"p:{post_id}")}"'
+
+    def public_etag(self, tag: Optional[str] = None) -> str:
+        if tag is None:
+            return f'"{self.epoch}-c{self._version("c")}"'
+        return f'"{self.epoch}-t{self._version(f"t:{tag}")}"'
+
+    def post_changed(
+        self,
+        post_id: int,
+        before: Optional[Post],
+        after: Optional[Post],
+    ) -> Set[Optional[str]]:
+        """Затронутые коллекции; сами версии SQLitePostStore уже поднял в
+        транзакции записи, поэтому здесь ничего не пишется."""
+        return affected_collections(before, after)
+
+    def _version(self, key: str) -> int:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT version FROM versions WHERE key = ?", (key,)
+            ).fetchone()
+        return int(row[0]) if row else 0
@@ -0,0 +1,77 @@
+import os
+from typing import Any, MutableMapping, NamedTuple
+
+from app.src.etag import VersionTracker
+from app.src.item_store import ItemStore
+from app.src.post_store import PostStore
+from app.src.user_store import UserStore
+
+# memory — хранилище в памяти процесса (по умолчанию);
+# sqlite — общий файл БД, который могут разделять несколько воркеров uvicorn
+STORAGE_BACKEND_ENV = "APP_STORAGE_BACKEND"
+SQLITE_PATH_ENV = "APP_SQLITE_PATH"
+SQLITE_POOL_SIZE_ENV = "APP_SQLITE_POOL_SIZE"
+
+DEFAULT_SQLITE_PATH = "data/blog.sqlite3"
+
+
+class Storage(NamedTuple):
+    posts: Any
+    items: Any
+    users: MutableMapping[str, str]
+    # Версии для ETag: должны жить там же, где данные, иначе запись на одном
+    # воркере не сменит тег на остальных
+    versions: Any
+    # Пул соединений SQLite, общий для всех хранилищ; None для memory
+    pool: Any = None
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+
+def storage_backend() -> str:
+    return os.getenv(STORAGE_BACKEND_ENV, "memory").lower()
+
+
+def open_sqlite_pool() -> Any:
+    """Пул соединений к общему файлу БД по APP_SQLITE_PATH / APP_SQLITE_POOL_SIZE."""
+    from app.src.sqlite_store import DEFAULT_POOL_SIZE, SQLiteConnectionPool
+
+    path = os.getenv(SQLITE_PATH_ENV, DEFAULT_SQLITE_PATH)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    pool_size = int(os.getenv(SQLITE_POOL_SIZE_ENV, str(DEFAULT_POOL_SIZE)))
+    return SQLiteConnectionPool(path, size=pool_size)
+
+
+def create_storage(backend: str = "") -> Storage:
+    backend = (backend or storage_backend()).lower()
+
+    if backend == "memory":
+        return Storage(
+            posts=PostStore(),
+            items=ItemStore(),
+            users=UserStore(),
+            versions=VersionTracker(),
+        )
+
+    if backend == "sqlite":
+        from app.src.sqlite_store import (
+            SQLiteItemStore,
+            SQLitePostStore,
+            SQLiteUserStore,
+            SQLiteVersionTracker,
+        )
+
+        pool = open_sqlite_pool()
+        return Storage(
+            posts=SQLitePostStore(pool),
+            items=SQLiteItemStore(pool),
+            users=SQLiteUserStore(pool),
+            versions=SQLiteVersionTracker(pool),
+            pool=pool,
+        )
+
+    raise RuntimeError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Callable, Dict, Iterator, MutableMapping, Optional
+
+JournalHook = Callable[[str, Dict[str, Any]], None]
+
+
+class UserStore(MutableMapping[str, str]):
+    """In-memory отображение username → password hash с поддержкой журнала."""
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._users: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._journal: Optional[JournalHook] = None
+
+    @property
+    def lock(self) -> "threading.RLock":
+        return self._lock
+
+    def attach_journal(self, hook: Optional[JournalHook]) -> None:
+        self._journal = hook
+
+    def __getitem__(self, username: str) -> str:
+        return self._users[username]
+
+    def __setitem__(self, username: str, password_hash: str) -> None:
+        with self._lock:
+            self._users[username] = password_hash
+            if self._journal:
+                self._journal("put", {"username": username, "hash": password_hash})
+
+    def __delitem__(self, username: str) -> None:
+        with self._lock:
+            del self._users[username]
+            if self._journal:
+                self._journal("delete", {"username": username})
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._users))
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def dump(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._users)
+
+    def restore(self, users: Dict[str, str]) -> None:
+        with self._lock:
+            self._users.update(users)
+
+    def replay(self, op: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            if op == "put":
+                self._users[data["username"]] = data["hash"]
+            elif op == "delete":
+                self._users.pop(data["username"], None)
+            else:
+                raise ValueError(f"unknown journal operation: {op}")
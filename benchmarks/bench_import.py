@@ -0,0 +1,82 @@
+"""Пропускная способность NDJSON-импорта постов (посты/с).
+
+Вход генерируется на лету и режется на фрагменты по 64 КиБ, как тело
+HTTP-запроса, поэтому в памяти держится не больше одной пачки.
+
+Запуск: python -m benchmarks.bench_import --posts 1000000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Iterator
+
+from app.src.ndjson import LineSplitter
+from app.src.post_import import IMPORT_CHUNK_SIZE, MAX_IMPORT_LINE_BYTES, PostImporter
+from app.src.post_store import PostStore
+
+NETWORK_CHUNK_BYTES = 64 * 1024
+
+
+def _body(posts: int, invalid_every: int) -> Iterator[bytes]:
+    buffer = bytearray()
+    for i in range(posts):
+        if invalid_every and i % invalid_every == 0:
+            buffer += b'{"title": ""}\n'
+        else:
+            record = {
+                "title": f"Post {i}",
+                "body": "Lorem ipsum dolor sit amet " * 4,
+                "status": "published" if i % 2 else "draft",
+                "tags": [f"tag{i % 50}"],
+            }
+            buffer += json.dumps(record).encode("utf-8") + b"\n"
+        if len(buffer) >= NETWORK_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--invalid-every", type=int, default=1000)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="замерить пик памяти через tracemalloc (заметно медленнее)",
+    )
+    args = parser.parse_args()
+
+    store = PostStore()
+    importer = PostImporter(store, "bench", chunk_size=args.chunk_size)
+    splitter = LineSplitter(MAX_IMPORT_LINE_BYTES)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for data in _body(args.posts, args.invalid_every):
+        importer.feed(splitter.feed(data))
+    importer.feed(splitter.close())
+    importer.flush()
+    elapsed = time.perf_counter() - started
+
+    report = importer.report()
+    print(f"lines:          {report['lines']}")
+    print(f"imported:       {report['imported']}")
+    print(f"failed:         {report['failed']}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"throughput:     {report['lines'] / elapsed:,.0f} posts/s")
+    if args.trace_memory:
+        # Пик включает сам стор; рабочая память импорта — одна пачка сверху
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"store size:     {current / 1024 / 1024:.1f} MiB")
+        print(f"peak over store: {(peak - current) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
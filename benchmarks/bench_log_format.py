@@ -0,0 +1,71 @@
+"""Стоимость safe_log: отключённый уровень, текстовые и JSON-записи.
+
+Отключённый DEBUG сравнивается с прежним поведением — маскирование и сборка
+строки до проверки уровня. Включённые записи идут через обработчик в файл
+с текстовым форматом и с JsonLogFormatter.
+
+Запуск: python -m benchmarks.bench_log_format --records 50000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Callable
+
+from app.src import rfc7807_handler
+from app.src.rfc7807_handler import _render, configure_log_format, safe_log
+
+
+def _eager_log(level: int, message: str, correlation_id=None, **kwargs) -> None:
+    # Прежний safe_log: форматирование не зависит от уровня
+    rfc7807_handler.logger.log(level, _render(message, correlation_id, kwargs))
+
+
+def _run(log: Callable[..., None], level: int, records: int) -> float:
+    started = time.perf_counter()
+    for i in range(records):
+        log(
+            level,
+            "Post created",
+            correlation_id=f"cid-{i}",
+            post_id=i,
+            user_id=f"user{i % 300}",
+            owner=f"user{i % 50}@example.com",
+        )
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rfc7807_handler.logger.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        # configure_log_format меняет формат обработчиков корневого логгера
+        handler = logging.FileHandler(os.path.join(tmp, "app.log"))
+        root = logging.getLogger()
+        root.addHandler(handler)
+        try:
+            eager = _run(_eager_log, logging.DEBUG, args.records)
+            lazy = _run(safe_log, logging.DEBUG, args.records)
+            configure_log_format("text")
+            text = _run(safe_log, logging.INFO, args.records)
+            configure_log_format("json")
+            structured = _run(safe_log, logging.INFO, args.records)
+        finally:
+            configure_log_format("text")
+            root.removeHandler(handler)
+            handler.close()
+
+    print(f"records:        {args.records}")
+    print(f"debug, eager:   {eager:.2f} us/record")
+    print(f"debug, lazy:    {lazy:.2f} us/record")
+    print(f"info, text:     {text:.2f} us/record")
+    print(f"info, json:     {structured:.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Время safe_log в вызывающем потоке: синхронная запись против очереди.
+
+Логгер пишет в файл, как StreamHandler в проде. Всплеск по умолчанию
+помещается в очередь (APP_LOG_QUEUE_SIZE): в цикле без пауз писатель
+не успевает за вызывающим потоком, и тогда drop теряет записи, а block
+упирается в скорость писателя. Для асинхронного режима отдельно
+замеряется полное время с дозаписью очереди.
+
+Запуск: python -m benchmarks.bench_logging --records 10000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.src import rfc7807_handler
+from app.src.rfc7807_handler import enable_async_logging, safe_log, stop_async_logging
+
+
+def _run(records: int) -> float:
+    started = time.perf_counter()
+    for i in range(records):
+        safe_log(
+            logging.INFO,
+            "Post created",
+            correlation_id=f"cid-{i}",
+            post_id=i,
+            user_id=f"user{i % 300}",
+            owner=f"user{i % 50}@example.com",
+        )
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = logging.FileHandler(os.path.join(tmp, "app.log"))
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger = rfc7807_handler.logger
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            sync = _run(args.records)
+            os.environ["APP_LOG_ASYNC"] = "1"
+            log_queue = enable_async_logging()
+            started = time.perf_counter()
+            queued = _run(args.records)
+            stop_async_logging()
+            flushed = time.perf_counter() - started
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+    print(f"records:      {args.records}")
+    print(f"sync:         {sync / args.records * 1e6:.1f} us/record")
+    print(f"async caller: {queued / args.records * 1e6:.1f} us/record")
+    print(f"async total:  {flushed / args.records * 1e6:.1f} us/record")
+    print(f"dropped:      {log_queue.dropped} ({log_queue.policy})")
+
+
+if __name__ == "__main__":
+    main()
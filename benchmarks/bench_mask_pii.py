@@ -0,0 +1,82 @@
+"""Пропускная способность mask_pii против четырёх последовательных замен.
+
+Набор строк похож на то, что safe_log получает на пишущих маршрутах:
+сообщения, пути, идентификаторы и изредка адреса, токены и секреты.
+
+Запуск: python -m benchmarks.bench_mask_pii --lines 200000
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from app.src.rfc7807_handler import (
+    EMAIL_PATTERN,
+    JWT_PATTERN,
+    PASSWORD_PATTERN,
+    PHONE_PATTERN,
+    mask_pii,
+)
+
+_JWT = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJzdWIiOiJhbGljZSJ9.dozjgN6z7hm7N8Bm7f8Y9vX8Y9vX8Y9vX8Y9vX8Y9vX"
+)
+
+
+def _sequential(text: str) -> str:
+    if not text:
+        return text
+    text = JWT_PATTERN.sub("JWT_TOKEN_MASKED", text)
+    text = PASSWORD_PATTERN.sub(r"\1: ***MASKED***", text)
+    text = EMAIL_PATTERN.sub(
+        lambda m: f"{m.group(0)[:3]}***@{m.group(0).split('@')[1]}", text
+    )
+    return PHONE_PATTERN.sub(lambda m: f"{m.group(0)[:3]}***{m.group(0)[-2:]}", text)
+
+
+def _corpus(lines: int) -> List[str]:
+    rng = random.Random(1)
+    templates = [
+        lambda i: "Post created",
+        lambda i: "HTTP request",
+        lambda i: f"http://testserver/posts/{i % 5000}",
+        lambda i: "POST",
+        lambda i: f"user{i % 300}",
+        lambda i: "draft",
+        lambda i: f"Post {i} updated with title 'Weekly notes {i % 52}'",
+        lambda i: f"user{i % 50}@example.com",
+        lambda i: f"Bearer {_JWT}",
+        lambda i: f"password={i}",
+        lambda i: f"call 8999{i % 1000:07d}",
+    ]
+    weights = [20, 20, 15, 15, 10, 10, 5, 2, 1, 1, 1]
+    return [rng.choices(templates, weights)[0](i) for i in range(lines)]
+
+
+def _run(mask: Callable[[str], str], corpus: List[str]) -> float:
+    started = time.perf_counter()
+    for text in corpus:
+        mask(text)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    args = parser.parse_args()
+
+    corpus = _corpus(args.lines)
+    assert all(mask_pii(text) == _sequential(text) for text in corpus)
+
+    sequential = _run(_sequential, corpus)
+    current = _run(mask_pii, corpus)
+    print(f"lines:        {args.lines}")
+    print(f"sequential:   {args.lines / sequential / 1e6:.2f} M lines/s")
+    print(f"mask_pii:     {args.lines / current / 1e6:.2f} M lines/s")
+    print(f"speedup:      {sequential / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Стоимость отказа 429 от лимитера против полного POST /posts.
+
+Запросы идут прямо в ASGI-приложение (со всеми middleware), без сети.
+Разрешённые запросы — каждый от нового принципала, отклонённые — от одного,
+уже исчерпавшего бюджет.
+
+Запуск: python -m benchmarks.bench_quota --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+_RULES = {
+    "rules": [
+        {
+            "name": "posts-write",
+            "methods": ["POST"],
+            "path": "/posts",
+            "per": "principal",
+            "limit": 1,
+            "window": 3600,
+        }
+    ]
+}
+_BODY = json.dumps({"title": "Benchmark", "body": "x" * 2000}).encode()
+
+
+async def _request(app, user_id: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/posts",
+        "raw_path": b"/posts",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"x-user-id", user_id.encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    status = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": _BODY, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _run(app, user_ids, expected: int) -> float:
+    started = time.perf_counter()
+    for user_id in user_ids:
+        status = await _request(app, user_id)
+        assert status == expected, status
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(_RULES, f)
+    os.environ["APP_RATE_LIMIT_CONFIG"] = f.name
+    try:
+        from app.main import app
+
+        # Логи одинаково дороги для обоих путей и заслоняют разницу
+        logging.disable(logging.CRITICAL)
+        allowed = asyncio.run(
+            _run(app, [f"writer{i}" for i in range(args.requests)], 200)
+        )
+        asyncio.run(_run(app, ["abuser"], 200))
+        rejected = asyncio.run(_run(app, ["abuser"] * args.requests, 429))
+    finally:
+        os.unlink(f.name)
+
+    print(f"requests:     {args.requests}")
+    print(f"allowed:      {allowed / args.requests * 1e6:.1f} us/request")
+    print(f"rejected:     {rejected / args.requests * 1e6:.1f} us/request")
+    print(f"ratio:        {allowed / rejected:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
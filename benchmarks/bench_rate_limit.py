@@ -0,0 +1,87 @@
+"""Стоимость check_rate_limit на 100k различных идентификаторов.
+
+Сравнивается прежний алгоритм (словарь "секунда → число" с пересчётом
+на каждый вызов) и текущее скользящее окно с посекундными корзинами.
+
+Запуск: python -m benchmarks.bench_rate_limit --identifiers 100000 --rounds 5
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from typing import Dict
+
+from app.src import rate_limit
+from app.src.rate_limit import ACCOUNT_WINDOW_SECONDS, MAX_ATTEMPTS_PER_ACCOUNT
+
+_legacy_store: Dict[str, Dict[str, int]] = defaultdict(dict)
+
+
+def _legacy_check(identifier: str, max_attempts: int, window: int):
+    now = time.time()
+    now_str = str(int(now))
+    key = f"{identifier}_{window}"
+    attempts = _legacy_store[key]
+    attempts_clean: Dict[str, int] = {}
+    for timestamp_str, count in attempts.items():
+        if now - float(timestamp_str) < window:
+            attempts_clean[timestamp_str] = count
+    if sum(attempts_clean.values()) >= max_attempts:
+        oldest = float(min(attempts_clean.keys(), key=float))
+        return False, max(0, oldest + window - now)
+    attempts[now_str] = attempts.get(now_str, 0) + 1
+    return True, None
+
+
+class _Clock:
+    """Подменяет time.time: каждый раунд попыток идёт в следующей секунде."""
+
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _run(check, identifiers, rounds: int, clock: _Clock) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        clock.now += 1
+        for identifier in identifiers:
+            check(identifier, MAX_ATTEMPTS_PER_ACCOUNT, ACCOUNT_WINDOW_SECONDS)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--identifiers", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    identifiers = [f"account:user{i}" for i in range(args.identifiers)]
+    calls = args.identifiers * args.rounds
+    rate_limit._rate_limit_store.clear()
+
+    clock = _Clock()
+    real_time, time.time = time.time, clock
+    try:
+        # Прогрев: у каждого идентификатора почти исчерпан лимит, попытки
+        # разнесены по разным секундам — типичная картина перебора паролей
+        warmup = MAX_ATTEMPTS_PER_ACCOUNT - 1
+        start = clock.now
+        _run(_legacy_check, identifiers, warmup, clock)
+        legacy = _run(_legacy_check, identifiers, args.rounds, clock)
+        clock.now = start
+        _run(rate_limit.check_rate_limit, identifiers, warmup, clock)
+        current = _run(rate_limit.check_rate_limit, identifiers, args.rounds, clock)
+    finally:
+        time.time = real_time
+
+    print(f"identifiers:  {args.identifiers}")
+    print(f"legacy:       {legacy / calls * 1e6:.2f} us/call")
+    print(f"sliding:      {current / calls * 1e6:.2f} us/call")
+    print(f"speedup:      {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
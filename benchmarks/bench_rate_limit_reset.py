@@ -0,0 +1,78 @@
+"""Стоимость rate limit на пути успешного входа в зависимости от размера хранилища.
+
+На каждый вход: проверка лимитов IP и аккаунта и сброс обоих. Прежний
+сброс обходил все ключи хранилища (O(число идентификаторов)), текущий
+удаляет записи идентификатора по ключу.
+
+Запуск: python -m benchmarks.bench_rate_limit_reset --sizes 1000 10000 100000
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+from app.src import rate_limit
+from app.src.rate_limit import (
+    check_account_rate_limit,
+    check_ip_rate_limit,
+    reset_rate_limit,
+)
+
+
+def _legacy_reset(store: Dict[str, object], identifier: str) -> None:
+    for key in list(store.keys()):
+        if key.startswith(f"ip:{identifier}") or key.startswith(
+            f"account:{identifier}"
+        ):
+            del store[key]
+
+
+def _populate(size: int) -> List[str]:
+    rate_limit._rate_limit_store.clear()
+    for i in range(size):
+        check_ip_rate_limit(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+    return list(rate_limit._rate_limit_store.keys())
+
+
+def _login(i: int) -> None:
+    ip, username = f"192.168.0.{i % 250}", f"user{i}"
+    check_ip_rate_limit(ip)
+    check_account_rate_limit(username)
+    reset_rate_limit(ip)
+    reset_rate_limit(username)
+
+
+def _legacy_login(store: Dict[str, object], i: int) -> None:
+    ip, username = f"192.168.0.{i % 250}", f"user{i}"
+    store[f"ip:{ip}_60"] = None
+    store[f"account:{username}_3600"] = None
+    _legacy_reset(store, ip)
+    _legacy_reset(store, username)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'identifiers':>12} {'legacy us/login':>16} {'indexed us/login':>17}")
+    for size in args.sizes:
+        keys = _populate(size)
+        started = time.perf_counter()
+        for i in range(args.logins):
+            _login(i)
+        indexed = (time.perf_counter() - started) / args.logins
+
+        legacy_store: Dict[str, object] = {f"{key}_60": None for key in keys}
+        started = time.perf_counter()
+        for i in range(args.logins):
+            _legacy_login(legacy_store, i)
+        legacy = (time.perf_counter() - started) / args.logins
+
+        print(f"{size:>12} {legacy * 1e6:>16.1f} {indexed * 1e6:>17.1f}")
+    rate_limit._rate_limit_store.clear()
+
+
+if __name__ == "__main__":
+    main()
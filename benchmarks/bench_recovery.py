@@ -0,0 +1,70 @@
+"""Время рестарта in-memory хранилища: загрузка снапшота + хвост журнала.
+
+Запуск: python -m benchmarks.bench_recovery --posts 1000000 --tail 10000
+"""
+
+import argparse
+import tempfile
+import time
+
+from app.src.item_store import ItemStore
+from app.src.journal import Persistence
+from app.src.post_store import PostStore
+from app.src.user_store import UserStore
+
+
+def _open(directory: str):
+    posts = PostStore()
+    persistence = Persistence(directory, posts, ItemStore(), UserStore())
+    return persistence, posts, persistence.recover()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        persistence, posts, _ = _open(directory)
+        # Наполняем стор без журнала, затем фиксируем состояние снапшотом
+        posts.attach_journal(None)
+        for i in range(args.posts):
+            posts.create(
+                {
+                    "title": f"Post {i}",
+                    "body": "Lorem ipsum dolor sit amet " * 4,
+                    "status": "published" if i % 2 else "draft",
+                    "tags": [f"tag{i % 50}"],
+                    "user_id": f"user{i % 1000}",
+                }
+            )
+        started = time.perf_counter()
+        persistence.snapshot()
+        snapshot_seconds = time.perf_counter() - started
+        persistence.close(snapshot=False)
+
+        persistence, posts, _ = _open(directory)
+        for i in range(args.tail):
+            posts.create(
+                {
+                    "title": f"Tail {i}",
+                    "body": "tail",
+                    "status": "published",
+                    "tags": [],
+                    "user_id": "tail",
+                }
+            )
+        persistence.close(snapshot=False)
+
+        _, posts, stats = _open(directory)
+
+    print(f"posts in snapshot:  {args.posts}")
+    print(f"snapshot write:     {snapshot_seconds:.2f}s")
+    print(f"journal tail ops:   {stats.replayed}")
+    print(f"restart time:       {stats.elapsed_seconds:.2f}s")
+    print(f"posts after start:  {stats.posts}")
+
+
+if __name__ == "__main__":
+    main()
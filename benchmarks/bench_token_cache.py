@@ -0,0 +1,45 @@
+"""Проверка bearer-токена с кешем и без: среднее время на запрос.
+
+Запуск: python -m benchmarks.bench_token_cache --tokens 100 --requests 100000
+"""
+
+import argparse
+import time
+
+from app.core import auth
+from app.core.auth import create_access_token
+
+
+def _run(tokens, requests: int, verify) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        verify(tokens[i % len(tokens)])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}"}) for i in range(args.tokens)]
+
+    uncached = _run(
+        tokens,
+        args.requests,
+        lambda token: auth._decode_token(token, auth.ACCESS_TOKEN_TYPE),
+    )
+    auth._TOKEN_CACHE.clear()
+    cached = _run(tokens, args.requests, auth.verify_token)
+    stats = auth.token_cache_stats()
+
+    per_request = 1_000_000 / args.requests
+    print(f"uncached:   {uncached:.2f}s ({uncached * per_request:.1f} us/request)")
+    print(f"cached:     {cached:.2f}s ({cached * per_request:.1f} us/request)")
+    print(f"speedup:    {uncached / cached:.1f}x")
+    print(f"hit ratio:  {stats['hit_ratio']}")
+
+
+if __name__ == "__main__":
+    main()
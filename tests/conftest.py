@@ -1,7 +1,13 @@
 import os
+import socketserver
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
+from app.src.resp import RespError, read_reply
+
 os.environ.setdefault("APP_PASSWORD_PEPPER", "test-pepper")
 os.environ.setdefault("APP_ADMIN_PASSWORD", "password123")
 os.environ.setdefault("APP_USER1_PASSWORD", "secret456")
@@ -10,3 +16,148 @@ os.environ.setdefault("APP_ADMIN_RESET_PASSWORD", "password123")
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def create_post():
+    """Создаёт пост через POST /posts от имени X-User-Id и возвращает его id."""
+    from app.main import app
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+
+    def create(
+        title="Post", body="Body", *, status="published", tags=(), user_id="poster"
+    ):
+        resp = client.post(
+            "/posts",
+            json={"title": title, "body": body, "status": status, "tags": list(tags)},
+            headers={"X-User-Id": user_id},
+        )
+        assert resp.status_code == 200, resp.text
+        return resp.json()["id"]
+
+    return create
+
+
+class _FakeRedis(socketserver.ThreadingTCPServer):
+    """Однопоточная по данным заглушка Redis: hash-команды, TTL и WATCH/MULTI/EXEC."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _FakeRedisHandler)
+        self.lock = threading.Lock()
+        self.hashes = {}
+        self.expire_at = {}
+        self.versions = {}
+        # Отвечать мусором вместо RESP (проверка разбора битых ответов)
+        self.malformed = False
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def version(self, key):
+        self._expire(key)
+        return self.versions.get(key, 0)
+
+    def run(self, command):
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return "PONG"
+        key = args[0]
+        self._expire(key)
+        if name == b"EXISTS":
+            return sum(key in self.hashes for key in args)
+        if name == b"HGETALL":
+            return [part for item in self.hashes.get(key, {}).items() for part in item]
+        self.versions[key] = self.versions.get(key, 0) + 1
+        if name == b"HSET":
+            fields = self.hashes.setdefault(key, {})
+            added = 0
+            for field, value in zip(args[1::2], args[2::2]):
+                added += field not in fields
+                fields[field] = value
+            return added
+        if name == b"HDEL":
+            fields = self.hashes.get(key, {})
+            return sum(fields.pop(field, None) is not None for field in args[1:])
+        if name == b"DEL":
+            self.expire_at.pop(key, None)
+            return int(self.hashes.pop(key, None) is not None)
+        if name == b"PEXPIREAT":
+            if key not in self.hashes:
+                return 0
+            self.expire_at[key] = int(args[1])
+            return 1
+        return RespError(f"ERR unknown command '{name.decode()}'")
+
+    def _expire(self, key):
+        if self.expire_at.get(key, float("inf")) <= time.time() * 1000:
+            del self.expire_at[key]
+            self.hashes.pop(key, None)
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+
+def _encode_reply(reply) -> bytes:
+    if reply is None:
+        return b"*-1\r\n"
+    if isinstance(reply, RespError):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode_reply(r) for r in reply)
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self) -> None:
+        server = self.server
+        watched, queued = {}, None
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name = command[0].upper()
+            with server.lock:
+                if name == b"WATCH":
+                    watched.update((key, server.version(key)) for key in command[1:])
+                    reply = "OK"
+                elif name == b"UNWATCH":
+                    watched.clear()
+                    reply = "OK"
+                elif name == b"MULTI":
+                    queued, reply = [], "OK"
+                elif name == b"EXEC":
+                    if any(server.version(k) != v for k, v in watched.items()):
+                        reply = None
+                    else:
+                        reply = [server.run(c) for c in queued or []]
+                    watched, queued = {}, None
+                elif queued is not None:
+                    queued.append(command)
+                    reply = "QUEUED"
+                else:
+                    reply = server.run(command)
+            if server.malformed:
+                self.wfile.write(b":not-a-number\r\n")
+                continue
+            self.wfile.write(_encode_reply(reply))
+
+
+@pytest.fixture
+def redis_server():
+    server = _FakeRedis()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
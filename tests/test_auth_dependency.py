@@ -0,0 +1,53 @@
+"""Тесты ленивой аутентификации: токен разбирается только там, где нужен."""
+
+import app.main as main_module
+from app.core.auth import create_access_token
+from fastapi.testclient import TestClient
+
+client = TestClient(main_module.app)
+
+
+def _count_decodes(monkeypatch):
+    calls = []
+    original = main_module.get_current_user
+
+    def counting(token):
+        calls.append(token)
+        return original(token)
+
+    monkeypatch.setattr(main_module, "get_current_user", counting)
+    return calls
+
+
+def test_public_routes_do_not_parse_token(monkeypatch):
+    calls = _count_decodes(monkeypatch)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'lazy'})}"}
+
+    assert client.get("/health", headers=headers).status_code == 200
+    assert client.get("/posts/public", headers=headers).status_code == 200
+    assert client.post("/items", json={"name": "x"}, headers=headers).status_code == 200
+    assert calls == []
+
+
+def test_token_resolved_once_for_authenticated_route(monkeypatch):
+    calls = _count_decodes(monkeypatch)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'lazy'})}"}
+
+    resp = client.post(
+        "/posts", json={"title": "Lazy", "body": "Body"}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert resp.json()["user_id"] == "lazy"
+    assert len(calls) == 1
+
+    resp = client.get("/posts", headers=headers)
+    assert [post["user_id"] for post in resp.json()["posts"]] == ["lazy"]
+
+
+def test_invalid_token_falls_back_to_x_user_id():
+    resp = client.post(
+        "/posts",
+        json={"title": "Fallback", "body": "Body"},
+        headers={"Authorization": "Bearer invalid", "X-User-Id": "header-user"},
+    )
+    assert resp.json()["user_id"] == "header-user"
@@ -0,0 +1,74 @@
+"""Тесты batch-эндпоинтов POST /posts:batch и POST /items:batch."""
+
+from app.main import app
+from app.src.schemas import MAX_BATCH_SIZE
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_posts_batch_creates_valid_and_reports_invalid():
+    resp = client.post(
+        "/posts:batch",
+        json={
+            "posts": [
+                {"title": "First", "body": "Body", "status": "published"},
+                {"title": "", "body": "Body"},
+                {"title": "Third", "body": "Body", "tags": ["batch"]},
+            ]
+        },
+        headers={"X-User-Id": "importer"},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 2
+    assert body["failed"] == 1
+
+    first, second, third = body["results"]
+    assert first["status"] == 200
+    assert third["post"]["id"] == first["post"]["id"] + 1
+    assert third["post"]["user_id"] == "importer"
+
+    error = second["error"]
+    assert second["status"] == 422
+    assert error["type"] == "https://example.com/problems/validation-error"
+    assert error["index"] == 1
+    assert "title" in error["detail"]
+    assert error["correlation_id"] == resp.headers["X-Correlation-ID"]
+
+    resp = client.get(f"/posts/{third['post']['id']}")
+    assert resp.json()["tags"] == ["batch"]
+
+
+def test_posts_batch_requires_authentication():
+    resp = client.post("/posts:batch", json={"posts": [{"title": "x", "body": "y"}]})
+    assert resp.status_code == 401
+    assert resp.json()["title"] == "Authentication Required"
+
+
+def test_posts_batch_size_limit():
+    resp = client.post(
+        "/posts:batch",
+        json={"posts": [{"title": "x", "body": "y"}] * (MAX_BATCH_SIZE + 1)},
+        headers={"X-User-Id": "importer"},
+    )
+    assert resp.status_code == 422
+
+    resp = client.post(
+        "/posts:batch", json={"posts": []}, headers={"X-User-Id": "importer"}
+    )
+    assert resp.status_code == 422
+
+
+def test_items_batch():
+    resp = client.post(
+        "/items:batch",
+        json={"items": [{"name": "one"}, {"name": ""}, {"name": "three"}]},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 2
+    ids = [r["item"]["id"] for r in body["results"] if r["status"] == 200]
+    assert ids[1] == ids[0] + 1
+    assert client.get(f"/items/{ids[1]}").json()["name"] == "three"
+    assert body["results"][1]["error"]["status"] == 422
@@ -0,0 +1,86 @@
+"""Тесты ETag / If-None-Match для чтения постов."""
+
+from app.main import app
+from app.src.etag import VersionTracker, if_none_match
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+OWNER = {"X-User-Id": "etag_owner"}
+
+
+def test_if_none_match_parsing():
+    assert if_none_match('"a", "b"', '"b"')
+    assert if_none_match('W/"b"', '"b"')
+    assert if_none_match("*", '"b"')
+    assert not if_none_match('"a"', '"b"')
+    assert not if_none_match(None, '"b"')
+
+
+def test_versions_bump_only_affected_collections():
+    tracker = VersionTracker()
+    public, tag_a, tag_b = (
+        tracker.public_etag(),
+        tracker.public_etag("a"),
+        tracker.public_etag("b"),
+    )
+
+    tracker.post_changed(1, None, {"status": "draft", "tags": ["a"]})
+    assert tracker.public_etag() == public
+    assert tracker.public_etag("a") == tag_a
+
+    tracker.post_changed(2, None, {"status": "published", "tags": ["a"]})
+    assert tracker.public_etag() != public
+    assert tracker.public_etag("a") != tag_a
+    assert tracker.public_etag("b") == tag_b
+
+
+def test_post_read_returns_304_until_updated(create_post):
+    post_id = create_post("ETag", user_id="etag_owner")
+
+    resp = client.get(f"/posts/{post_id}")
+    etag = resp.headers["ETag"]
+    assert resp.status_code == 200
+
+    resp = client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+
+    client.patch(f"/posts/{post_id}", json={"title": "Changed"}, headers=OWNER)
+    resp = client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "Changed"
+    assert resp.headers["ETag"] != etag
+
+
+def test_public_listing_etag_invalidated_by_published_write(create_post):
+    create_post("ETag", tags=["etagtag"], user_id="etag_owner")
+    resp = client.get("/posts/public", params={"tag": "etagtag"})
+    etag = resp.headers["ETag"]
+
+    resp = client.get(
+        "/posts/public", params={"tag": "etagtag"}, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+
+    # Черновик с тем же тегом не меняет публичную ленту
+    create_post("ETag", status="draft", tags=["etagtag"], user_id="etag_owner")
+    resp = client.get(
+        "/posts/public", params={"tag": "etagtag"}, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+
+    create_post("ETag", tags=["etagtag"], user_id="etag_owner")
+    resp = client.get(
+        "/posts/public", params={"tag": "etagtag"}, headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["count"] == 2
+
+
+def test_missing_post_still_returns_problem_details():
+    resp = client.get("/posts/999999", headers={"If-None-Match": "*"})
+    assert resp.status_code == 404
+    assert resp.json()["title"] == "Not Found"
+    assert "ETag" not in resp.headers
@@ -0,0 +1,113 @@
+"""Тесты потоковой NDJSON-выгрузки GET /posts/export."""
+
+import gzip
+import json
+
+from app.main import app
+from app.src.ndjson import accepts_gzip, gzip_chunks, iter_ndjson, iter_pages
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+# httpx по умолчанию запрашивает gzip; для проверок без сжатия просим identity
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def _lines(resp):
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_export_public_streams_published_posts_in_id_order(create_post):
+    published = create_post("Export published", user_id="exporter")
+    draft = create_post("Export draft", status="draft", user_id="exporter")
+
+    resp = client.get("/posts/export", headers=IDENTITY)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in resp.headers
+
+    posts = _lines(resp)
+    ids = [post["id"] for post in posts]
+    assert ids == sorted(ids)
+    assert published in ids
+    assert draft not in ids
+    assert all(post["status"] == "published" for post in posts)
+
+
+def test_export_since_id_resumes_after_last_seen_post(create_post):
+    first = create_post("Export first", user_id="exporter")
+    second = create_post("Export second", user_id="exporter")
+
+    posts = _lines(
+        client.get("/posts/export", params={"since_id": first}, headers=IDENTITY)
+    )
+    assert [post["id"] for post in posts][0] == second
+
+
+def test_export_mine_returns_only_own_posts_including_drafts(create_post):
+    draft = create_post("Mine draft", status="draft", user_id="export-owner")
+    create_post("Someone else", user_id="export-other")
+
+    resp = client.get(
+        "/posts/export",
+        params={"scope": "mine"},
+        headers={**IDENTITY, "X-User-Id": "export-owner"},
+    )
+    posts = _lines(resp)
+    assert [post["id"] for post in posts] == [draft]
+
+
+def test_export_mine_requires_authentication():
+    resp = client.get("/posts/export", params={"scope": "mine"})
+    assert resp.status_code == 401
+    assert resp.json()["title"] == "Authentication Required"
+
+
+def test_export_rejects_invalid_parameters():
+    assert client.get("/posts/export", params={"scope": "all"}).status_code == 400
+    assert client.get("/posts/export", params={"since_id": -1}).status_code == 400
+
+
+def test_export_gzip_when_accepted(create_post):
+    create_post("Compressed export", user_id="exporter")
+    with client.stream(
+        "GET", "/posts/export", headers={"Accept-Encoding": "gzip"}
+    ) as resp:
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+        raw = b"".join(resp.iter_raw())
+
+    lines = gzip.decompress(raw).decode("utf-8").splitlines()
+    assert any(json.loads(line)["title"] == "Compressed export" for line in lines)
+
+
+def test_iter_pages_walks_keyset_pages():
+    rows = [{"id": i} for i in range(1, 8)]
+    calls = []
+
+    def fetch(after_id, limit):
+        calls.append(after_id)
+        start = after_id or 0
+        return [row for row in rows if row["id"] > start][:limit]
+
+    pages = list(iter_pages(fetch, since_id=None, chunk_size=3))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert calls == [None, 3, 6]
+
+    # Полная последняя страница требует ещё одного (пустого) запроса
+    calls.clear()
+    assert len(list(iter_pages(fetch, since_id=1, chunk_size=3))) == 2
+    assert calls == [1, 4, 7]
+
+
+def test_gzip_chunks_roundtrip_and_ndjson_format():
+    chunks = iter_ndjson([[{"id": 1, "title": "Привет"}], [{"id": 2}]])
+    data = gzip.decompress(b"".join(gzip_chunks(chunks)))
+    assert data.decode("utf-8") == '{"id":1,"title":"Привет"}\n{"id":2}\n'
+
+
+def test_accepts_gzip_negotiation():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("deflate")
+    assert not accepts_gzip(None)
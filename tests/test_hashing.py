@@ -0,0 +1,100 @@
+"""Тесты пула хеширования паролей."""
+
+import asyncio
+import threading
+
+import app.main as main_module
+import pytest
+from app.core.hashing import HashingExecutor, HashingOverloaded
+from fastapi.testclient import TestClient
+
+client = TestClient(main_module.app)
+
+
+def test_run_offloads_to_worker_thread_and_records_stats():
+    executor = HashingExecutor(workers=2, max_queue=1)
+    try:
+        result = asyncio.run(executor.run(lambda: threading.current_thread().name))
+        assert result.startswith("hash")
+        stats = executor.stats()
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["rejected"] == 0
+        assert stats["max_hash_ms"] >= stats["avg_hash_ms"] >= 0
+    finally:
+        executor.close()
+
+
+def test_rejects_when_workers_and_queue_are_busy():
+    executor = HashingExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 2
+        with pytest.raises(HashingOverloaded) as exc_info:
+            await executor.run(release.wait)
+        assert exc_info.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(*running)
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["max_queue_wait_ms"] > 0
+    finally:
+        executor.close()
+
+
+def test_cancelled_request_keeps_slot_until_hash_finishes():
+    executor = HashingExecutor(workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        # Клиент ушёл, но поток всё ещё считает хеш и занимает воркер
+        running.cancel()
+        await asyncio.sleep(0)
+        assert executor.in_flight == 1
+        with pytest.raises(HashingOverloaded):
+            await executor.run(release.wait)
+        release.set()
+        for _ in range(100):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.in_flight == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.close()
+
+
+def test_register_returns_503_with_retry_after_when_saturated(monkeypatch):
+    async def overloaded(func, *args):
+        raise HashingOverloaded(retry_after=7)
+
+    monkeypatch.setattr(main_module._HASHER, "run", overloaded)
+    resp = client.post(
+        "/register", json={"username": "busy_user", "password": "Password123"}
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "7"
+    body = resp.json()
+    assert body["type"] == "https://example.com/problems/service-overloaded"
+    assert "busy_user" not in main_module._USERS_DB
+
+
+def test_metrics_expose_password_hashing():
+    client.post(
+        "/register", json={"username": "metrics_user", "password": "Password123"}
+    )
+    stats = client.get("/metrics").json()["password_hashing"]
+    assert stats["completed"] >= 1
+    assert {"avg_hash_ms", "avg_queue_wait_ms", "rejected"} <= set(stats)
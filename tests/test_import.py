@@ -0,0 +1,118 @@
+"""Тесты потокового NDJSON-импорта POST /posts/import."""
+
+import json
+
+import pytest
+from app.main import app
+from app.src.ndjson import LineSplitter
+from app.src.post_import import MAX_IMPORT_LINE_BYTES, PostImporter
+from app.src.post_store import PostStore
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def _ndjson(*records):
+    return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+
+def test_import_creates_posts_and_reports_bad_lines():
+    body = (
+        _ndjson({"title": "Imported one", "body": "Body", "status": "published"})
+        + b"not json\n\n"
+        + _ndjson({"title": "", "body": "Body"}, [1, 2])
+        + b'{"title": "Imported two", "body": "Body", "tags": ["import"]}'
+    )
+    resp = client.post(
+        "/posts/import",
+        content=body,
+        headers={"X-User-Id": "importer", "Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["imported"] == 2
+    assert report["failed"] == 3
+    assert report["lines"] == 6
+    assert report["errors_truncated"] is False
+    assert [error["line"] for error in report["errors"]] == [2, 4, 5]
+
+    error = report["errors"][1]["error"]
+    assert error["type"] == "https://example.com/problems/validation-error"
+    assert error["instance"] == "/posts/import"
+    assert "title" in error["detail"]
+    assert error["correlation_id"] == resp.headers["X-Correlation-ID"]
+
+    found = client.get(
+        "/posts", params={"tag": "import"}, headers={"X-User-Id": "importer"}
+    )
+    assert [post["title"] for post in found.json()["posts"]] == ["Imported two"]
+
+
+def test_import_streams_chunked_body():
+    def chunks():
+        line = _ndjson({"title": "Streamed", "body": "Body", "status": "published"})
+        for _ in range(5):
+            # Строка разрезана между фрагментами тела
+            yield line[:7]
+            yield line[7:]
+
+    resp = client.post(
+        "/posts/import", content=chunks(), headers={"X-User-Id": "streamer"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["imported"] == 5
+
+    search = client.get("/posts/search", params={"q": "streamed"})
+    assert search.json()["count"] >= 5
+
+
+def test_import_requires_authentication():
+    resp = client.post("/posts/import", content=_ndjson({"title": "T", "body": "B"}))
+    assert resp.status_code == 401
+
+
+def test_importer_inserts_in_chunks_and_caps_errors():
+    store = PostStore()
+    created = []
+    importer = PostImporter(
+        store, "bulk", on_created=created.append, chunk_size=3, max_errors=2
+    )
+    good = b'{"title": "T", "body": "B"}'
+    importer.feed([good] * 4 + [b"{", b"{", b"{"])
+    # Первая пачка уже вставлена, четвёртый пост ждёт следующей
+    assert importer.imported == 3
+    importer.flush()
+
+    report = importer.report()
+    assert report["imported"] == 4
+    assert [post["id"] for post in created] == [1, 2, 3, 4]
+    assert report["failed"] == 3
+    assert len(report["errors"]) == 2
+    assert report["errors_truncated"] is True
+
+
+def test_importer_rejects_id_overflow():
+    store = PostStore()
+    importer = PostImporter(store, "bulk", max_id=1)
+    importer.feed([b'{"title": "T", "body": "B"}'] * 2)
+    with pytest.raises(OverflowError):
+        importer.flush()
+    assert len(store) == 0
+
+
+def test_line_splitter_handles_split_and_oversized_lines():
+    splitter = LineSplitter(max_line_bytes=5)
+    assert splitter.feed(b"ab") == []
+    assert splitter.feed(b"c\nde") == [b"abc"]
+    # Длинная строка не буферизуется, вместо неё приходит None
+    assert splitter.feed(b"fghij") == []
+    assert splitter.feed(b"k\nok\n") == [None, b"ok"]
+    assert splitter.feed(b"1234567\ntail") == [None]
+    assert splitter.close() == [b"tail"]
+    assert splitter.close() == []
+
+
+def test_line_splitter_reports_oversized_last_line():
+    splitter = LineSplitter(max_line_bytes=MAX_IMPORT_LINE_BYTES)
+    splitter.feed(b"x" * (MAX_IMPORT_LINE_BYTES + 1))
+    assert splitter.close() == [None]
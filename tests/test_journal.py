@@ -0,0 +1,120 @@
+"""Тесты журнала операций и снапшотов in-memory хранилища."""
+
+import stat
+
+from app.src.item_store import ItemStore
+from app.src.journal import Persistence
+from app.src.post_store import PostStore
+from app.src.user_store import UserStore
+
+
+def _open(directory, **kwargs):
+    posts, items, users = PostStore(), ItemStore(), UserStore()
+    persistence = Persistence(str(directory), posts, items, users, **kwargs)
+    stats = persistence.recover()
+    return persistence, posts, items, users, stats
+
+
+def _fields(title, status="published", tags=None):
+    return {
+        "title": title,
+        "body": "Body",
+        "status": status,
+        "tags": tags or [],
+        "user_id": "u1",
+    }
+
+
+def test_journal_replay_restores_state(tmp_path):
+    persistence, posts, items, users, _ = _open(tmp_path)
+    first = posts.create(_fields("first", tags=["a"]))
+    second = posts.create(_fields("second"))
+    posts.update(first["id"], {"status": "draft", "tags": ["b"]})
+    posts.delete(second["id"])
+    items.create({"name": "thing"})
+    users["alice"] = "hash"
+    persistence.close(snapshot=False)
+
+    persistence, posts, items, users, stats = _open(tmp_path)
+    assert stats.snapshot_seq == 0
+    assert stats.replayed == 6
+    assert posts.get(first["id"])["tags"] == ["b"]
+    assert posts.get(second["id"]) is None
+    assert [p["id"] for p in posts.query(status="draft", tag="b")] == [1]
+    assert items.get(1) == {"id": 1, "name": "thing"}
+    assert users["alice"] == "hash"
+    # id удалённого поста не переиспользуется после рестарта
+    assert posts.create(_fields("third"))["id"] == 3
+    persistence.close(snapshot=False)
+
+
+def test_snapshot_then_tail_replay(tmp_path):
+    persistence, posts, _, _, _ = _open(tmp_path)
+    for i in range(5):
+        posts.create(_fields(f"post {i}"))
+    seq = persistence.snapshot()
+    posts.create(_fields("after snapshot"))
+    persistence.close(snapshot=False)
+
+    assert len(list(tmp_path.glob("snapshot-*.jsonl"))) == 1
+
+    persistence, posts, _, _, stats = _open(tmp_path)
+    assert stats.snapshot_seq == seq
+    assert stats.replayed == 1
+    assert stats.posts == 6
+    assert posts.get(6)["title"] == "after snapshot"
+    persistence.close()
+
+    # Финальный снапшот при закрытии: журнал пуст, проигрывать нечего
+    persistence, posts, _, _, stats = _open(tmp_path)
+    assert stats.replayed == 0
+    assert len(posts) == 6
+    persistence.close()
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    persistence, posts, _, _, _ = _open(tmp_path)
+    posts.create(_fields("durable"))
+    persistence.close(snapshot=False)
+
+    segment = sorted(tmp_path.glob("journal-*.log"))[-1]
+    with open(segment, "a", encoding="utf-8") as handle:
+        handle.write('[2,"post","put",{"id":2,"ti')
+
+    persistence, posts, _, _, stats = _open(tmp_path)
+    assert stats.replayed == 1
+    assert posts.get(2) is None
+    assert posts.create(_fields("next"))["id"] == 2
+    persistence.close(snapshot=False)
+
+    persistence, posts, _, _, _ = _open(tmp_path)
+    assert posts.get(2)["title"] == "next"
+    persistence.close(snapshot=False)
+
+
+def test_background_snapshot_after_threshold(tmp_path):
+    persistence, posts, _, _, _ = _open(tmp_path, snapshot_every=10)
+    for i in range(25):
+        posts.create(_fields(f"post {i}"))
+    persistence.close(snapshot=False)
+
+    assert list(tmp_path.glob("snapshot-*.jsonl"))
+    persistence, posts, _, _, stats = _open(tmp_path)
+    assert stats.snapshot_seq > 0
+    assert len(posts) == 25
+    persistence.close(snapshot=False)
+
+
+def test_journal_files_are_private(tmp_path):
+    persistence, posts, _, users, _ = _open(tmp_path)
+    users["alice"] = "hash"
+    posts.create(_fields("first"))
+    persistence.snapshot()
+    persistence.close(snapshot=False)
+
+    files = list(tmp_path.glob("journal-*.log")) + list(
+        tmp_path.glob("snapshot-*.jsonl")
+    )
+    assert files
+    for path in files:
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
@@ -0,0 +1,141 @@
+"""Тесты асимметричной подписи JWT и кольца ключей из JWKS."""
+
+import json
+import time
+
+import jwt
+import pytest
+from app.core import auth
+from app.core.keys import KeyRing, generate_key
+
+
+@pytest.fixture
+def jwks_path(tmp_path):
+    path = str(tmp_path / "jwks.json")
+    generate_key(path, "EdDSA", "ed-1")
+    return path
+
+
+@pytest.fixture
+def key_ring(jwks_path, monkeypatch):
+    ring = KeyRing(jwks_path, check_interval=0, on_reload=auth._TOKEN_CACHE.clear)
+    monkeypatch.setattr(auth, "_KEY_RING", ring)
+    monkeypatch.setattr(auth, "_HS256_ENABLED", False)
+    return ring
+
+
+def test_tokens_are_signed_with_kid_and_verified(key_ring):
+    token = auth.create_access_token({"sub": "asym"})
+    header = jwt.get_unverified_header(token)
+    assert header == {"alg": "EdDSA", "kid": "ed-1", "typ": "JWT"}
+    assert auth.verify_token(token)["sub"] == "asym"
+
+
+def test_es256_key_and_rotation_keep_old_tokens_valid(key_ring, jwks_path):
+    old_token = auth.create_access_token({"sub": "rotating"})
+
+    generate_key(jwks_path, "ES256", "ec-2")
+    new_token = auth.create_access_token({"sub": "rotating"})
+    assert jwt.get_unverified_header(new_token)["kid"] == "ec-2"
+    assert key_ring.stats()["signing_kid"] == "ec-2"
+
+    assert auth.verify_token(new_token)["sub"] == "rotating"
+    assert auth.verify_token(old_token)["sub"] == "rotating"
+
+
+def test_removed_key_invalidates_its_tokens(key_ring, jwks_path):
+    token = auth.create_access_token({"sub": "removed"})
+    assert auth.verify_token(token) is not None
+
+    generate_key(jwks_path, "EdDSA", "ed-2")
+    with open(jwks_path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["keys"] = [key for key in data["keys"] if key["kid"] != "ed-1"]
+    with open(jwks_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+    # Перезагрузка сбрасывает кеш проверенных токенов
+    assert auth.verify_token(token) is None
+
+
+def test_broken_jwks_keeps_loaded_keys(key_ring, jwks_path):
+    with open(jwks_path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    token = auth.create_access_token({"sub": "still-works"})
+    assert auth.verify_token(token)["sub"] == "still-works"
+    assert key_ring.stats()["reload_errors"] >= 1
+
+
+def test_unknown_kid_and_hs256_tokens_are_rejected(key_ring):
+    forged = jwt.encode(
+        {"sub": "x", "aud": "simple-blog-users", "iss": "simple-blog"},
+        auth.JWT_SECRET_KEY,
+        algorithm="HS256",
+    )
+    assert auth.verify_token(forged) is None
+
+    unknown = jwt.encode(
+        {"sub": "x"}, auth.JWT_SECRET_KEY, algorithm="HS256", headers={"kid": "nope"}
+    )
+    assert auth.verify_token(unknown) is None
+
+
+def test_algorithm_comes_from_key_not_header(key_ring, jwks_path):
+    # HS256 с публичным ключом в роли секрета: классическая подмена алгоритма
+    with open(jwks_path, encoding="utf-8") as f:
+        public_x = json.load(f)["keys"][0]["x"]
+    forged = jwt.encode(
+        {"sub": "x", "aud": "simple-blog-users", "iss": "simple-blog"},
+        public_x,
+        algorithm="HS256",
+        headers={"kid": "ed-1"},
+    )
+    assert auth.verify_token(forged) is None
+
+
+def test_hs256_fallback_when_secret_configured(key_ring, monkeypatch):
+    monkeypatch.setattr(auth, "_HS256_ENABLED", True)
+    legacy = jwt.encode(
+        {
+            "sub": "legacy",
+            "aud": "simple-blog-users",
+            "iss": "simple-blog",
+            "exp": int(time.time()) + 3600,
+        },
+        auth.JWT_SECRET_KEY,
+        algorithm="HS256",
+    )
+    assert auth.verify_token(legacy)["sub"] == "legacy"
+
+
+def test_public_only_ring_verifies_but_cannot_sign(tmp_path, jwks_path):
+    with open(jwks_path, encoding="utf-8") as f:
+        data = json.load(f)
+    for key in data["keys"]:
+        key.pop("d")
+    public_path = tmp_path / "public.json"
+    public_path.write_text(json.dumps(data), encoding="utf-8")
+
+    ring = KeyRing(str(public_path))
+    assert ring.verification_key("ed-1") is not None
+    with pytest.raises(RuntimeError):
+        ring.signing_key()
+
+
+def test_invalid_jwks_rejected_at_startup(tmp_path):
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{"kty": "oct", "k": "c2VjcmV0"}]}))
+    with pytest.raises(ValueError):
+        KeyRing(str(path))
+
+
+def test_unknown_signing_kid_fails_at_load(key_ring, jwks_path):
+    with pytest.raises(ValueError):
+        KeyRing(jwks_path, signing_kid="missing")
+
+    # При перезагрузке ошибочная конфигурация не заменяет рабочее кольцо
+    key_ring.signing_kid = "missing"
+    generate_key(jwks_path, "EdDSA", "ed-2")
+    token = auth.create_access_token({"sub": "kept"})
+    assert jwt.get_unverified_header(token)["kid"] == "ed-1"
+    assert key_ring.stats()["reload_errors"] == 1
@@ -0,0 +1,147 @@
+"""Структурные JSON-логи и ленивое форматирование safe_log."""
+
+import io
+import json
+import logging
+import uuid
+
+import pytest
+from app.main import app
+from app.src import rfc7807_handler
+from app.src.rfc7807_handler import (
+    configure_log_format,
+    enable_async_logging,
+    safe_log,
+    stop_async_logging,
+)
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def json_logs():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    configure_log_format("json")
+    yield stream
+    configure_log_format("text")
+    root.removeHandler(handler)
+
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_record_keeps_masked_fields(json_logs):
+    post_id = uuid.UUID(int=7)
+    safe_log(
+        logging.INFO,
+        "Post created for bob@example.com",
+        correlation_id="cid-9",
+        post_id=post_id,
+        count=3,
+        token="abc",
+        note='password: "hunter2"',
+    )
+    (line,) = [line for line in _lines(json_logs) if line["logger"].endswith("handler")]
+    assert line["level"] == "INFO"
+    assert line["message"] == "Post created for bob***@example.com"
+    assert line["correlation_id"] == "cid-9"
+    assert line["fields"] == {
+        "post_id": str(post_id),
+        "count": 3,
+        "token": "***MASKED***",
+        "note": "password: ***MASKED***",
+    }
+    assert line["timestamp"].endswith("+00:00")
+
+
+def test_fields_are_record_attributes(caplog):
+    configure_log_format("json")
+    try:
+        with caplog.at_level(logging.INFO, logger=rfc7807_handler.logger.name):
+            safe_log(logging.INFO, "Item read", correlation_id="c1", item_id=5)
+    finally:
+        configure_log_format("text")
+    (record,) = caplog.records
+    assert record.getMessage() == "Item read"
+    assert (record.correlation_id, record.fields) == ("c1", {"item_id": 5})
+
+
+def test_text_mode_is_unchanged(caplog):
+    with caplog.at_level(logging.INFO, logger=rfc7807_handler.logger.name):
+        safe_log(logging.INFO, "Item read", correlation_id="c1", item_id=5)
+    (record,) = caplog.records
+    assert record.getMessage() == "[correlation_id=c1] - Item read - item_id=5"
+    assert not hasattr(record, "fields")
+
+
+def test_disabled_level_skips_masking(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rfc7807_handler, "mask_pii", calls.append)
+    logger = rfc7807_handler.logger
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        for log_format in ("text", "json"):
+            configure_log_format(log_format)
+            safe_log(logging.DEBUG, "debug bob@example.com", user_id="alice")
+    finally:
+        configure_log_format("text")
+        logger.setLevel(level)
+    assert calls == []
+
+
+def test_async_json_logs(json_logs, monkeypatch):
+    monkeypatch.setenv("APP_LOG_ASYNC", "1")
+    stop_async_logging()
+    enable_async_logging()
+    try:
+        safe_log(logging.WARNING, "queued", correlation_id="cid-q", attempt=2)
+    finally:
+        stop_async_logging()
+    (line,) = [line for line in _lines(json_logs) if line["message"] == "queued"]
+    assert (line["correlation_id"], line["fields"]) == ("cid-q", {"attempt": 2})
+
+
+def test_foreign_records_and_exceptions(json_logs):
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("app.other").exception("failed %s", "job")
+    (line,) = _lines(json_logs)
+    assert line["message"] == "failed job"
+    assert "RuntimeError: boom" in line["exc_info"]
+    assert "fields" not in line
+
+
+def test_app_requests_log_json(json_logs):
+    client.get("/items/1", headers={"X-Correlation-ID": "req-json"})
+    lines = _lines(json_logs)
+    assert lines
+    assert any(line.get("correlation_id") == "req-json" for line in lines)
+
+
+def test_unknown_format_rejected(monkeypatch):
+    monkeypatch.setenv("APP_LOG_FORMAT", "xml")
+    with pytest.raises(ValueError):
+        configure_log_format()
+
+
+def test_dropped_records_report_uses_fields(json_logs, caplog):
+    rfc7807_handler._report_dropped(3, "drop")
+    (line,) = [
+        line for line in _lines(json_logs) if line["message"] == "Log queue full"
+    ]
+    assert line["level"] == "WARNING"
+    assert line["fields"] == {"dropped": 3, "policy": "drop"}
+
+    configure_log_format("text")
+    with caplog.at_level(logging.WARNING, logger=rfc7807_handler.logger.name):
+        rfc7807_handler._report_dropped(1, "block")
+    assert caplog.records[-1].getMessage() == (
+        "[correlation_id=N/A] - Log queue full - dropped=1, policy=block"
+    )
@@ -0,0 +1,168 @@
+"""Асинхронная запись логов: маскирование в фоне, политики переполнения, flush."""
+
+import logging
+import threading
+
+import pytest
+from app.main import app
+from app.src import rfc7807_handler
+from app.src.log_queue import AsyncLogQueue, create_log_queue
+from app.src.rfc7807_handler import (
+    enable_async_logging,
+    log_queue_stats,
+    safe_log,
+    stop_async_logging,
+)
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def async_logging(monkeypatch):
+    monkeypatch.setenv("APP_LOG_ASYNC", "1")
+    stop_async_logging()
+    yield enable_async_logging()
+    stop_async_logging()
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("APP_LOG_ASYNC", raising=False)
+    assert create_log_queue(lambda item: None) is None
+    assert client.get("/metrics").json()["logging"] == {"mode": "sync"}
+
+
+def test_masks_on_writer_thread(async_logging, caplog):
+    threads = []
+    render = rfc7807_handler._render
+
+    def spy(*args):
+        threads.append(threading.current_thread().name)
+        return render(*args)
+
+    caplog.set_level(logging.INFO, logger=rfc7807_handler.logger.name)
+    rfc7807_handler._render = spy
+    try:
+        safe_log(
+            logging.INFO,
+            "mail bob@example.com",
+            correlation_id="cid-1",
+            token="abc",
+            user_id="alice",
+        )
+        safe_log(logging.DEBUG, "not enabled")
+        stop_async_logging()
+    finally:
+        rfc7807_handler._render = render
+
+    assert threads == ["log-writer"]
+    (record,) = caplog.records
+    assert record.getMessage() == (
+        "[correlation_id=cid-1] - mail bob***@example.com"
+        " - token=***MASKED***, user_id=alice"
+    )
+    assert record.funcName == "safe_log"
+
+
+def test_record_time_is_submit_time(async_logging, caplog):
+    caplog.set_level(logging.INFO, logger=rfc7807_handler.logger.name)
+    async_logging.submit((logging.INFO, "late", None, {}, 1_000_000_000.25))
+    stop_async_logging()
+    (record,) = caplog.records
+    assert record.created == 1_000_000_000.25
+    assert record.msecs == pytest.approx(250.0)
+
+
+def test_drop_policy_counts_and_reports_losses():
+    gate = threading.Event()
+    written = []
+    dropped = []
+
+    def emit(item):
+        gate.wait()
+        written.append(item)
+
+    queue = AsyncLogQueue(
+        emit, maxsize=2, policy="drop", on_dropped=lambda n, _: dropped.append(n)
+    )
+    # Первая запись занимает писателя, следующие две заполняют очередь
+    results = [queue.submit(i) for i in range(10)]
+    gate.set()
+    queue.close()
+
+    assert results.count(False) == queue.dropped > 0
+    assert len(written) + queue.dropped == 10
+    assert sum(dropped) == queue.dropped
+    stats = queue.stats()
+    assert (stats["written"], stats["queued"], stats["errors"]) == (len(written), 0, 0)
+    # После закрытия записи не принимаются
+    assert queue.submit("late") is False
+
+
+def test_block_policy_loses_nothing():
+    written = []
+    queue = AsyncLogQueue(written.append, maxsize=1, policy="block")
+    producers = [
+        threading.Thread(target=lambda n=n: [queue.submit((n, i)) for i in range(200)])
+        for n in range(4)
+    ]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    queue.close()
+    assert len(written) == 800
+    assert queue.dropped == 0
+
+
+def test_close_racing_block_submit_loses_nothing():
+    written = []
+    accepted = [0] * 4
+    queue = AsyncLogQueue(written.append, maxsize=1, policy="block")
+
+    def produce(n):
+        while queue.submit(n):
+            accepted[n] += 1
+
+    producers = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for thread in producers:
+        thread.start()
+    threading.Event().wait(0.02)
+    queue.close()
+    for thread in producers:
+        thread.join()
+    # Всё, что submit принял, записано; отказы после close — только в счётчике
+    assert len(written) == sum(accepted) > 0
+    assert queue.dropped == 4
+
+
+def test_emit_errors_do_not_stop_writer():
+    written = []
+
+    def emit(item):
+        if item == "bad":
+            raise RuntimeError(item)
+        written.append(item)
+
+    queue = AsyncLogQueue(emit, maxsize=10)
+    for item in ("a", "bad", "b"):
+        queue.submit(item)
+    queue.close()
+    assert written == ["a", "b"]
+    assert queue.errors == 1
+
+
+def test_invalid_configuration(monkeypatch):
+    monkeypatch.setenv("APP_LOG_ASYNC", "1")
+    monkeypatch.setenv("APP_LOG_QUEUE_POLICY", "wait")
+    with pytest.raises(ValueError):
+        create_log_queue(lambda item: None)
+    with pytest.raises(ValueError):
+        AsyncLogQueue(lambda item: None, maxsize=0)
+
+
+def test_metrics_expose_queue(async_logging):
+    stats = client.get("/metrics").json()["logging"]
+    assert stats["mode"] == "async"
+    assert stats.keys() == log_queue_stats().keys()
+    assert (stats["policy"], stats["maxsize"], stats["dropped"]) == ("drop", 10000, 0)
@@ -0,0 +1,79 @@
+"""Тесты keyset-пагинации для GET /posts и GET /posts/public."""
+
+import pytest
+from app.main import app
+from app.src.pagination import decode_cursor, encode_cursor
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor(1)[:-2] + "@@"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_public_posts_paginated_by_cursor(create_post):
+    ids = [
+        create_post(f"Paged {i}", tags=["paging"], user_id="pager") for i in range(5)
+    ]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"tag": "paging", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/posts/public", params=params)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["count"] == len(body["posts"])
+        seen.extend(p["id"] for p in body["posts"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ids
+
+
+def test_list_posts_paginated_for_owner(create_post):
+    ids = [
+        create_post(f"Paged {i}", tags=["ownerpaging"], user_id="pager_owner")
+        for i in range(3)
+    ]
+
+    resp = client.get(
+        "/posts", params={"limit": 2}, headers={"X-User-Id": "pager_owner"}
+    )
+    body = resp.json()
+    assert [p["id"] for p in body["posts"]] == ids[:2]
+
+    resp = client.get(
+        "/posts",
+        params={"limit": 2, "cursor": body["next_cursor"]},
+        headers={"X-User-Id": "pager_owner"},
+    )
+    body = resp.json()
+    assert [p["id"] for p in body["posts"]] == ids[2:]
+    assert body["next_cursor"] is None
+
+
+def test_default_shape_without_pagination_params():
+    resp = client.get("/posts/public")
+    assert resp.status_code == 200
+    assert set(resp.json()) == {"posts", "count"}
+
+
+def test_invalid_limit_and_cursor():
+    resp = client.get("/posts/public", params={"limit": 0})
+    assert resp.status_code == 400
+    assert resp.json()["title"] == "Invalid Limit"
+
+    resp = client.get("/posts/public", params={"cursor": "garbage"})
+    assert resp.status_code == 400
+    assert resp.json()["title"] == "Invalid Cursor"
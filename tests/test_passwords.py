@@ -0,0 +1,158 @@
+"""Тесты хеширования паролей (scrypt) и перехода со старого формата."""
+
+import asyncio
+
+from app.core import passwords
+from app.core.passwords import (
+    ScryptParams,
+    calibrate,
+    hash_password,
+    needs_rehash,
+    verify_and_upgrade,
+    verify_password,
+)
+from app.main import _USERS_DB, _bootstrap_users, app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+FAST = ScryptParams(log_n=10, r=8, p=1)
+
+
+def test_scrypt_hash_roundtrip_and_format():
+    hashed = hash_password("correct horse", FAST)
+    assert hashed.startswith("$scrypt$ln=10,r=8,p=1$")
+    assert verify_password("correct horse", hashed)
+    assert not verify_password("wrong horse", hashed)
+    # Соль случайная: одинаковые пароли дают разные хеши
+    assert hash_password("correct horse", FAST) != hashed
+
+
+def test_legacy_sha256_hash_is_verified_and_marked_for_rehash():
+    legacy = passwords._legacy_hash("old-password")
+    assert len(legacy) == 64
+    assert verify_password("old-password", legacy)
+    assert not verify_password("other", legacy)
+    assert needs_rehash(legacy)
+
+    verified, upgraded = verify_and_upgrade("old-password", legacy)
+    assert verified
+    assert upgraded.startswith("$scrypt$")
+    assert verify_password("old-password", upgraded)
+
+
+def test_needs_rehash_when_work_factor_changes(monkeypatch):
+    monkeypatch.setenv("APP_SCRYPT_LOG_N", "10")
+    current = hash_password("pw")
+    assert not needs_rehash(current)
+    assert verify_and_upgrade("pw", current) == (True, None)
+
+    monkeypatch.setenv("APP_SCRYPT_LOG_N", "11")
+    assert needs_rehash(current)
+    # Старый хеш остаётся проверяемым после смены параметров
+    assert verify_password("pw", current)
+
+
+def test_malformed_hashes_are_rejected():
+    assert not verify_password("pw", "")
+    assert not verify_password("pw", "$scrypt$broken")
+    assert not verify_password("pw", "$scrypt$ln=x,r=8,p=1$c2FsdA$aGFzaA")
+    assert not verify_password("pw", "plain-text-password")
+    assert verify_and_upgrade("pw", "$scrypt$broken") == (False, None)
+
+
+def test_login_upgrades_legacy_hash():
+    from app.src.rate_limit import _rate_limit_store
+
+    _rate_limit_store.clear()
+    _USERS_DB["legacy_user"] = passwords._legacy_hash("LegacyPass123")
+
+    resp = client.post(
+        "/login", json={"username": "legacy_user", "password": "LegacyPass123"}
+    )
+    assert resp.status_code == 200
+    stored = _USERS_DB["legacy_user"]
+    assert stored.startswith("$scrypt$")
+
+    # Повторный вход работает уже по новому хешу и не меняет его
+    resp = client.post(
+        "/login", json={"username": "legacy_user", "password": "LegacyPass123"}
+    )
+    assert resp.status_code == 200
+    assert _USERS_DB["legacy_user"] == stored
+
+
+def test_bootstrap_keeps_recovered_users():
+    recovered = {"admin": "$scrypt$recovered"}
+    added = _bootstrap_users(recovered)
+    # Восстановленный хеш не перехешируется и не перезаписывается
+    assert set(added) == {"user1", "admin_reset"}
+    assert verify_password("secret456", added["user1"])
+    assert _bootstrap_users(_USERS_DB) == {}
+
+
+def test_calibrate_respects_lower_bound():
+    assert calibrate(target_ms=0.0).log_n == 10
+
+
+def test_login_for_unknown_user_still_verifies_a_hash():
+    from app.main import _HASHER
+    from app.src.rate_limit import _rate_limit_store
+
+    _rate_limit_store.clear()
+    completed = _HASHER.stats()["completed"]
+    resp = client.post("/login", json={"username": "ghost", "password": "Whatever1"})
+    assert resp.status_code == 401
+    # Отказ по неизвестному имени стоит одной проверки scrypt, как и по паролю
+    assert _HASHER.stats()["completed"] == completed + 1
+
+    resp = client.post("/login", json={"username": "admin", "password": "Wrong123"})
+    assert resp.status_code == 401
+    assert _HASHER.stats()["completed"] == completed + 2
+
+
+class _LoopCheckingUsers(dict):
+    """Хранилище-заглушка, запоминающее обращения из потока event loop."""
+
+    blocking = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop_calls = []
+
+    def _check(self, name):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.loop_calls.append(name)
+
+    def get(self, key, default=None):
+        self._check("get")
+        return super().get(key, default)
+
+    def __setitem__(self, key, value):
+        self._check("set")
+        super().__setitem__(key, value)
+
+
+def test_blocking_user_store_is_called_off_the_event_loop(monkeypatch):
+    from app import main
+    from app.src.rate_limit import _rate_limit_store
+
+    _rate_limit_store.clear()
+    users = _LoopCheckingUsers()
+    monkeypatch.setattr(main, "_USERS_DB", users)
+    monkeypatch.setattr(main, "_USERS_BLOCKING", True)
+
+    resp = client.post(
+        "/register", json={"username": "pooled_user", "password": "password123"}
+    )
+    assert resp.status_code == 200
+    users["legacy_pooled"] = passwords._legacy_hash("LegacyPass123")
+    resp = client.post(
+        "/login", json={"username": "legacy_pooled", "password": "LegacyPass123"}
+    )
+    assert resp.status_code == 200
+    assert users["legacy_pooled"].startswith("$scrypt$")
+    assert users.loop_calls == []
@@ -0,0 +1,121 @@
+"""Маскирование PII: побайтовое совпадение с последовательными заменами."""
+
+import random
+
+from app.src import rfc7807_handler
+from app.src.rfc7807_handler import (
+    EMAIL_PATTERN,
+    JWT_PATTERN,
+    MASK_CACHE_MAX_LENGTH,
+    PASSWORD_PATTERN,
+    PHONE_PATTERN,
+    mask_pii,
+)
+
+JWT = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJzdWIiOiIxMjM0NTY3ODkwIn0."
+    "dozjgN6z7hm7N8Bm7f8Y9vX8Y9vX8Y9vX8Y9vX8Y9vX"
+)
+
+# Фрагменты, на стыках которых замены взаимодействуют друг с другом
+FRAGMENTS = [
+    "a",
+    "Z",
+    "7",
+    "0123456789",
+    "98765432101",
+    " ",
+    "  ",
+    "\t",
+    ".",
+    "-",
+    "_",
+    "/",
+    ":",
+    "=",
+    " = ",
+    "'",
+    '"',
+    ",",
+    "@",
+    "user",
+    "mail@example.com",
+    "ab.c@d-e.org",
+    "x@y.z",
+    "eyJ",
+    "eyJabc",
+    ".eyJdef.",
+    JWT,
+    "password",
+    "PASSWORD",
+    "passwd",
+    "pwd",
+    "Secret",
+    "token",
+    "key",
+    "monkey",
+    "api_key",
+    "JWT_TOKEN_MASKED",
+    "***",
+    "é",
+    "да",
+    # (?i) считает "ſ" равной "s", а знак кельвина — "k"
+    "\u017fecret",
+    "\u212aey",
+    "\u0663\u0663\u0663\u0663\u0663",
+]
+
+
+def _reference_mask(text: str) -> str:
+    # Прежняя реализация: четыре замены подряд по всей строке
+    if not text:
+        return text
+    text = JWT_PATTERN.sub("JWT_TOKEN_MASKED", text)
+    text = PASSWORD_PATTERN.sub(r"\1: ***MASKED***", text)
+    text = EMAIL_PATTERN.sub(
+        lambda m: f"{m.group(0)[:3]}***@{m.group(0).split('@')[1]}", text
+    )
+    return PHONE_PATTERN.sub(lambda m: f"{m.group(0)[:3]}***{m.group(0)[-2:]}", text)
+
+
+def test_matches_sequential_passes_on_random_strings():
+    rng = random.Random(2023)
+    for _ in range(20000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randrange(1, 12)))
+        assert mask_pii(text) == _reference_mask(text), text
+
+
+def test_matches_sequential_passes_on_known_cases():
+    cases = [
+        "",
+        "GET /posts/42",
+        "Contact user@example.com for details",
+        f"Token: {JWT}",
+        f"token={JWT}",
+        'password: "secret123" and mail@example.com',
+        "call 89991234567 or 1234567890123",
+        "monkey=banana, 12345678901@example.com",
+        f"{JWT}key=value",
+        "id 123456789 is short",
+        "x" * (MASK_CACHE_MAX_LENGTH + 10) + " secret=abc user@example.com",
+    ]
+    for text in cases:
+        assert mask_pii(text) == _reference_mask(text), text
+
+
+def test_fast_path_returns_same_object():
+    text = "Post created - post_id=17, status=draft, user_id=alice"
+    assert mask_pii(text) is text
+
+
+def test_short_values_are_cached():
+    rfc7807_handler._mask_cached.cache_clear()
+    for _ in range(3):
+        assert mask_pii("owner=bob@example.com") == "owner=bob***@example.com"
+    info = rfc7807_handler._mask_cached.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+    long_text = "a" * MASK_CACHE_MAX_LENGTH + " bob@example.com"
+    mask_pii(long_text)
+    assert rfc7807_handler._mask_cached.cache_info().currsize == 1
@@ -0,0 +1,124 @@
+"""Тесты для индексированного хранилища постов."""
+
+import threading
+
+from app.src import post_store
+from app.src.post_store import PostStore
+
+
+def _post(post_id, user_id="u1", status="draft", tags=None):
+    return {
+        "id": post_id,
+        "title": f"Post {post_id}",
+        "body": "Body",
+        "status": status,
+        "tags": tags or [],
+        "user_id": user_id,
+    }
+
+
+def test_get_by_id():
+    store = PostStore()
+    store.add(_post(1))
+    store.add(_post(2))
+    assert store.get(2)["title"] == "Post 2"
+    assert store.get(3) is None
+    assert store.last_id == 2
+
+
+def test_query_by_user_status_and_tag():
+    store = PostStore()
+    store.add(_post(1, user_id="u1", status="published", tags=["a"]))
+    store.add(_post(2, user_id="u2", status="published", tags=["a", "b"]))
+    store.add(_post(3, user_id="u1", status="draft", tags=["b"]))
+
+    assert [p["id"] for p in store.query(user_id="u1")] == [1, 3]
+    assert [p["id"] for p in store.query(status="published")] == [1, 2]
+    assert [p["id"] for p in store.query(status="published", tag="b")] == [2]
+    assert [p["id"] for p in store.query(user_id="u1", tag="b")] == [3]
+    assert store.query(user_id="nobody") == []
+
+
+def test_update_reindexes_status_and_tags():
+    store = PostStore()
+    store.add(_post(1, status="draft", tags=["old"]))
+
+    store.update(1, {"status": "published", "tags": ["new"]})
+
+    assert store.query(status="draft") == []
+    assert store.query(tag="old") == []
+    assert [p["id"] for p in store.query(status="published", tag="new")] == [1]
+
+
+def test_delete_removes_from_indexes_and_keeps_id_sequence():
+    store = PostStore()
+    store.add(_post(1, tags=["a"]))
+    store.add(_post(2, tags=["a"]))
+
+    assert store.delete(2)["id"] == 2
+    assert store.delete(2) is None
+    assert [p["id"] for p in store.query(tag="a")] == [1]
+    assert store.get(2) is None
+    # id удалённого поста повторно не выдаётся
+    assert store.last_id == 2
+
+
+def test_query_skips_post_deleted_mid_iteration():
+    store = PostStore()
+    for post_id in (1, 2, 3):
+        store.add(_post(post_id))
+    # Состояние посреди delete(): поста уже нет в map, id ещё в индексах
+    del store._posts[2]
+    assert [p["id"] for p in store.query()] == [1, 3]
+    assert [p["id"] for p in store.query(user_id="u1", status="draft")] == [1, 3]
+
+
+def test_query_keyset_after_id_and_limit():
+    store = PostStore()
+    for post_id in range(1, 11):
+        store.add(_post(post_id, status="published" if post_id % 2 else "draft"))
+
+    page = store.query(status="published", limit=2)
+    assert [p["id"] for p in page] == [1, 3]
+
+    page = store.query(status="published", after_id=3, limit=2)
+    assert [p["id"] for p in page] == [5, 7]
+
+    page = store.query(status="published", after_id=9, limit=2)
+    assert page == []
+
+
+def test_query_reads_index_in_chunks(monkeypatch):
+    monkeypatch.setattr(post_store, "QUERY_CHUNK", 2)
+    store = PostStore()
+    for post_id in range(1, 21):
+        store.add(_post(post_id, user_id="u1" if post_id % 5 else "u2"))
+
+    # Фильтр по владельцу отсеивает большую часть каждой порции
+    page = store.query(status="draft", user_id="u2", limit=3)
+    assert [p["id"] for p in page] == [5, 10, 15]
+    page = store.query(status="draft", user_id="u2", after_id=15, limit=3)
+    assert [p["id"] for p in page] == [20]
+
+
+def test_query_does_not_skip_posts_during_concurrent_deletes(monkeypatch):
+    monkeypatch.setattr(post_store, "QUERY_CHUNK", 4)
+    store = PostStore()
+    for post_id in range(1, 20001):
+        store.add(_post(post_id))
+    survivors = list(range(2, 20001, 2))
+    stop = threading.Event()
+
+    def delete_odd():
+        for post_id in range(1, 20001, 2):
+            store.delete(post_id)
+        stop.set()
+
+    missing = []
+    deleter = threading.Thread(target=delete_odd)
+    deleter.start()
+    while not stop.is_set():
+        ids = {p["id"] for p in store.query(limit=len(survivors) * 2)}
+        missing.extend(post_id for post_id in survivors if post_id not in ids)
+    deleter.join()
+    assert missing == []
@@ -0,0 +1,159 @@
+"""Тесты скользящего окна rate limit и ограниченного хранилища окон."""
+
+import random
+import threading
+
+from app.main import app
+from app.src import rate_limit
+from app.src.rate_limit import (
+    RateLimitStore,
+    RateLimitSweeper,
+    _rate_limit_store,
+    check_rate_limit,
+    reset_rate_limit,
+)
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def _legacy_check(store, now, identifier, max_attempts, window):
+    # Прежняя реализация: словарь "секунда → число" с полным пересчётом
+    attempts = store.setdefault(f"{identifier}_{window}", {})
+    clean = {ts: n for ts, n in attempts.items() if now - float(ts) < window}
+    if sum(clean.values()) >= max_attempts:
+        if clean:
+            oldest = float(min(clean.keys(), key=float))
+            return False, max(0, oldest + window - now)
+        return False, window
+    now_str = str(int(now))
+    attempts[now_str] = attempts.get(now_str, 0) + 1
+    return True, None
+
+
+def test_matches_legacy_algorithm_including_retry_after(monkeypatch):
+    rng = random.Random(42)
+    clock = [1_000_000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    _rate_limit_store.clear()
+    legacy = {}
+
+    for _ in range(5000):
+        clock[0] += rng.choice([0.0, 0.1, 0.5, 0.9, 1.0, 3.0, 7.5, 30.0])
+        identifier = f"ip:{rng.randrange(5)}"
+        max_attempts, window = rng.choice([(5, 60), (3, 10), (0, 60)])
+        expected = _legacy_check(legacy, clock[0], identifier, max_attempts, window)
+        assert check_rate_limit(identifier, max_attempts, window) == expected
+
+    _rate_limit_store.clear()
+
+
+def test_retry_after_counts_from_oldest_bucket(monkeypatch):
+    clock = [100.4]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+    _rate_limit_store.clear()
+
+    assert check_rate_limit("ip:retry", 2, 60) == (True, None)
+    clock[0] = 101.7
+    assert check_rate_limit("ip:retry", 2, 60) == (True, None)
+    clock[0] = 110.0
+    allowed, retry_after = check_rate_limit("ip:retry", 2, 60)
+    assert not allowed
+    # Самая старая корзина — секунда 100, она выпадет в 160
+    assert retry_after == 50.0
+
+    # После выпадения первой корзины освобождается одна попытка
+    clock[0] = 160.0
+    assert check_rate_limit("ip:retry", 2, 60) == (True, None)
+    assert check_rate_limit("ip:retry", 2, 60)[0] is False
+
+    _rate_limit_store.clear()
+
+
+def test_store_evicts_least_recently_used_window():
+    store = RateLimitStore(max_entries=3)
+    with store.lock:
+        for key in ("a", "b", "c"):
+            store.window(key, 60).record(100)
+        # Обращение к "a" делает самым старым "b"
+        store.window("a", 60)
+        store.window("d", 60)
+
+    assert "b" not in store
+    assert set(store.keys()) == {"a", "c", "d"}
+    assert store.stats()["evictions"] == 1
+
+
+def test_sweep_drops_only_idle_windows(monkeypatch):
+    monkeypatch.setattr(rate_limit, "SWEEP_BATCH", 2)
+    store = RateLimitStore()
+    with store.lock:
+        store.window("old", 60).record(100)
+        store.window("short", 10).record(150)
+        store.window("fresh", 60).record(150)
+        store.window("empty", 60)
+
+    assert store.sweep(now=165.0) == 3
+    assert store.keys() == ["fresh"]
+    assert store.stats()["swept"] == 3
+
+
+def test_stats_track_entries_and_bytes():
+    store = RateLimitStore()
+    empty = store.stats()
+    assert empty["entries"] == 0
+    assert empty["approx_bytes"] == 0
+
+    with store.lock:
+        store.window("ip:1.2.3.4", 60).record(100)
+    one = store.stats()
+    assert one["entries"] == 1
+    assert one["approx_bytes"] > 0
+
+    store.discard("ip:1.2.3.4")
+    assert store.stats() == empty
+
+
+def test_sweeper_thread_runs_and_stops():
+    store = RateLimitStore()
+    with store.lock:
+        store.window("idle", 60)
+    sweeper = RateLimitSweeper(store, interval=0.01).start()
+    try:
+        for _ in range(200):
+            if not len(store):
+                break
+            threading.Event().wait(0.01)
+    finally:
+        sweeper.stop()
+    assert len(store) == 0
+
+
+def test_reset_touches_only_exact_identifier():
+    _rate_limit_store.clear()
+    for identifier in ("ip:1.2.3.4", "ip:1.2.3.45", "account:bob", "account:bobby"):
+        check_rate_limit(identifier, 5, 60)
+    check_rate_limit("account:bob", 20, 3600)
+
+    reset_rate_limit("1.2.3.4")
+    reset_rate_limit("bob")
+
+    assert sorted(_rate_limit_store.keys()) == ["account:bobby", "ip:1.2.3.45"]
+    _rate_limit_store.clear()
+
+
+def test_rate_limit_gauges_in_metrics():
+    stats = client.get("/metrics").json()["rate_limit"]
+    assert {"entries", "approx_bytes", "max_entries", "evictions"} <= stats.keys()
+
+
+def test_login_uses_memory_backend_without_thread_hop(monkeypatch):
+    async def no_threadpool(*args, **kwargs):
+        raise AssertionError("memory backend must not leave the event loop")
+
+    _rate_limit_store.clear()
+    monkeypatch.setattr(rate_limit, "run_in_threadpool", no_threadpool)
+    resp = client.post("/login", json={"username": "admin", "password": "password123"})
+    assert resp.status_code == 200
+    # Успешный вход сбрасывает счётчики адреса и аккаунта
+    assert list(_rate_limit_store.keys()) == []
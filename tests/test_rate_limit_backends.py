@@ -0,0 +1,191 @@
+"""Тесты общих бэкендов rate limit: mmap-таблица и Redis (через локальную заглушку)."""
+
+import io
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from app.main import app
+from app.src import rate_limit
+from app.src.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimitStore,
+    RateLimitUnavailable,
+)
+from app.src.rate_limit_backends import MmapRateLimitBackend, RedisRateLimitBackend
+from app.src.resp import RespClient, RespProtocolError, read_reply
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _assert_matches_memory(backend, seed=7):
+    rng = random.Random(seed)
+    memory = MemoryRateLimitBackend(RateLimitStore())
+    # Время от текущего: TTL в Redis считается по реальным часам
+    now = float(int(time.time()))
+    for _ in range(2000):
+        now += rng.choice([0.0, 0.2, 0.9, 1.0, 4.0, 11.0, 45.0])
+        identifier = f"ip:{rng.randrange(4)}"
+        if rng.random() < 0.02:
+            memory.reset(identifier)
+            backend.reset(identifier)
+            continue
+        max_attempts, window = rng.choice([(5, 60), (3, 10), (20, 3600)])
+        expected = memory.check(identifier, max_attempts, window, now)
+        assert backend.check(identifier, max_attempts, window, now) == expected
+
+
+def test_mmap_matches_memory_backend(tmp_path):
+    backend = MmapRateLimitBackend(str(tmp_path / "rl.mmap"), slots=64, buckets=32)
+    try:
+        _assert_matches_memory(backend)
+    finally:
+        backend.close()
+
+
+def test_mmap_table_is_shared_and_keeps_geometry(tmp_path):
+    path = str(tmp_path / "rl.mmap")
+    first = MmapRateLimitBackend(path, slots=32, buckets=8)
+    second = MmapRateLimitBackend(path, slots=4096, buckets=64)
+    try:
+        assert (second.slots, second.capacity) == (32, 8)
+        assert first.check("ip:a", 2, 60, 100.0) == (True, None)
+        assert second.check("ip:a", 2, 60, 100.0) == (True, None)
+        assert first.check("ip:a", 2, 60, 101.0) == (False, 59.0)
+
+        second.reset("ip:a")
+        assert first.check("ip:a", 2, 60, 101.0) == (True, None)
+        assert first.stats()["entries"] == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_mmap_merges_buckets_conservatively(tmp_path):
+    backend = MmapRateLimitBackend(str(tmp_path / "rl.mmap"), slots=8, buckets=2)
+    try:
+        for second in range(3):
+            assert backend.check("ip:m", 4, 10, 100.0 + second)[0]
+        assert backend.stats()["merges"] == 1
+        # Попытка из секунды 100 слита в 101: она держится на секунду дольше
+        assert backend.check("ip:m", 4, 10, 110.0) == (True, None)
+        assert backend.check("ip:m", 4, 10, 110.5)[0] is False
+    finally:
+        backend.close()
+
+
+def test_mmap_reuses_idle_slots_and_evicts_oldest(tmp_path):
+    backend = MmapRateLimitBackend(str(tmp_path / "rl.mmap"), slots=4, buckets=4)
+    try:
+        for i in range(4):
+            backend.check(f"ip:{i}", 5, 60, 100.0 + i)
+        # Все слоты заняты активными окнами — вытесняется самое старое
+        backend.check("ip:new", 5, 60, 110.0)
+        assert backend.stats()["evictions"] == 1
+
+        # Через минуту окна неактивны: слоты переиспользуются без вытеснения
+        for i in range(4):
+            backend.check(f"ip:later{i}", 5, 60, 200.0)
+        assert backend.stats()["evictions"] == 1
+    finally:
+        backend.close()
+
+
+def test_redis_matches_memory_backend(redis_server):
+    backend = RedisRateLimitBackend(RespClient(redis_server.url))
+    try:
+        _assert_matches_memory(backend)
+    finally:
+        backend.close()
+
+
+def test_redis_reset_and_ttl(redis_server):
+    backend = RedisRateLimitBackend(RespClient(redis_server.url), prefix="t:")
+    try:
+        now = time.time()
+        backend.check("account:bob", 20, 3600, now)
+        backend.check("account:bob", 5, 60, now)
+        key = b"t:account:bob"
+        assert set(redis_server.hashes[key]) == {b"3600", b"60"}
+        assert redis_server.expire_at[key] == (int(now) + 3600) * 1000
+
+        backend.reset("account:bob")
+        assert key not in redis_server.hashes
+    finally:
+        backend.close()
+
+
+def test_redis_unavailable_fails_closed_with_503(monkeypatch):
+    backend = RedisRateLimitBackend(RespClient("redis://127.0.0.1:1/0"))
+    with pytest.raises(RateLimitUnavailable):
+        backend.check("ip:x", 5, 60, time.time())
+
+    monkeypatch.setattr(rate_limit, "_backend", backend)
+    resp = client.post("/login", json={"username": "admin", "password": "password123"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    assert resp.json()["type"] == "https://example.com/problems/service-unavailable"
+
+
+def test_malformed_reply_is_a_connection_error():
+    for reply in (b":abc\r\n", b"$x\r\n", b"*?\r\n", b"?oops\r\n"):
+        with pytest.raises(RespProtocolError):
+            read_reply(io.BytesIO(reply))
+    assert issubclass(RespProtocolError, ConnectionError)
+
+
+def test_malformed_redis_reply_fails_closed(redis_server):
+    backend = RedisRateLimitBackend(RespClient(redis_server.url))
+    redis_server.malformed = True
+    try:
+        with pytest.raises(RateLimitUnavailable):
+            backend.check("ip:x", 5, 60, time.time())
+    finally:
+        backend.close()
+
+
+# Воркер — отдельный интерпретатор, как процесс uvicorn: общий только бэкенд
+_WORKER = """
+import sys
+from app.src.rate_limit_backends import MmapRateLimitBackend, RedisRateLimitBackend
+from app.src.resp import RespClient
+
+kind, target = sys.argv[1], sys.argv[2]
+attempts, now = int(sys.argv[3]), float(sys.argv[4])
+if kind == "mmap":
+    backend = MmapRateLimitBackend(target)
+else:
+    backend = RedisRateLimitBackend(RespClient(target))
+print(sum(backend.check("ip:shared", 37, 60, now)[0] for _ in range(attempts)))
+backend.close()
+"""
+
+
+def _run_workers(kind, target):
+    now = str(time.time())
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", _WORKER, kind, target, "25", now],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    return sum(int(worker.communicate(timeout=30)[0]) for worker in workers)
+
+
+def test_mmap_limit_is_exact_across_processes(tmp_path):
+    path = str(tmp_path / "rl.mmap")
+    MmapRateLimitBackend(path).close()
+    assert _run_workers("mmap", path) == 37
+
+
+def test_redis_limit_is_exact_across_processes(redis_server):
+    assert _run_workers("redis", redis_server.url) == 37
@@ -0,0 +1,190 @@
+"""Тесты ASGI-лимитера пишущих маршрутов."""
+
+import json
+
+import pytest
+from app.core.auth import create_access_token
+from app.main import app
+from app.src import rate_limit
+from app.src.rate_limit import _quota_store, _rate_limit_store
+from app.src.rate_limit_backends import RedisRateLimitBackend
+from app.src.rate_limit_middleware import (
+    DEFAULT_RULES,
+    QuotaRules,
+    RateLimitMiddleware,
+    _parse_rule,
+    load_quota_rules,
+)
+from app.src.resp import RespClient
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def _rule(name, methods, path, limit, per="principal"):
+    return {
+        "name": name,
+        "methods": methods,
+        "path": path,
+        "per": per,
+        "limit": limit,
+        "window": 60,
+    }
+
+
+def _limited_app(rules):
+    calls = []
+    demo = FastAPI()
+
+    @demo.post("/things")
+    async def create_thing(request: Request):
+        calls.append(await request.body())
+        return {"ok": True}
+
+    @demo.patch("/things/{thing_id}")
+    def update_thing(thing_id: int):
+        calls.append(thing_id)
+        return {"ok": True}
+
+    async def principal(request):
+        return request.headers.get("X-User-Id")
+
+    demo.add_middleware(
+        RateLimitMiddleware,
+        rules=QuotaRules([_parse_rule(rule) for rule in rules]),
+        principal=principal,
+    )
+    return TestClient(demo), calls
+
+
+@pytest.fixture(autouse=True)
+def _clean_store():
+    _rate_limit_store.clear()
+    _quota_store.clear()
+    yield
+    _rate_limit_store.clear()
+    _quota_store.clear()
+
+
+def test_rules_match_static_and_templated_paths():
+    rules = load_quota_rules()
+    assert [r.name for r in rules.match("POST", "/posts")] == ["posts-write"]
+    assert [r.name for r in rules.match("PATCH", "/posts/17")] == ["posts-modify"]
+    assert [r.name for r in rules.match("DELETE", "/posts/17")] == ["posts-modify"]
+    assert rules.match("GET", "/posts/17") == []
+    assert rules.match("PATCH", "/posts/17/extra") == []
+    assert [r.name for r in rules.match("POST", "/posts/import")] == ["posts-import"]
+
+
+def test_rules_from_config_file(tmp_path, monkeypatch):
+    config = tmp_path / "quotas.json"
+    config.write_text(
+        json.dumps(
+            {
+                "rules": [
+                    {
+                        "name": "posts",
+                        "methods": ["post"],
+                        "path": "/posts",
+                        "limit": 3,
+                        "window": 10,
+                    }
+                ]
+            }
+        )
+    )
+    monkeypatch.setenv("APP_RATE_LIMIT_CONFIG", str(config))
+    (rule,) = load_quota_rules().rules
+    assert (rule.methods, rule.per, rule.limit) == (("POST",), "principal", 3)
+
+    for bad in ({"per": "everyone"}, {"limit": -1}, {"path": "posts"}):
+        with pytest.raises(ValueError):
+            _parse_rule({**DEFAULT_RULES[0], **bad})
+    with pytest.raises(ValueError):
+        QuotaRules([_parse_rule(DEFAULT_RULES[0])] * 2)
+
+
+def test_rejection_skips_handler_with_problem_429():
+    demo, calls = _limited_app([_rule("things", ["POST"], "/things", 2)])
+    headers = {"X-User-Id": "alice"}
+    for _ in range(2):
+        assert demo.post("/things", content=b"x", headers=headers).status_code == 200
+
+    resp = demo.post("/things", content=b"x" * 1000, headers=headers)
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "60"
+    body = resp.json()
+    assert body["type"] == "https://example.com/problems/rate-limit-exceeded"
+    assert body["quota"] == "things"
+    assert body["instance"] == "/things"
+    assert len(calls) == 2
+
+    # Бюджет — на принципала: другой пользователь не затронут
+    assert demo.post("/things", headers={"X-User-Id": "bob"}).status_code == 200
+
+
+def test_ip_budget_and_templated_route():
+    demo, calls = _limited_app(
+        [_rule("edit", ["PATCH"], "/things/{thing_id}", 1, per="ip")]
+    )
+    assert demo.patch("/things/1", headers={"X-User-Id": "a"}).status_code == 200
+    # Смена пользователя не помогает: бюджет на адрес
+    assert demo.patch("/things/2", headers={"X-User-Id": "b"}).status_code == 429
+    assert demo.post("/things").status_code == 200
+    assert calls == [1, b""]
+
+
+def test_unavailable_backend_fails_closed(monkeypatch):
+    demo, calls = _limited_app([_rule("things", ["POST"], "/things", 5)])
+    backend = RedisRateLimitBackend(RespClient("redis://127.0.0.1:1/0"))
+    monkeypatch.setattr(rate_limit, "_quota_backend", backend)
+    resp = demo.post("/things")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    assert calls == []
+
+
+def test_default_budget_on_app_routes():
+    limit = next(r["limit"] for r in DEFAULT_RULES if r["name"] == "items-write")
+    for _ in range(limit):
+        client.post("/items", json={"name": "quota"})
+
+    resp = client.post("/items", json={"name": "quota"})
+    assert resp.status_code == 429
+    assert resp.json()["correlation_id"] == resp.headers["X-Correlation-ID"]
+    assert int(resp.headers["Retry-After"]) > 0
+    # Чтение не ограничено
+    assert client.get("/items/1").status_code != 429
+
+    quotas = client.get("/metrics").json()["quotas"]
+    assert quotas["rejections"]["items-write"] >= 1
+
+
+def test_principal_budget_ignores_client_supplied_user_header():
+    limit = next(r["limit"] for r in DEFAULT_RULES if r["name"] == "posts-write")
+    # Тело пустое: пропущенный запрос отвечает 422, до хранилища не доходит
+    for i in range(limit):
+        resp = client.post("/posts", headers={"X-User-Id": f"fake{i}"})
+        assert resp.status_code != 429
+    # Смена X-User-Id не даёт нового бюджета: без токена считается адрес
+    assert client.post("/posts", headers={"X-User-Id": "fresh"}).status_code == 429
+
+    token = create_access_token({"sub": "quota-alice"})
+    resp = client.post("/posts", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code != 429
+    assert sorted(_quota_store.keys()) == [
+        "quota:posts-write:ip:testclient",
+        "quota:posts-write:user:quota-alice",
+    ]
+
+
+def test_quota_windows_do_not_share_login_store():
+    rate_limit.check_ip_rate_limit("9.9.9.9")
+    client.post("/items", json={"name": "quota"})
+    assert list(_rate_limit_store.keys()) == ["ip:9.9.9.9"]
+    assert list(_quota_store.keys()) == ["quota:items-write:ip:testclient"]
+
+    quotas = client.get("/metrics").json()["quotas"]
+    assert quotas["store"]["backend"] == "memory"
+    assert quotas["store"]["entries"] == 1
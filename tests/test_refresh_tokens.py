@@ -0,0 +1,206 @@
+"""Тесты refresh-токенов: ротация, обнаружение повторного использования, выход."""
+
+import threading
+import time
+
+import pytest
+from app.core import auth
+from app.core.auth import verify_token
+from app.core.refresh_tokens import (
+    RedisRefreshFamilies,
+    RefreshFamilies,
+    SQLiteRefreshFamilies,
+)
+from app.core.revocation import RedisRevocationList, SQLiteRevocationList
+from app.main import app
+from app.src.rate_limit import _rate_limit_store
+from app.src.resp import RespClient
+from app.src.sqlite_store import SQLiteConnectionPool
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def _login():
+    _rate_limit_store.clear()
+    resp = client.post("/login", json={"username": "admin", "password": "password123"})
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _refresh(refresh_token):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_login_returns_token_pair_and_refresh_rotates():
+    tokens = _login()
+    assert tokens["token_type"] == "bearer"
+    assert tokens["expires_in"] > 0
+
+    resp = _refresh(tokens["refresh_token"])
+    assert resp.status_code == 200
+    rotated = resp.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert verify_token(rotated["access_token"])["sub"] == "admin"
+
+    # Новый refresh-токен тоже ротируется
+    assert _refresh(rotated["refresh_token"]).status_code == 200
+
+
+def test_reuse_revokes_whole_family():
+    tokens = _login()
+    rotated = _refresh(tokens["refresh_token"]).json()
+    assert verify_token(rotated["access_token"]) is not None
+
+    # Старый refresh-токен предъявлен повторно: утечка
+    resp = _refresh(tokens["refresh_token"])
+    assert resp.status_code == 401
+    assert resp.json()["title"] == "Invalid Refresh Token"
+
+    assert _refresh(rotated["refresh_token"]).status_code == 401
+    assert verify_token(rotated["access_token"]) is None
+    assert verify_token(tokens["access_token"]) is None
+
+
+def test_token_types_are_not_interchangeable():
+    tokens = _login()
+    assert verify_token(tokens["refresh_token"]) is None
+    resp = client.post(
+        "/posts",
+        json={"title": "T", "body": "B"},
+        headers=_bearer(tokens["refresh_token"]),
+    )
+    assert resp.status_code == 401
+    assert _refresh(tokens["access_token"]).status_code == 401
+    assert _refresh("garbage").status_code == 401
+
+
+def test_logout_ends_refresh_family():
+    tokens = _login()
+    assert (
+        client.post("/logout", headers=_bearer(tokens["access_token"])).status_code
+        == 200
+    )
+    assert _refresh(tokens["refresh_token"]).status_code == 401
+
+
+def test_metrics_report_refresh_families():
+    stats = client.get("/metrics").json()["token_revocations"]["refresh"]
+    assert {"families", "rotations", "reuse_detected"} <= set(stats)
+
+
+def test_families_expire_with_their_refresh_token():
+    families = RefreshFamilies()
+    families.start("f1", "u", refresh=("r1", 100), access=("a1", 50), now=0)
+    ok, _ = families.rotate("f1", "r1", refresh=("r2", 200), access=("a2", 150), now=60)
+    assert ok
+
+    # Срок семейства сдвинулся ротацией: в 150 оно ещё живо
+    families.start("f2", "u", refresh=("r3", 300), access=("a3", 250), now=150)
+    assert len(families) == 2
+    families.start("f3", "u", refresh=("r4", 400), access=("a4", 350), now=200)
+    assert len(families) == 2
+
+    ok, leaked = families.rotate(
+        "f2", "stale", refresh=("x", 500), access=("y", 500), now=210
+    )
+    assert not ok
+    assert leaked == [("a3", 250)]
+    assert len(families) == 1
+    assert families.stats()["reuse_detected"] == 1
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def worker_families(request, tmp_path):
+    """Фабрика хранилищ семейств: каждый вызов — отдельный «воркер»."""
+    if request.param == "sqlite":
+        path = str(tmp_path / "shared.sqlite3")
+        return lambda: SQLiteRefreshFamilies(SQLiteConnectionPool(path))
+    server = request.getfixturevalue("redis_server")
+    return lambda: RedisRefreshFamilies(RespClient(server.url), prefix="auth:refresh:")
+
+
+def test_families_are_shared_between_workers(worker_families):
+    first, second = worker_families(), worker_families()
+    now = time.time()
+    later = now + 900
+    first.start("f1", "u", refresh=("r1", now + 600), access=("a1", now + 60))
+    ok, _ = second.rotate("f1", "r1", refresh=("r2", later), access=("a2", now + 60))
+    assert ok
+
+    # Старый refresh-токен предъявлен другому воркеру: семейство отзывается
+    ok, leaked = first.rotate("f1", "r1", refresh=("x", later), access=("y", 0))
+    assert not ok
+    assert leaked == [("a1", now + 60), ("a2", now + 60)]
+    assert second.rotate("f1", "r2", refresh=("z", now), access=("w", now)) == (
+        False,
+        [],
+    )
+    assert (first.stats()["reuse_detected"], second.stats()["rotations"]) == (1, 1)
+
+    first.start("f2", "u", refresh=("r3", now + 600), access=("a3", now + 60))
+    assert second.revoke("f2") == [("a3", now + 60)]
+    assert first.revoke("f2") == []
+
+
+def test_redis_family_expires_with_refresh_token(redis_server):
+    families = RedisRefreshFamilies(RespClient(redis_server.url), prefix="auth:f:")
+    now = time.time()
+    families.start("f1", "u", refresh=("r1", now + 600), access=("a1", now + 60))
+    families.rotate("f1", "r1", refresh=("r2", now + 900), access=("a2", now + 60))
+    assert redis_server.expire_at[b"auth:f:f1"] == int((now + 900) * 1000)
+    families.rotate("f1", "r1", refresh=("x", now + 900), access=("y", now + 60))
+    assert b"auth:f:f1" not in redis_server.hashes
+
+
+def test_concurrent_rotation_has_one_winner(worker_families):
+    now = time.time()
+    worker_families().start(
+        "race", "u", refresh=("r0", now + 600), access=("a0", now + 60)
+    )
+    results = []
+
+    def rotate(n):
+        families = worker_families()
+        results.append(
+            families.rotate(
+                "race", "r0", refresh=(f"r{n}", now + 900), access=(f"a{n}", now + 60)
+            )[0]
+        )
+
+    threads = [threading.Thread(target=rotate, args=(n,)) for n in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False, False, False, True]
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def shared_auth_state(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        pool = SQLiteConnectionPool(str(tmp_path / "auth.sqlite3"))
+        revoked, families = SQLiteRevocationList(pool), SQLiteRefreshFamilies(pool)
+    else:
+        url = request.getfixturevalue("redis_server").url
+        revoked = RedisRevocationList(RespClient(url), prefix="auth:rev:")
+        families = RedisRefreshFamilies(RespClient(url), prefix="auth:refresh:")
+    monkeypatch.setattr(auth, "_REVOKED", revoked)
+    monkeypatch.setattr(auth, "_FAMILIES", families)
+    return request.param
+
+
+def test_refresh_flow_with_shared_state(shared_auth_state):
+    tokens = _login()
+    rotated = _refresh(tokens["refresh_token"])
+    assert rotated.status_code == 200
+
+    assert _refresh(tokens["refresh_token"]).status_code == 401
+    assert verify_token(rotated.json()["access_token"]) is None
+    stats = client.get("/metrics").json()["token_revocations"]
+    assert stats["backend"] == stats["refresh"]["backend"] == shared_auth_state
+    assert stats["refresh"]["reuse_detected"] == 1
@@ -0,0 +1,94 @@
+"""Тесты кеша ответов /posts/public."""
+
+from app.main import _PUBLIC_CACHE, app
+from app.src.response_cache import ResponseCache
+from app.src.sqlite_store import (
+    SQLiteConnectionPool,
+    SQLitePostStore,
+    SQLiteVersionTracker,
+)
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_lru_eviction_and_stats():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", None, '"1"', b"A")
+    cache.put("b", "t", '"1"', b"B")
+    assert cache.get("a", '"1"') == b"A"
+    cache.put("c", "t", '"1"', b"C")
+
+    assert cache.get("b", '"1"') is None
+    assert cache.get("a", '"1"') == b"A"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_entry_with_stale_etag_is_a_miss():
+    cache = ResponseCache()
+    cache.put("k", None, '"old"', b"body")
+    assert cache.get("k", '"new"') is None
+
+
+def test_invalidate_only_affected_groups():
+    cache = ResponseCache()
+    cache.put(("a", 1), "a", '"1"', b"A1")
+    cache.put(("a", 2), "a", '"1"', b"A2")
+    cache.put(("b", 1), "b", '"1"', b"B")
+
+    cache.invalidate(["a"])
+
+    assert len(cache) == 1
+    assert cache.get(("b", 1), '"1"') == b"B"
+
+
+def test_public_posts_served_from_cache_until_write(create_post):
+    create_post("Cached", tags=["cachetag"], user_id="cache_owner")
+    first = client.get("/posts/public", params={"tag": "CacheTag"})
+    hits_before = _PUBLIC_CACHE.hits
+
+    second = client.get("/posts/public", params={"tag": "cachetag"})
+    assert _PUBLIC_CACHE.hits == hits_before + 1
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+
+    # Пост с другим тегом не сбрасывает запись для cachetag
+    create_post("Cached", tags=["othertag"], user_id="cache_owner")
+    client.get("/posts/public", params={"tag": "cachetag"})
+    assert _PUBLIC_CACHE.hits == hits_before + 2
+
+    create_post("Cached", tags=["cachetag"], user_id="cache_owner")
+    third = client.get("/posts/public", params={"tag": "cachetag"})
+    assert third.json()["count"] == first.json()["count"] + 1
+
+
+def test_metrics_expose_cache_counters():
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert {"hits", "misses", "entries"} <= set(resp.json()["public_posts_cache"])
+
+
+def test_write_on_another_worker_misses_local_entry(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    local = SQLiteVersionTracker(SQLiteConnectionPool(path))
+    other = SQLitePostStore(SQLiteConnectionPool(path))
+    cache = ResponseCache()
+    cache.put(("a", None, None), "a", local.public_etag("a"), b"old")
+    assert cache.get(("a", None, None), local.public_etag("a")) == b"old"
+
+    # Другой воркер публикует пост с тегом a; локальный кеш об этом не знает
+    other.create(
+        {
+            "title": "T",
+            "body": "B",
+            "status": "published",
+            "tags": ["a"],
+            "user_id": "u1",
+        }
+    )
+
+    assert cache.get(("a", None, None), local.public_etag("a")) is None
@@ -0,0 +1,163 @@
+"""Тесты отзыва токенов: jti, список отзыва по корзинам и /logout."""
+
+import time
+
+import pytest
+from app.core import auth
+from app.core.auth import create_access_token, get_current_user, verify_token
+from app.core.revocation import (
+    RedisRevocationList,
+    RevocationList,
+    RevocationUnavailable,
+    SQLiteRevocationList,
+)
+from app.main import app
+from app.src.resp import RespClient
+from app.src.sqlite_store import SQLiteConnectionPool
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_tokens_have_unique_jti():
+    first = verify_token(create_access_token({"sub": "jti-user"}))
+    second = verify_token(create_access_token({"sub": "jti-user"}))
+    assert first["jti"] and second["jti"]
+    assert first["jti"] != second["jti"]
+
+
+def test_logout_revokes_token_including_cached_claims():
+    token = create_access_token({"sub": "logout-user"})
+    headers = {"Authorization": f"Bearer {token}"}
+    # Токен уже в кеше проверенных токенов
+    assert get_current_user(token) == "logout-user"
+
+    resp = client.post("/logout", headers=headers)
+    assert resp.status_code == 200
+    assert verify_token(token) is None
+
+    resp = client.post("/posts", json={"title": "T", "body": "B"}, headers=headers)
+    assert resp.status_code == 401
+
+    # Повторный выход тем же токеном невозможен
+    assert client.post("/logout", headers=headers).status_code == 401
+
+
+def test_logout_requires_valid_token():
+    assert client.post("/logout").status_code == 401
+    resp = client.post("/logout", headers={"Authorization": "Bearer invalid"})
+    assert resp.status_code == 401
+    assert resp.json()["title"] == "Authentication Required"
+
+
+def test_other_tokens_of_user_stay_valid():
+    kept = create_access_token({"sub": "multi-device"})
+    revoked = create_access_token({"sub": "multi-device"})
+    client.post("/logout", headers={"Authorization": f"Bearer {revoked}"})
+    assert get_current_user(kept) == "multi-device"
+
+
+def test_buckets_are_dropped_once_all_tokens_expired():
+    revocations = RevocationList(bucket_seconds=60)
+    revocations.revoke("a", exp=130, now=100)
+    revocations.revoke("b", exp=170, now=100)
+    revocations.revoke("d", exp=190, now=100)
+    revocations.revoke("c", exp=250, now=100)
+    assert revocations.is_revoked("a", 130)
+    assert not revocations.is_revoked("a", 250)
+    assert revocations.stats()["buckets"] == 3
+
+    # Корзина [120, 180) с a и b истекает целиком только в 180
+    revocations.purge(now=179)
+    assert revocations.stats()["entries"] == 4
+    revocations.purge(now=180)
+    stats = revocations.stats()
+    assert stats["buckets"] == 2
+    assert stats["entries"] == 2
+    assert stats["dropped_buckets"] == 1
+    assert not revocations.is_revoked("b", 170)
+
+
+def test_expired_tokens_are_not_stored():
+    revocations = RevocationList()
+    revocations.revoke("old", exp=50, now=100)
+    assert len(revocations) == 0
+    assert not revocations.is_revoked(None, None)
+
+
+def test_redis_revocation_is_shared_between_workers(redis_server):
+    first = RedisRevocationList(RespClient(redis_server.url), prefix="auth:revoked:")
+    second = RedisRevocationList(RespClient(redis_server.url), prefix="auth:revoked:")
+    exp = int(time.time()) + 600
+    try:
+        first.revoke("jti-1", exp)
+        first.revoke("old", exp - 1200)
+        assert second.is_revoked("jti-1", exp)
+        assert not second.is_revoked("jti-2", exp)
+        # Запись истекает вместе с токеном, истёкшие токены не хранятся
+        assert redis_server.expire_at[b"auth:revoked:jti-1"] == exp * 1000
+        assert b"auth:revoked:old" not in redis_server.hashes
+    finally:
+        first.close()
+        second.close()
+
+
+def test_malformed_redis_reply_makes_revocation_unavailable(redis_server):
+    revoked = RedisRevocationList(RespClient(redis_server.url), prefix="r:")
+    redis_server.malformed = True
+    try:
+        with pytest.raises(RevocationUnavailable):
+            revoked.is_revoked("jti-1", int(time.time()) + 600)
+    finally:
+        revoked.close()
+
+
+def test_unavailable_redis_revocation_fails_closed_with_503(monkeypatch):
+    down = RedisRevocationList(RespClient("redis://127.0.0.1:1/0"), prefix="r:")
+    monkeypatch.setattr(auth, "_REVOKED", down)
+    token = create_access_token({"sub": "redis-down"})
+
+    resp = client.post(
+        "/posts",
+        json={"title": "T", "body": "B"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    assert down.stats()["errors"] > 0
+
+
+def test_sqlite_revocation_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    first = SQLiteRevocationList(SQLiteConnectionPool(path))
+    second = SQLiteRevocationList(SQLiteConnectionPool(path))
+    now = time.time()
+    try:
+        first.revoke("jti-1", now + 600)
+        first.revoke("old", now - 1)
+        assert second.is_revoked("jti-1", now + 600)
+        assert not second.is_revoked("jti-2", now + 600)
+
+        # Истёкшие записи удаляются следующим отзывом
+        second.revoke("jti-3", now + 1200, now=now + 900)
+        assert not first.is_revoked("jti-1", now + 600)
+        assert first.stats()["entries"] == 1
+    finally:
+        first.close()
+        second.close()
+
+
+def test_auth_state_follows_storage_and_refuses_memory_with_workers(monkeypatch):
+    monkeypatch.delenv("APP_AUTH_STATE_BACKEND", raising=False)
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert auth.auth_state_backend() == "sqlite"
+
+    monkeypatch.setenv("APP_STORAGE_BACKEND", "memory")
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY=4"):
+        auth.auth_state_backend()
+    monkeypatch.setenv("APP_AUTH_STATE_BACKEND", "redis")
+    assert auth.auth_state_backend() == "redis"
+    monkeypatch.setenv("APP_AUTH_STATE_BACKEND", "mmap")
+    with pytest.raises(ValueError):
+        auth.auth_state_backend()
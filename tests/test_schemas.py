@@ -38,6 +38,17 @@ def test_normalize_unicode_control_chars():
     assert "\n" not in normalized  # \n тоже удаляется
 
 
+def test_normalize_unicode_fast_path_matches_char_filter():
+    """Тест: быстрый путь для печатаемых строк не меняет результат."""
+    # Разрешённые управляющие символы внутри текста сохраняются
+    assert normalize_unicode("line\nnext\tcol") == "line\nnext\tcol"
+    # Невидимые символы категории Cf удаляются
+    assert normalize_unicode("zero\u200bwidth\u2060") == "zerowidth"
+    # Неразрывный пробел печатаемым не считается, но остаётся
+    assert normalize_unicode("a\u00a0b") == "a\u00a0b"
+    assert normalize_unicode("e\u0301") == "\u00e9"
+
+
 def test_user_register_valid():
     """Тест валидной регистрации пользователя."""
     data = {"username": "testuser", "password": "password123"}
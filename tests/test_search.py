@@ -0,0 +1,113 @@
+"""Тесты полнотекстового поиска (инвертированный индекс + BM25)."""
+
+from app.main import app
+from app.src import sqlite_store
+from app.src.search_index import SearchIndex, SearchIndexSync, tokenize
+from app.src.sqlite_store import SQLiteConnectionPool, SQLitePostStore
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_tokenize_normalizes_text():
+    assert tokenize("Hello,  WORLD!​ Привет") == ["hello", "world", "привет"]
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity():
+    index = SearchIndex()
+    index.add(1, "python tips", "python python generators")
+    index.add(2, "cooking", "python recipe")
+    index.add(3, "travel", "mountains and rivers")
+
+    hits = index.search("python", limit=10)
+    assert [doc_id for doc_id, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1]
+    assert index.search("python", limit=1) == hits[:1]
+    assert index.search("absent", limit=10) == []
+
+
+def test_incremental_update_and_remove():
+    index = SearchIndex()
+    index.add(1, "old title", "old body")
+    index.add(1, "new title", "new body")
+    assert index.search("old", limit=10) == []
+    assert [doc_id for doc_id, _ in index.search("new", limit=10)] == [1]
+
+    index.remove(1)
+    assert len(index) == 0
+    assert index.search("new", limit=10) == []
+
+
+def test_search_endpoint_follows_post_lifecycle(create_post):
+    post_id = create_post(
+        "Zebrafish biology", "zebrafish swim in schools", user_id="searcher"
+    )
+    draft_id = create_post(
+        "Zebrafish draft",
+        "unpublished zebrafish",
+        status="draft",
+        user_id="searcher",
+    )
+
+    resp = client.get("/posts/search", params={"q": "ZEBRAFISH"})
+    assert resp.status_code == 200
+    ids = [p["id"] for p in resp.json()["posts"]]
+    assert post_id in ids
+    assert draft_id not in ids
+
+    client.patch(
+        f"/posts/{post_id}",
+        json={"body": "now about okapis"},
+        headers={"X-User-Id": "searcher"},
+    )
+    resp = client.get("/posts/search", params={"q": "okapis"})
+    assert [p["id"] for p in resp.json()["posts"]] == [post_id]
+
+    client.delete(f"/posts/{post_id}", headers={"X-User-Id": "searcher"})
+    resp = client.get("/posts/search", params={"q": "okapis"})
+    assert resp.json() == {"posts": [], "count": 0}
+
+
+def test_search_rejects_empty_query():
+    resp = client.get("/posts/search", params={"q": "  !! "})
+    assert resp.status_code == 400
+    assert resp.json()["title"] == "Invalid Query"
+
+
+def _post(title, status="published"):
+    return {"title": title, "body": "Body", "status": status, "user_id": "u"}
+
+
+def test_write_on_another_worker_reaches_local_index(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    local = SearchIndexSync(SQLitePostStore(SQLiteConnectionPool(path)))
+    other = SQLitePostStore(SQLiteConnectionPool(path))
+    local.rebuild()
+    assert local.search("quokka", 10) == []
+
+    post = other.create(_post("quokka"))
+    assert [hit[0] for hit in local.search("quokka", 10)] == [post["id"]]
+
+    other.update(post["id"], {"status": "draft"})
+    assert local.search("quokka", 10) == []
+    other.update(post["id"], {"status": "published"})
+    other.delete(post["id"])
+    assert local.search("quokka", 10) == []
+    # Догоняние по журналу, без перестройки
+    assert local.rebuilds == 1
+
+
+def test_trimmed_change_log_or_clear_rebuilds_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite3")
+    local = SearchIndexSync(SQLitePostStore(SQLiteConnectionPool(path)))
+    other = SQLitePostStore(SQLiteConnectionPool(path))
+    local.rebuild()
+
+    monkeypatch.setattr(sqlite_store, "CHANGE_LOG_SIZE", 2)
+    other.create_many([_post(f"wombat {n}") for n in range(5)])
+    assert len(local.search("wombat", 10)) == 5
+    assert local.rebuilds == 2
+
+    other.clear()
+    assert local.search("wombat", 10) == []
+    assert local.rebuilds == 3
@@ -0,0 +1,215 @@
+"""Тесты SQLite-бэкенда хранилища (WAL, пул соединений, индексы)."""
+
+import sqlite3
+import threading
+
+import pytest
+from app.src.sqlite_store import (
+    SQLiteConnectionPool,
+    SQLiteItemStore,
+    SQLitePostStore,
+    SQLiteUserStore,
+    SQLiteVersionTracker,
+)
+from app.src.storage import create_storage
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / "blog.sqlite3"), size=4)
+    yield pool
+    pool.close()
+
+
+def _fields(user_id="u1", status="draft", tags=None):
+    return {
+        "title": "Title",
+        "body": "Body",
+        "status": status,
+        "tags": tags or [],
+        "user_id": user_id,
+    }
+
+
+def test_wal_mode_enabled(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_post_crud_and_filters(pool):
+    store = SQLitePostStore(pool)
+    first = store.create(_fields(status="published", tags=["b", "a"]))
+    second = store.create(_fields(user_id="u2", status="published", tags=["a"]))
+    store.create(_fields(status="draft", tags=["a"]))
+
+    assert store.get(first["id"])["tags"] == ["b", "a"]
+    assert store.last_id == 3
+    assert len(store) == 3
+    assert [p["id"] for p in store.query(user_id="u1")] == [1, 3]
+    assert [p["id"] for p in store.query(status="published", tag="a")] == [1, 2]
+    assert [p["id"] for p in store.query(status="published", after_id=1)] == [2]
+    assert [p["id"] for p in store.query(tag="a", limit=1)] == [1]
+
+    updated = store.update(second["id"], {"status": "draft", "tags": ["c"]})
+    assert updated["status"] == "draft"
+    assert updated["tags"] == ["c"]
+    assert store.query(tag="a", user_id="u2") == []
+
+    assert store.delete(first["id"])["id"] == first["id"]
+    assert store.delete(first["id"]) is None
+    assert store.query(tag="b") == []
+    # AUTOINCREMENT не переиспользует id удалённых постов
+    assert store.create(_fields())["id"] == 4
+
+
+def test_update_missing_post_raises(pool):
+    with pytest.raises(KeyError):
+        SQLitePostStore(pool).update(42, {"title": "x"})
+
+
+def test_items_and_users(pool):
+    items = SQLiteItemStore(pool)
+    item = items.create({"name": "thing"})
+    assert items.get(item["id"]) == {"id": 1, "name": "thing"}
+    assert items.get(2) is None
+
+    users = SQLiteUserStore(pool)
+    users["alice"] = "hash1"
+    users["alice"] = "hash2"
+    assert "alice" in users
+    assert users.get("alice") == "hash2"
+    assert users.get("bob") is None
+    assert list(users) == ["alice"]
+    del users["alice"]
+    assert len(users) == 0
+
+
+def test_state_shared_between_pools(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    writer = SQLitePostStore(SQLiteConnectionPool(path))
+    reader = SQLitePostStore(SQLiteConnectionPool(path))
+
+    post = writer.create(_fields(status="published"))
+    assert reader.get(post["id"])["title"] == "Title"
+
+
+def test_concurrent_creates_get_unique_ids(pool):
+    store = SQLitePostStore(pool)
+
+    def worker():
+        for _ in range(20):
+            store.create(_fields())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [p["id"] for p in store.query()]
+    assert len(ids) == 160
+    assert len(set(ids)) == 160
+
+
+def test_create_storage_selects_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_SQLITE_PATH", str(tmp_path / "env.sqlite3"))
+    storage = create_storage("sqlite")
+    assert isinstance(storage.posts, SQLitePostStore)
+    assert isinstance(storage.versions, SQLiteVersionTracker)
+
+    with pytest.raises(RuntimeError):
+        create_storage("unknown")
+
+    storage.posts.create(_fields())
+    storage.close()
+    assert storage.pool._created == 0
+
+
+def test_failed_commit_is_rolled_back(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / "blog.sqlite3"), size=1)
+    with pool.connection() as conn:
+        conn.executescript(
+            "CREATE TABLE parent (id INTEGER PRIMARY KEY);"
+            "CREATE TABLE child (parent_id INTEGER REFERENCES parent (id)"
+            " DEFERRABLE INITIALLY DEFERRED);"
+        )
+
+    # Отложенный внешний ключ проверяется только на COMMIT
+    with pytest.raises(sqlite3.IntegrityError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO child (parent_id) VALUES (1)")
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 0
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO parent (id) VALUES (1)")
+    pool.close()
+
+
+def test_create_many_allocates_contiguous_ids(pool):
+    store = SQLitePostStore(pool)
+    store.create(_fields())
+    created = store.create_many([_fields(tags=["x"]), _fields(tags=["x", "y"])])
+
+    assert [p["id"] for p in created] == [2, 3]
+    assert store.get(3)["tags"] == ["x", "y"]
+    assert store.create(_fields())["id"] == 4
+
+    items = SQLiteItemStore(pool)
+    assert [i["id"] for i in items.create_many([{"name": "a"}, {"name": "b"}])] == [
+        1,
+        2,
+    ]
+
+
+def test_versions_shared_between_workers(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    writer_pool = SQLiteConnectionPool(path)
+    posts = SQLitePostStore(writer_pool)
+    writer = SQLiteVersionTracker(writer_pool)
+    reader = SQLiteVersionTracker(SQLiteConnectionPool(path))
+    assert writer.epoch == reader.epoch
+    post_etag, public, tag_a, tag_b = (
+        reader.post_etag(1),
+        reader.public_etag(),
+        reader.public_etag("a"),
+        reader.public_etag("b"),
+    )
+
+    draft = posts.create(_fields(tags=["a"]))
+    assert reader.post_etag(1) != post_etag
+    assert (reader.public_etag(), reader.public_etag("a")) == (public, tag_a)
+
+    published = posts.update(1, {"status": "published"})
+    assert writer.post_changed(1, draft, published) == {None, "a"}
+    assert reader.public_etag() != public
+    assert reader.public_etag("a") != tag_a
+    assert reader.public_etag("b") == tag_b
+
+    # Удаление тоже меняет тег: id может вернуться после clear()
+    deleted_etag = reader.post_etag(1)
+    posts.delete(1)
+    assert reader.post_etag(1) != deleted_etag
+
+
+def test_versions_bumped_in_write_transaction(pool):
+    posts = SQLitePostStore(pool)
+    tracker = SQLiteVersionTracker(pool)
+
+    # Пачка поднимает ленту один раз, а не по разу на пост
+    posts.create_many([_fields(status="published", tags=["a"]) for _ in range(50)])
+    with pool.connection() as conn:
+        versions = dict(conn.execute("SELECT key, version FROM versions"))
+    assert versions["c"] == 1
+    assert versions["t:a"] == 1
+    assert versions["p:50"] == 1
+
+    # Сам трекер ничего не пишет
+    assert tracker.post_changed(1, None, posts.get(1)) == {None, "a"}
+    with pool.connection() as conn:
+        assert dict(conn.execute("SELECT key, version FROM versions"))["c"] == 1
+
+    etag = tracker.post_etag(1)
+    posts.clear()
+    assert tracker.post_etag(1) != etag
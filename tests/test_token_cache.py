@@ -0,0 +1,91 @@
+"""Тесты кеша проверенных JWT."""
+
+from datetime import timedelta
+
+from app.core import auth
+from app.core.auth import create_access_token, token_cache_stats, verify_token
+from app.core.token_cache import TokenCache
+from app.main import app
+from fastapi.testclient import TestClient
+
+client = TestClient(app)
+
+
+def test_cache_hit_skips_decode(monkeypatch):
+    token = create_access_token({"sub": "cached-user"})
+    assert verify_token(token)["sub"] == "cached-user"
+
+    def fail(*_args):
+        raise AssertionError("cached token must not be decoded again")
+
+    monkeypatch.setattr(auth, "_decode_token", fail)
+    before = token_cache_stats()["hits"]
+    payload = verify_token(token)
+    assert payload["sub"] == "cached-user"
+    assert token_cache_stats()["hits"] == before + 1
+
+    # Изменение возвращённых claims не портит кеш
+    payload["sub"] = "someone-else"
+    assert verify_token(token)["sub"] == "cached-user"
+
+
+def test_invalid_and_expired_tokens_are_not_cached():
+    size = len(auth._TOKEN_CACHE)
+    assert verify_token("invalid.jwt.token") is None
+    expired = create_access_token({"sub": "old"}, timedelta(hours=-1))
+    assert verify_token(expired) is None
+    assert len(auth._TOKEN_CACHE) == size
+
+
+def test_entry_is_not_served_after_exp():
+    cache = TokenCache()
+    cache.put("tok", {"sub": "u", "exp": 1000}, now=900)
+    assert cache.get("tok", now=999)["sub"] == "u"
+    assert cache.get("tok", now=1000) is None
+    assert len(cache) == 0
+    assert cache.stats()["expired"] == 1
+
+
+def test_expired_entries_are_purged_before_live_ones():
+    cache = TokenCache(max_entries=2)
+    cache.put("short", {"exp": 100}, now=0)
+    cache.put("long", {"exp": 1000}, now=0)
+    # К моменту вставки третьего токена первый уже истёк: LRU-вытеснения нет
+    cache.put("new", {"exp": 1000}, now=150)
+    assert cache.get("long", now=150) is not None
+    assert cache.get("new", now=150) is not None
+    stats = cache.stats()
+    assert stats["expired"] == 1
+    assert stats["evictions"] == 0
+
+
+def test_lru_eviction_and_stats():
+    cache = TokenCache(max_entries=2)
+    cache.put("a", {"exp": 1000}, decode_seconds=0.002, now=0)
+    cache.put("b", {"exp": 1000}, decode_seconds=0.002, now=0)
+    assert cache.get("a", now=1) is not None
+    cache.put("c", {"exp": 1000}, now=1)
+
+    assert cache.get("b", now=1) is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["decode_ms_saved"] > 0
+
+
+def test_tokens_without_exp_and_discard():
+    cache = TokenCache()
+    cache.put("no-exp", {"sub": "u"}, now=0)
+    assert len(cache) == 0
+    cache.put("tok", {"exp": 10}, now=0)
+    cache.discard("tok")
+    assert cache.get("tok", now=1) is None
+
+
+def test_metrics_expose_token_cache():
+    body = client.get("/metrics").json()
+    assert {"hits", "misses", "hit_ratio", "decode_ms_saved"} <= set(
+        body["token_cache"]
+    )